@@ -0,0 +1,158 @@
+import asyncio
+import glob
+import os
+import shutil
+import sqlite3
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import urlencode
+import asyncpg
+import discord
+from discord.ext import commands
+from utils.db_manager import DatabaseManager
+from utils.db_memoria import e_dsn_memoria
+from utils.agendador import Agendador
+from utils.admissao import ControladorAdmissao
+from utils.vigia_loop import VigiaLoop
+from bench.falsos import GuildaFalsa
+
+ESQUEMA = 'bench_arauto'
+GUILD_ID = 4242424242
+BASE_IDS = 10**17 # IDs dos membros: BASE_IDS + i
+SALDO_INICIAL = 10**9
+COGS = ('admin', 'economia', 'engajamento', 'utilidades', 'taxas', 'orbes')
+
+@contextmanager
+def postgres_local():
+    """Devolve o DSN de uma base de dados descartável.
+    Usa BENCH_DATABASE_URL se definida (`memoria://` para o backend SQLite em memória, sem servidor);
+    senão cria um cluster temporário com initdb/pg_ctl (apagado à saída)."""
+    dsn = os.getenv('BENCH_DATABASE_URL')
+    if dsn:
+        yield dsn
+        return
+    initdb = shutil.which('initdb') or next(iter(sorted(glob.glob('/usr/lib/postgresql/*/bin/initdb'), reverse=True)), None)
+    if not initdb:
+        raise RuntimeError("Postgres não encontrado: defina BENCH_DATABASE_URL ou instale o servidor (initdb/pg_ctl) no PATH.")
+    pg_ctl = os.path.join(os.path.dirname(initdb), 'pg_ctl')
+    diretorio = tempfile.mkdtemp(prefix='arauto-bench-')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+    try:
+        try:
+            subprocess.run([initdb, '-D', diretorio, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'], check=True, capture_output=True, text=True)
+            subprocess.run([pg_ctl, '-D', diretorio, '-w', '-l', os.path.join(diretorio, 'log'),
+                            '-o', f"-p {porta} -k {diretorio} -c listen_addresses='' -c fsync=off", 'start'], check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Falha ao criar o cluster Postgres temporário: {(e.stderr or e.stdout).strip()}") from None
+        yield f"postgresql://postgres@/postgres?host={diretorio}&port={porta}"
+    finally:
+        subprocess.run([pg_ctl, '-D', diretorio, '-m', 'immediate', 'stop'], capture_output=True)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def _com_esquema(dsn: str) -> str:
+    if e_dsn_memoria(dsn): return dsn
+    # Os parâmetros desconhecidos do DSN são passados pelo asyncpg como server_settings
+    return dsn + ('&' if '?' in dsn else '?') + urlencode({'search_path': ESQUEMA})
+
+async def recriar_esquema(dsn: str):
+    if e_dsn_memoria(dsn): return # Cada DatabaseManager em memória começa com uma base vazia
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {ESQUEMA}")
+    finally:
+        await conn.close()
+
+class BotBanco(commands.Bot):
+    """Bot real (cogs, get_cog, listeners) sem ligação ao gateway: guildas e utilizadores vêm das guildas falsas.
+    As tarefas em loop dos cogs ficam paradas em wait_until_ready; os benchmarks chamam-nas diretamente."""
+    def __init__(self, db_manager: DatabaseManager, guildas: list):
+        super().__init__(command_prefix='!', intents=discord.Intents.default())
+        self.db_manager = db_manager
+        self.guildas = {g.id: g for g in guildas}
+        self.e_lider = True
+        self.agendador = Agendador(self)
+        self.vigia = VigiaLoop()
+        self.admissao = ControladorAdmissao(self)
+        self._nunca = asyncio.Event()
+
+    @property
+    def guilds(self): return list(self.guildas.values())
+
+    def get_guild(self, id): return self.guildas.get(id)
+    def get_user(self, id): return None # Sem DMs
+
+    def get_channel(self, id):
+        return next((c for g in self.guildas.values() if (c := g.get_channel(id))), None)
+
+    async def wait_until_ready(self):
+        await self._nunca.wait()
+
+class Ambiente:
+    """Uma guilda falsa com `membros` membros sobre um esquema acabado de criar, com os cogs reais carregados."""
+    def __init__(self, dsn: str, membros: int, em_voz: bool = True):
+        self.dsn = dsn
+        self.n_membros = membros
+        self.em_voz = em_voz
+        self.db = DatabaseManager(_com_esquema(dsn), min_conn=2, max_conn=10)
+        self.guilda = GuildaFalsa(GUILD_ID)
+        self.bot = BotBanco(self.db, [self.guilda])
+
+    async def __aenter__(self):
+        await recriar_esquema(self.dsn)
+        await self.db.connect()
+        for nome in COGS:
+            await self.bot.load_extension(f'cogs.{nome}')
+        admin = self.bot.get_cog('Admin')
+        await admin.initialize_database_schema()
+        await admin.preparar_guilda(GUILD_ID)
+        await self._povoar()
+        return self
+
+    async def __aexit__(self, *exc):
+        for nome in COGS:
+            try: await self.bot.unload_extension(f'cogs.{nome}')
+            except commands.ExtensionError: pass
+        await self.db.close()
+
+    def cog(self, nome: str):
+        return self.bot.get_cog(nome)
+
+    async def _povoar(self):
+        g = self.guilda
+        self.cargo_membro = g.criar_cargo("Membro")
+        self.cargo_inadimplente = g.criar_cargo("Inadimplente")
+        self.moderador = g.adicionar_membro(BASE_IDS - 1, admin=True)
+        self.membros = [g.adicionar_membro(BASE_IDS + i, [self.cargo_membro]) for i in range(self.n_membros)]
+        if self.em_voz: g.colocar_em_voz(self.membros)
+        ids = [m.id for m in self.membros]
+
+        db = self.db
+        await db.execute_query(
+            "INSERT INTO banco (guild_id, user_id, saldo) SELECT $1, u, $3 FROM unnest($2::BIGINT[]) AS u",
+            GUILD_ID, ids, SALDO_INICIAL)
+        await db.execute_query("UPDATE banco SET saldo = $2 WHERE guild_id = $1 AND user_id = 1", GUILD_ID, SALDO_INICIAL * 1000)
+        await db.execute_query(
+            "INSERT INTO taxas (guild_id, user_id, status_ciclo, data_entrada) SELECT $1, u, 'PENDENTE', CURRENT_TIMESTAMP - INTERVAL '30 days' FROM unnest($2::BIGINT[]) AS u",
+            GUILD_ID, ids)
+        await db.set_config_value(GUILD_ID, 'cargo_membro', str(self.cargo_membro.id))
+        await db.set_config_value(GUILD_ID, 'cargo_inadimplente', str(self.cargo_inadimplente.id))
+        await db.execute_query("ANALYZE")
+        db.repor_estatisticas()
+
+    async def repor_taxas(self):
+        """Volta a pôr todos os membros como pendentes e com o cargo de membro (antes de cada ciclo de taxas)."""
+        await self.db.execute_query("UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE guild_id = $1", GUILD_ID)
+        for membro in self.membros: membro.roles = [self.cargo_membro]
+
+    def queries(self) -> int:
+        return sum(e.chamadas for e in self.db.estatisticas.values())
+
+    async def versao_servidor(self) -> str:
+        if e_dsn_memoria(self.dsn): return f"SQLite {sqlite3.sqlite_version} (memória)"
+        linha = await self.db.execute_query("SHOW server_version", fetch="one")
+        return f"Postgres {linha['server_version']}"
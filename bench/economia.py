@@ -0,0 +1,186 @@
+"""Benchmarks dos caminhos quentes da economia contra um Postgres local.
+
+    python -m bench.economia [--membros 100,1000,10000] [--operacoes 1000] [--repeticoes 3] [--cargas transferir,airdrop]
+
+Cada carga corre os cogs reais sobre uma guilda falsa (bench/falsos.py) com N membros. Os resultados
+(ops/s, p50/p95 por operação, queries por unidade) são acrescentados a bench_output.txt, para comparar
+execuções ao longo do tempo. Base de dados: BENCH_DATABASE_URL ou um cluster temporário (bench/ambiente.py);
+com BENCH_DATABASE_URL=memoria:// corre sobre o backend SQLite em memória (mede os cogs, não o Postgres)."""
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from functools import partial
+import discord
+from utils.logs import configurar_logs
+from utils.views import OrbeAprovacaoView
+from bench.ambiente import Ambiente, postgres_local, GUILD_ID
+from bench.falsos import ContextoFalso, InteracaoFalsa, MensagemFalsa
+
+SAIDA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench_output.txt')
+
+class Resultado:
+    """Uma carga numa dimensão de guilda: duração de cada operação e unidades processadas (membros)."""
+    def __init__(self, nome: str, membros: int):
+        self.nome, self.membros = nome, membros
+        self.duracoes = []
+        self.unidades = 0
+        self.total = 0.0 # Tempo de parede
+        self.queries = 0
+        self.chamadas_api = 0
+
+    def _quantil(self, q: float) -> float:
+        ordenadas = sorted(self.duracoes)
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] if ordenadas else 0.0
+
+    def linha(self) -> str:
+        por_segundo = self.unidades / self.total if self.total else 0.0
+        return (f"{self.nome:<24}{self.membros:>8}{len(self.duracoes):>7}{self.unidades:>9}{por_segundo:>11.1f}"
+                f"{self._quantil(0.5) * 1000:>10.2f}{self._quantil(0.95) * 1000:>10.2f}"
+                f"{self.queries / max(1, self.unidades):>10.2f}{self.chamadas_api / max(1, self.unidades):>9.1f}")
+
+CABECALHO = f"{'carga':<24}{'membros':>8}{'ops':>7}{'unidades':>9}{'unid/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'q/unid':>10}{'api/unid':>9}"
+
+async def medir(nome: str, amb: Ambiente, operacoes: list, unidades_por_op: int = 1, concorrencia: int = 1, antes=None) -> Resultado:
+    """Corre `operacoes` (funções async sem argumentos), no máximo `concorrencia` em simultâneo.
+    `antes` (async, opcional) prepara cada operação e não conta para o tempo."""
+    resultado = Resultado(nome, amb.n_membros)
+    queries, api = amb.queries(), amb.guilda.chamadas_api
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def correr(operacao):
+        async with semaforo:
+            inicio = time.perf_counter()
+            await operacao()
+            resultado.duracoes.append(time.perf_counter() - inicio)
+
+    inicio, preparacao = time.perf_counter(), 0
+    if antes is None and concorrencia > 1:
+        await asyncio.gather(*(correr(op) for op in operacoes))
+        resultado.total = time.perf_counter() - inicio
+    else:
+        for operacao in operacoes:
+            if antes:
+                antes_queries = amb.queries()
+                await antes()
+                preparacao += amb.queries() - antes_queries
+            await correr(operacao)
+        resultado.total = sum(resultado.duracoes)
+    resultado.unidades = len(operacoes) * unidades_por_op
+    resultado.queries = amb.queries() - queries - preparacao
+    resultado.chamadas_api = amb.guilda.chamadas_api - api
+    return resultado
+
+# --- Cargas ---
+
+async def carga_transferir(amb, n_ops, repeticoes, concorrencia):
+    economia = amb.cog('Economia')
+    membros = amb.membros
+    ops = [partial(economia.transferir.callback, economia, ContextoFalso(amb.bot, amb.guilda, membros[i]), membros[(i + 1) % len(membros)], 10)
+           for i in range(n_ops)]
+    return await medir('transferir', amb, ops, concorrencia=concorrencia)
+
+async def carga_tesouro(amb, n_ops, repeticoes, concorrencia):
+    economia = amb.cog('Economia')
+    ops = [partial(economia.transferir_do_tesouro, GUILD_ID, amb.membros[i].id, 1, "Benchmark") for i in range(n_ops)]
+    return await medir('transferir_do_tesouro', amb, ops, concorrencia=concorrencia)
+
+async def carga_mensagens(amb, n_ops, repeticoes, concorrencia):
+    # Uma mensagem por membro (membros diferentes, logo sem cooldown): cada uma paga renda passiva
+    engajamento = amb.cog('Engajamento')
+    engajamento.chat_cooldowns.clear()
+    ops = [partial(engajamento.on_message, MensagemFalsa(amb.guilda, amb.membros[i], "olá a todos")) for i in range(n_ops)]
+    return await medir('on_message', amb, ops, concorrencia=concorrencia)
+
+async def carga_voz(amb, n_ops, repeticoes, concorrencia):
+    engajamento = amb.cog('Engajamento')
+    ops = [engajamento.recompensar_voz for _ in range(repeticoes)]
+    return await medir('varrimento_voz', amb, ops, unidades_por_op=len(amb.membros))
+
+async def carga_orbes(amb, n_ops, repeticoes, concorrencia):
+    # Submissões pendentes de grupos de 5 membros, uma por operação
+    mensagens = [10**15 + i for i in range(n_ops)]
+    autores = [amb.membros[i].id for i in range(n_ops)]
+    submissoes = await amb.db.execute_query(
+        "INSERT INTO submissoes_orbe (guild_id, message_id, cor, valor_total, autor_id, status) "
+        "SELECT $1, m, 'azul', 500, a, 'pendente' FROM unnest($2::BIGINT[], $3::BIGINT[]) AS s(m, a) RETURNING id, autor_id",
+        GUILD_ID, mensagens, autores, fetch="all")
+    ids = {m.id: i for i, m in enumerate(amb.membros)}
+    pares = [(s['id'], amb.membros[(ids[s['autor_id']] + k) % len(amb.membros)].id) for s in submissoes for k in range(5)]
+    await amb.db.execute_query(
+        "INSERT INTO orbe_participantes (submissao_id, user_id, valor) SELECT s, u, 100 FROM unnest($1::INT[], $2::BIGINT[]) AS p(s, u) ON CONFLICT DO NOTHING",
+        [p[0] for p in pares], [p[1] for p in pares])
+
+    view = OrbeAprovacaoView(amb.bot)
+    def interacao(message_id):
+        embed = discord.Embed(title="Submissão de Orbe", description="Grupo de 5 membros")
+        return InteracaoFalsa(amb.bot, amb.guilda, amb.moderador, MensagemFalsa(amb.guilda, embeds=[embed], id=message_id))
+    ops = [partial(view.handle_interaction, interacao(m), "aprovado") for m in mensagens]
+    return await medir('aprovacao_orbe', amb, ops, concorrencia=concorrencia)
+
+async def carga_airdrop(amb, n_ops, repeticoes, concorrencia):
+    utilidades = amb.cog('Utilidades')
+    ctx = ContextoFalso(amb.bot, amb.guilda, amb.moderador)
+    ops = [partial(utilidades.airdrop.callback, utilidades, ctx, 1) for _ in range(repeticoes)]
+    # O moderador também é membro da guilda e recebe o airdrop
+    return await medir('airdrop', amb, ops, unidades_por_op=len(amb.guilda.members))
+
+async def carga_ciclo_taxas(amb, n_ops, repeticoes, concorrencia):
+    taxas = amb.cog('Taxas')
+    ops = [partial(taxas.executar_ciclo_de_taxas, amb.guilda, resetar_ciclo=True) for _ in range(repeticoes)]
+    return await medir('ciclo_de_taxas', amb, ops, unidades_por_op=len(amb.membros), antes=amb.repor_taxas)
+
+CARGAS = {
+    'transferir': carga_transferir,
+    'tesouro': carga_tesouro,
+    'mensagens': carga_mensagens,
+    'voz': carga_voz,
+    'orbes': carga_orbes,
+    'airdrop': carga_airdrop,
+    'taxas': carga_ciclo_taxas,
+}
+
+def _commit() -> str:
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception: return '?'
+
+async def executar(args):
+    linhas, versao = [], None
+    with postgres_local() as dsn:
+        for n in args.membros:
+            async with Ambiente(dsn, n) as amb:
+                versao = versao or await amb.versao_servidor()
+                for nome in args.cargas:
+                    n_ops = min(n, args.operacoes)
+                    resultado = await CARGAS[nome](amb, n_ops, args.repeticoes, args.concorrencia)
+                    linhas.append(resultado.linha())
+                    print(linhas[-1], flush=True)
+    cabecalho = (f"# {datetime.now(timezone.utc).isoformat(timespec='seconds')} commit {_commit()} | Python {platform.python_version()} | "
+                 f"{versao} | concorrência {args.concorrencia}, repetições {args.repeticoes}")
+    with open(args.saida, 'a', encoding='utf-8') as f:
+        f.write("\n".join([cabecalho, CABECALHO, *linhas]) + "\n\n")
+    print(f"Resultados acrescentados a {args.saida}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes da economia.")
+    parser.add_argument('--membros', default='100,1000,10000', type=lambda s: [int(x) for x in s.split(',')],
+                        help="dimensões da guilda a medir (separadas por vírgulas)")
+    parser.add_argument('--operacoes', type=int, default=1000, help="máximo de operações por carga (transferências, mensagens, aprovações)")
+    parser.add_argument('--repeticoes', type=int, default=3, help="execuções das cargas que percorrem a guilda inteira (voz, airdrop, taxas)")
+    parser.add_argument('--concorrencia', type=int, default=1, help="operações em simultâneo nas cargas por operação")
+    parser.add_argument('--cargas', default=','.join(CARGAS), type=lambda s: s.split(','), help=f"subconjunto de: {', '.join(CARGAS)}")
+    parser.add_argument('--saida', default=SAIDA)
+    args = parser.parse_args()
+    desconhecidas = set(args.cargas) - set(CARGAS)
+    if desconhecidas: parser.error(f"cargas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    configurar_logs('WARNING')
+    logging.getLogger('discord').setLevel(logging.ERROR) # Avisos de voz/gateway sem significado fora do Discord
+    print(CABECALHO)
+    asyncio.run(executar(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import itertools
+import discord
+
+# Objetos do gateway falsos: os cogs reais correm sobre eles sem ligação ao Discord.
+# As chamadas à API (enviar, editar, mudar cargos) não fazem nada; só são contadas em `guilda.chamadas_api`.
+
+_IDS = itertools.count(10**18)
+
+class CargoFalso:
+    def __init__(self, guild, id: int, name: str):
+        self.guild, self.id, self.name = guild, id, name
+        self.mention = f"<@&{id}>"
+
+    @property
+    def members(self):
+        return [m for m in self.guild.members if self in m.roles]
+
+class EstadoVozFalso:
+    def __init__(self, channel):
+        self.channel = channel
+        self.self_deaf = self.self_mute = False
+
+class MembroFalso(discord.Member):
+    # No discord.Member estes atributos são propriedades sobre o utilizador interno; aqui são atributos simples
+    id = name = display_name = display_avatar = mention = bot = guild = roles = voice = guild_permissions = None
+
+    def __init__(self, guild, id: int, roles=(), admin: bool = False, bot: bool = False):
+        self.guild, self.id, self.bot = guild, id, bot
+        self.name = self.display_name = f"membro{id % 100000}"
+        self.mention = f"<@{id}>"
+        self.display_avatar = _AvatarFalso(id)
+        self.roles = list(roles)
+        self.voice = None
+        self.guild_permissions = discord.Permissions(administrator=admin)
+
+    def __hash__(self): return hash(self.id)
+    def __repr__(self): return f"<MembroFalso id={self.id}>"
+
+    async def add_roles(self, *cargos, reason=None):
+        self.guild.chamadas_api += 1
+        self.roles.extend(c for c in cargos if c not in self.roles)
+
+    async def remove_roles(self, *cargos, reason=None):
+        self.guild.chamadas_api += 1
+        self.roles = [c for c in self.roles if c not in cargos]
+
+    async def send(self, *args, **kwargs):
+        self.guild.chamadas_api += 1
+
+class _AvatarFalso:
+    def __init__(self, id: int): self.url = f"https://cdn.discordapp.com/embed/avatars/{id % 6}.png"
+
+class AnexoFalso:
+    def __init__(self, dados: bytes, content_type: str = 'image/png'):
+        self.id = next(_IDS)
+        self.dados, self.content_type = dados, content_type
+        self.url = f"https://cdn.discordapp.com/attachments/{self.id}/print.png"
+
+    async def read(self): return self.dados
+
+class MensagemFalsa:
+    def __init__(self, guild, author=None, content: str = "", channel=None, embeds=None, id: int = None, attachments=None):
+        self.id = id or next(_IDS)
+        self.guild, self.author, self.content, self.channel = guild, author, content, channel
+        self.embeds = embeds or []
+        self.attachments = attachments or []
+        self.pinned = False
+
+    async def edit(self, **kwargs):
+        self.guild.chamadas_api += 1
+        if kwargs.get('embed') is not None: self.embeds = [kwargs['embed']]
+
+    async def delete(self, *args, **kwargs): self.guild.chamadas_api += 1
+    async def pin(self, *args, **kwargs): self.guild.chamadas_api += 1
+    async def add_reaction(self, *args): self.guild.chamadas_api += 1
+
+class CanalFalso:
+    def __init__(self, guild, id: int, name: str, members=None):
+        self.guild, self.id, self.name = guild, id, name
+        self.mention = f"<#{id}>"
+        self.members = members if members is not None else []
+
+    def permissions_for(self, membro):
+        return discord.Permissions(send_messages=True)
+
+    async def send(self, content=None, **kwargs):
+        self.guild.chamadas_api += 1
+        return MensagemFalsa(self.guild, content=content or "", channel=self, embeds=[kwargs['embed']] if kwargs.get('embed') else None)
+
+class GuildaFalsa:
+    def __init__(self, id: int, name: str = "Guilda de testes"):
+        self.id, self.name = id, name
+        self.members = []
+        self.voice_channels = []
+        self._membros, self._cargos, self._canais = {}, {}, {}
+        self.chamadas_api = 0
+
+    def criar_cargo(self, name: str) -> CargoFalso:
+        cargo = CargoFalso(self, next(_IDS), name)
+        self._cargos[cargo.id] = cargo
+        return cargo
+
+    def criar_canal(self, name: str, members=None) -> CanalFalso:
+        canal = CanalFalso(self, next(_IDS), name, members)
+        self._canais[canal.id] = canal
+        return canal
+
+    def adicionar_membro(self, id: int, roles=(), admin: bool = False) -> MembroFalso:
+        membro = MembroFalso(self, id, roles, admin)
+        self.members.append(membro)
+        self._membros[id] = membro
+        return membro
+
+    def colocar_em_voz(self, membros, por_canal: int = 25):
+        for inicio in range(0, len(membros), por_canal):
+            canal = self.criar_canal(f"voz-{inicio // por_canal}", membros[inicio:inicio + por_canal])
+            self.voice_channels.append(canal)
+            for membro in canal.members: membro.voice = EstadoVozFalso(canal)
+
+    def get_member(self, id): return self._membros.get(id)
+    def get_role(self, id): return self._cargos.get(id)
+    def get_channel(self, id): return self._canais.get(id)
+
+class ContextoFalso:
+    """Substitui o commands.Context nas chamadas diretas aos comandos (`comando.callback(cog, ctx, ...)`)."""
+    def __init__(self, bot, guild, author, channel=None, attachments=None):
+        self.bot, self.guild, self.author = bot, guild, author
+        self.channel = channel or guild.criar_canal("comandos")
+        self.message = MensagemFalsa(guild, author, channel=self.channel, attachments=attachments)
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+class _RespostaFalsa:
+    def __init__(self, guild):
+        self.guild = guild
+        self._feita = False
+
+    def is_done(self): return self._feita
+
+    async def defer(self, *args, **kwargs): self._feita = True
+    async def send_message(self, *args, **kwargs):
+        self._feita = True
+        self.guild.chamadas_api += 1
+
+class _SeguimentoFalso:
+    def __init__(self, guild): self.guild = guild
+    async def send(self, *args, **kwargs): self.guild.chamadas_api += 1
+
+class InteracaoFalsa:
+    """Clique num botão de uma View: `user` clicou na mensagem `message`."""
+    def __init__(self, client, guild, user, message):
+        self.client, self.guild, self.user, self.message = client, guild, user, message
+        self.guild_id = guild.id
+        self.response = _RespostaFalsa(guild)
+        self.followup = _SeguimentoFalso(guild)
+
+    async def edit_original_response(self, **kwargs):
+        await self.message.edit(**kwargs)
+
+class ReacaoFalsa:
+    """Payload de on_raw_reaction_add."""
+    def __init__(self, guild, member, channel_id: int, message_id: int, emoji: str = "👍"):
+        self.guild_id, self.member, self.user_id = guild.id, member, member.id
+        self.channel_id, self.message_id, self.emoji = channel_id, message_id, emoji
@@ -0,0 +1,326 @@
+"""Simulador de tráfego de uma guilda: conduz os cogs reais com eventos sintéticos do gateway.
+
+    python -m bench.simulador [--cenario noite_de_raide|dia_de_taxas|ficheiro.json] [--membros 1000] [--escala 1.0]
+
+Um cenário é uma lista de fases; cada fase dura `duracao` segundos e gera cada tipo de evento com
+chegadas de Poisson à taxa indicada (eventos/s). `no_inicio` dispara eventos uma vez no início da fase.
+Exemplo de ficheiro JSON:
+
+    {"nome": "hora_de_ponta", "fases": [
+        {"nome": "pico", "duracao": 30, "eventos": {"conversa": 80, "voz": 5, "saldo": 10}, "no_inicio": ["varrimento_voz"]}
+    ]}
+
+Por fase e tipo de evento: eventos/s concluídos, latência p50/p95/p99, idas à BD e chamadas à API por
+evento; e ainda o lag do event loop (VigiaLoop), a espera média por conexões e o estado da admissão.
+O relatório é impresso e acrescentado a bench_output.txt."""
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+import discord
+from PIL import Image
+from utils.logs import configurar_logs
+from utils.views import OrbeAprovacaoView
+from cogs.eventos import EventoBotao
+from bench.ambiente import Ambiente, postgres_local, GUILD_ID
+from bench.economia import SAIDA, _commit
+from bench.falsos import AnexoFalso, ContextoFalso, EstadoVozFalso, InteracaoFalsa, MensagemFalsa, ReacaoFalsa
+
+CENARIOS = {
+    'noite_de_raide': {'nome': 'noite_de_raide', 'fases': [
+        {'nome': 'aquecimento', 'duracao': 20, 'eventos': {'conversa': 30, 'voz': 4, 'reacao': 5, 'saldo': 2}},
+        {'nome': 'inscricoes', 'duracao': 15, 'eventos': {'inscricao': 60, 'conversa': 40, 'voz': 6}},
+        {'nome': 'raide', 'duracao': 30, 'eventos': {'conversa': 15, 'voz': 2, 'orbe': 1, 'varrimento_voz': 0.1}, 'no_inicio': ['varrimento_voz']},
+        {'nome': 'pos_raide', 'duracao': 20, 'eventos': {'orbe': 3, 'aprovacao': 2, 'conversa': 30, 'saldo': 5, 'saida_voz': 5}},
+    ]},
+    'dia_de_taxas': {'nome': 'dia_de_taxas', 'fases': [
+        {'nome': 'abertura', 'duracao': 15, 'eventos': {'pagar_taxa': 20, 'conversa': 20, 'saldo': 5}},
+        {'nome': 'reset', 'duracao': 20, 'eventos': {'pagar_taxa': 40, 'saldo': 10, 'conversa': 20}, 'no_inicio': ['ciclo_taxas']},
+    ]},
+}
+
+CORES_ORBE = {'verde': 200, 'azul': 500, 'roxa': 1000, 'dourada': 2500}
+
+# Estatísticas do evento em curso (cada evento corre na sua própria tarefa, como no gateway)
+_EVENTO = contextvars.ContextVar('evento_simulado', default=None)
+_ENVIADAS = contextvars.ContextVar('mensagens_enviadas', default=None)
+
+class EstatisticaEvento:
+    def __init__(self):
+        self.enviados = self.concluidos = self.erros = 0
+        self.queries = self.chamadas_api = 0
+        self.duracoes = []
+
+    def quantil(self, q: float) -> float:
+        ordenadas = sorted(self.duracoes)
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] if ordenadas else 0.0
+
+class Fase:
+    def __init__(self, definicao: dict):
+        self.nome = definicao['nome']
+        self.duracao = float(definicao['duracao'])
+        self.taxas = dict(definicao.get('eventos', {}))
+        self.no_inicio = list(definicao.get('no_inicio', []))
+        self.estatisticas = {}
+        self.lag = {}
+        self.bloqueios = 0
+        self.espera_media = 0.0
+        self.admissao = {}
+
+    def estatistica(self, tipo: str) -> EstatisticaEvento:
+        return self.estatisticas.setdefault(tipo, EstatisticaEvento())
+
+def _imagem(rng: random.Random) -> bytes:
+    """Print de orbe sintético: ruído 32x32 (varia o suficiente para não ser sempre duplicado)."""
+    imagem = Image.frombytes('L', (32, 32), bytes(rng.randrange(256) for _ in range(32 * 32)))
+    saida = io.BytesIO()
+    imagem.save(saida, format='PNG')
+    return saida.getvalue()
+
+class Simulador:
+    def __init__(self, amb: Ambiente, cenario: dict, escala: float = 1.0, tempo: float = 1.0, semente: int = 42):
+        self.amb = amb
+        self.bot, self.guilda, self.db = amb.bot, amb.guilda, amb.db
+        self.nome = cenario['nome']
+        self.fases = [Fase(f) for f in cenario['fases']]
+        self.escala, self.tempo = escala, tempo
+        self.rng = random.Random(semente)
+        self.tarefas = set()
+        self.orbes_pendentes = []
+        self.queries_fora = 0 # Queries sem evento associado (ex: renda passiva adiada pela admissão)
+        self._varrimento = asyncio.Lock()
+        self.acoes = {
+            'conversa': self.conversa, 'voz': self.entrar_voz, 'saida_voz': self.sair_voz, 'varrimento_voz': self.varrimento_voz,
+            'reacao': self.reacao, 'inscricao': self.inscricao, 'orbe': self.orbe, 'aprovacao': self.aprovacao,
+            'saldo': self.saldo, 'pagar_taxa': self.pagar_taxa, 'ciclo_taxas': self.ciclo_taxas,
+        }
+        desconhecidos = {t for f in self.fases for t in [*f.taxas, *f.no_inicio]} - set(self.acoes)
+        if desconhecidos: raise ValueError(f"Tipos de evento desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    async def preparar(self):
+        g, db = self.guilda, self.db
+        self.canal_conversa = g.criar_canal("bate-papo")
+        self.canal_anuncios = g.criar_canal("anuncios")
+        self.canal_aprovacao = g.criar_canal("aprovacao")
+        self.canal_comandos = g.criar_canal("comandos")
+        self.anuncios = [MensagemFalsa(g, channel=self.canal_anuncios).id for _ in range(3)]
+        for chave, valor in [('canal_anuncios', self.canal_anuncios.id), ('canal_aprovacao', self.canal_aprovacao.id),
+                             *((f'orbe_{cor}', v) for cor, v in CORES_ORBE.items())]:
+            await db.set_config_value(GUILD_ID, chave, str(valor))
+        evento = await db.execute_query(
+            "INSERT INTO eventos (guild_id, nome, tipo_evento, data_evento, max_participantes, criador_id) VALUES ($1, 'Raide', 'ZvZ', $2, 200, $3) RETURNING id",
+            GUILD_ID, datetime.now(timezone.utc) + timedelta(days=1), self.amb.moderador.id, fetch="one")
+        self.evento_id = evento['id']
+        self.mensagem_evento = MensagemFalsa(g, channel=g.criar_canal("eventos"))
+        self.imagens = [_imagem(self.rng) for _ in range(20)]
+
+        # Conta as idas à BD por evento (a contextvar é a do evento que originou a query)
+        # (_executar é o caminho comum de execute_query, executar, transações e escritas em massa)
+        original = db._executar
+        async def contada(*args, **kwargs):
+            estatistica = _EVENTO.get()
+            if estatistica is None: self.queries_fora += 1
+            else: estatistica.queries += 1
+            return await original(*args, **kwargs)
+        db._executar = contada
+
+        # Guarda as mensagens publicadas no canal de aprovação pelo evento que as enviou (IDs das submissões de orbe)
+        enviar = self.canal_aprovacao.send
+        async def enviar_registada(*args, **kwargs):
+            mensagem = await enviar(*args, **kwargs)
+            enviadas = _ENVIADAS.get()
+            if enviadas is not None: enviadas.append(mensagem.id)
+            return mensagem
+        self.canal_aprovacao.send = enviar_registada
+
+    # --- Eventos ---
+
+    def _membro(self):
+        return self.rng.choice(self.amb.membros)
+
+    async def conversa(self):
+        await self.bot.get_cog('Engajamento').on_message(MensagemFalsa(self.guilda, self._membro(), "bora raide hoje?", channel=self.canal_conversa))
+
+    async def entrar_voz(self):
+        membro = self._membro()
+        if membro.voice: return
+        canal = next((c for c in self.guilda.voice_channels if len(c.members) < 25), None)
+        if canal is None:
+            canal = self.guilda.criar_canal(f"voz-{len(self.guilda.voice_channels)}", [])
+            self.guilda.voice_channels.append(canal)
+        canal.members.append(membro)
+        membro.voice = EstadoVozFalso(canal)
+
+    async def sair_voz(self):
+        membro = self._membro()
+        if not membro.voice: return
+        membro.voice.channel.members.remove(membro)
+        membro.voice = None
+
+    async def varrimento_voz(self):
+        if self._varrimento.locked(): return # Como o tasks.loop, nunca há dois varrimentos em simultâneo
+        async with self._varrimento:
+            await self.bot.get_cog('Engajamento').recompensar_voz()
+
+    async def reacao(self):
+        await self.bot.get_cog('Engajamento').on_raw_reaction_add(
+            ReacaoFalsa(self.guilda, self._membro(), self.canal_anuncios.id, self.rng.choice(self.anuncios)))
+
+    async def inscricao(self):
+        interacao = InteracaoFalsa(self.bot, self.guilda, self._membro(), self.mensagem_evento)
+        acao = 'inscrever' if self.rng.random() < 0.9 else 'desinscrever'
+        await EventoBotao(acao, self.evento_id).callback(interacao)
+
+    async def orbe(self):
+        autor = self._membro()
+        grupo = self.rng.sample(self.amb.membros, 4)
+        ctx = ContextoFalso(self.bot, self.guilda, autor, self.canal_comandos, attachments=[AnexoFalso(self.rng.choice(self.imagens))])
+        orbes = self.bot.get_cog('Orbes')
+        enviadas = []
+        _ENVIADAS.set(enviadas)
+        await orbes.orbe.callback(orbes, ctx, self.rng.choice(list(CORES_ORBE)), grupo)
+        self.orbes_pendentes.extend(enviadas)
+
+    async def aprovacao(self):
+        if not self.orbes_pendentes: return
+        message_id = self.orbes_pendentes.pop(0)
+        embed = discord.Embed(title="🔮 Submissão de Orbe", description="Grupo")
+        interacao = InteracaoFalsa(self.bot, self.guilda, self.amb.moderador, MensagemFalsa(self.guilda, embeds=[embed], id=message_id))
+        await OrbeAprovacaoView(self.bot).handle_interaction(interacao, self.rng.choice(["aprovado", "aprovado", "recusado"]))
+
+    async def saldo(self):
+        economia = self.bot.get_cog('Economia')
+        await economia.saldo.callback(economia, ContextoFalso(self.bot, self.guilda, self._membro(), self.canal_comandos))
+
+    async def pagar_taxa(self):
+        taxas = self.bot.get_cog('Taxas')
+        await taxas.pagar_taxa.callback(taxas, ContextoFalso(self.bot, self.guilda, self._membro(), self.canal_comandos))
+
+    async def ciclo_taxas(self):
+        await self.bot.get_cog('Taxas').executar_ciclo_de_taxas(self.guilda, resetar_ciclo=True)
+
+    # --- Execução ---
+
+    async def _correr(self, fase: Fase, tipo: str):
+        estatistica = fase.estatistica(tipo)
+        _EVENTO.set(estatistica)
+        api = self.guilda.chamadas_api
+        inicio = time.perf_counter()
+        try:
+            await self.acoes[tipo]()
+            estatistica.concluidos += 1
+        except Exception:
+            estatistica.erros += 1
+        finally:
+            estatistica.duracoes.append(time.perf_counter() - inicio)
+            # Aproximação: as chamadas à API de eventos simultâneos também entram aqui
+            estatistica.chamadas_api += self.guilda.chamadas_api - api
+
+    def _disparar(self, fase: Fase, tipo: str):
+        fase.estatistica(tipo).enviados += 1
+        # Uma tarefa por evento, como o discord.py faz para cada evento do gateway
+        tarefa = asyncio.create_task(self._correr(fase, tipo))
+        self.tarefas.add(tarefa)
+        tarefa.add_done_callback(self.tarefas.discard)
+
+    def _agenda(self, fase: Fase) -> list:
+        """Momentos (relativos ao início da fase) de cada evento: chegadas de Poisson por tipo."""
+        duracao, agenda = fase.duracao * self.tempo, []
+        for tipo, taxa in fase.taxas.items():
+            taxa *= self.escala
+            if taxa <= 0: continue
+            t = self.rng.expovariate(taxa)
+            while t < duracao:
+                agenda.append((t, tipo))
+                t += self.rng.expovariate(taxa)
+        return sorted(agenda)
+
+    async def _fase(self, fase: Fase):
+        vigia = self.bot.vigia
+        vigia.amostras.clear()
+        bloqueios = len(vigia.bloqueios)
+        estatisticas = list(self.db.estatisticas.values())
+        chamadas, espera = sum(e.chamadas for e in estatisticas), sum(e.espera_total for e in estatisticas)
+
+        for tipo in fase.no_inicio: self._disparar(fase, tipo)
+        inicio = time.monotonic()
+        for momento, tipo in self._agenda(fase):
+            atraso = inicio + momento - time.monotonic()
+            if atraso > 0: await asyncio.sleep(atraso)
+            self._disparar(fase, tipo)
+        restante = inicio + fase.duracao * self.tempo - time.monotonic()
+        if restante > 0: await asyncio.sleep(restante)
+
+        fase.lag = vigia.percentis()
+        fase.bloqueios = len(vigia.bloqueios) - bloqueios
+        estatisticas = list(self.db.estatisticas.values())
+        chamadas_fase = sum(e.chamadas for e in estatisticas) - chamadas
+        fase.espera_media = (sum(e.espera_total for e in estatisticas) - espera) / chamadas_fase if chamadas_fase else 0.0
+        fase.admissao = {'modo': self.bot.admissao.modo, 'fila': self.bot.admissao.em_fila, **self.bot.admissao.contagens}
+
+    async def executar(self):
+        self.bot.vigia.iniciar()
+        self.bot.admissao.iniciar()
+        try:
+            for fase in self.fases:
+                await self._fase(fase)
+            if self.tarefas: await asyncio.wait(set(self.tarefas))
+        finally:
+            self.bot.admissao.parar()
+            self.bot.vigia.parar()
+
+    def relatorio(self) -> list:
+        linhas = []
+        for fase in self.fases:
+            duracao = fase.duracao * self.tempo
+            lag = fase.lag
+            linhas.append(f"-- fase '{fase.nome}' ({duracao:.0f}s) | lag do loop p50/p95/p99/máx "
+                          f"{lag.get(0.5, 0) * 1000:.1f}/{lag.get(0.95, 0) * 1000:.1f}/{lag.get(0.99, 0) * 1000:.1f}/{lag.get(1.0, 0) * 1000:.1f} ms, "
+                          f"bloqueios {fase.bloqueios}, espera média do pool {fase.espera_media * 1000:.2f} ms | admissão {fase.admissao}")
+            linhas.append(f"   {'evento':<16}{'enviados':>9}{'ok':>7}{'erros':>7}{'ev/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/ev':>7}{'api/ev':>8}")
+            for tipo, e in sorted(fase.estatisticas.items()):
+                linhas.append(f"   {tipo:<16}{e.enviados:>9}{e.concluidos:>7}{e.erros:>7}{e.concluidos / duracao:>9.1f}"
+                              f"{e.quantil(0.5) * 1000:>9.2f}{e.quantil(0.95) * 1000:>9.2f}{e.quantil(0.99) * 1000:>9.2f}"
+                              f"{e.queries / max(1, e.enviados):>7.1f}{e.chamadas_api / max(1, e.enviados):>8.1f}")
+        linhas.append(f"queries fora de eventos (renda passiva adiada, etc.): {self.queries_fora}")
+        return linhas
+
+def carregar_cenario(nome: str) -> dict:
+    if nome in CENARIOS: return CENARIOS[nome]
+    with open(nome, encoding='utf-8') as f:
+        return json.load(f)
+
+async def simular(args):
+    cenario = carregar_cenario(args.cenario)
+    with postgres_local() as dsn:
+        async with Ambiente(dsn, args.membros, em_voz=False) as amb:
+            simulador = Simulador(amb, cenario, args.escala, args.tempo, args.semente)
+            await simulador.preparar()
+            await simulador.executar()
+            cabecalho = (f"# {datetime.now(timezone.utc).isoformat(timespec='seconds')} commit {_commit()} | simulação '{simulador.nome}' | "
+                         f"{args.membros} membros, escala {args.escala}, tempo {args.tempo}, semente {args.semente}")
+            linhas = [cabecalho, *simulador.relatorio()]
+    print("\n".join(linhas))
+    with open(args.saida, 'a', encoding='utf-8') as f:
+        f.write("\n".join(linhas) + "\n\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de tráfego de uma guilda.")
+    parser.add_argument('--cenario', default='noite_de_raide', help=f"{', '.join(CENARIOS)} ou caminho de um ficheiro JSON")
+    parser.add_argument('--membros', type=int, default=1000)
+    parser.add_argument('--escala', type=float, default=1.0, help="multiplica as taxas de todos os eventos")
+    parser.add_argument('--tempo', type=float, default=1.0, help="multiplica a duração de todas as fases")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=SAIDA)
+    args = parser.parse_args()
+    configurar_logs('WARNING')
+    logging.getLogger('discord').setLevel(logging.ERROR)
+    asyncio.run(simular(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
+import logging
 import discord
 from discord.ext import commands
 import asyncio
-from datetime import datetime
+import os
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from utils.permissions import check_permission_level
+from utils.agendador import FUSO_HORARIO
+from utils.db_manager import em_segundo_plano
+from utils import consultas
+from utils.metricas import COMANDOS_LATENCIA, ULTIMAS_TAREFAS, memoria_rss
+from utils.exportacao import ExportacaoGzip, FORMATOS
 from collections import defaultdict
 
+log = logging.getLogger(__name__)
+
 # Dicionário de Configurações Padrão
 DEFAULT_CONFIGS = {
     'lastro_total_prata': '0', 'taxa_conversao_prata': '1000',
@@ -23,47 +34,181 @@ DEFAULT_CONFIGS = {
     'taxa_mensagem_reset': '⚠️ Hoje é o dia do reset das taxas! Este é o último dia para efetuar o pagamento e evitar a restrição de acesso.',
     'taxa_mensagem_fechamento': '❌ A janela de pagamento de taxas está **FECHADA**. O canal será limpo em breve.',
     'recompensa_voz': '1', 'limite_voz': '120', 'recompensa_chat': '1', 'limite_chat': '100', 'cooldown_chat': '60', 'recompensa_reacao': '50',
+    'evento_lembretes_minutos': '60,10', # Antecedências (em minutos) dos lembretes de eventos
+}
+
+# Tabelas com dados por guilda e as colunas (além de guild_id) da sua chave primária.
+# Usado para atribuir a uma guilda os dados anteriores ao suporte multi-guilda (guild_id = 0).
+TABELAS_POR_GUILDA = {
+    'banco': ('user_id',), 'configuracoes': ('chave',), 'taxas': ('user_id',),
+    'renda_passiva_log': ('user_id', 'tipo', 'data'), 'reacoes_anuncios': ('user_id', 'message_id'),
+    'transacoes': None, 'taxa_ciclos': None, 'submissoes_orbe': None, 'submissoes_taxa': None,
+    'loja': None, 'eventos': None,
 }
 
+# Colunas do !exportar-transacoes (user_id em texto: as folhas de cálculo arredondam inteiros com mais de 15 algarismos)
+COLUNAS_EXPORTACAO = ('id', 'data', 'user_id', 'membro', 'tipo', 'valor', 'descricao')
+
+def _data(texto: str):
+    """Conversor dos argumentos de data dos comandos (AAAA-MM-DD)."""
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.ID_TESOURO_GUILDA = 1
 
+    async def _garantir_guild_id(self, tabela: str, chave_primaria: tuple = None):
+        """Migração multi-guilda: acrescenta guild_id às tabelas antigas (0 = dados legados ainda
+        por atribuir) e refaz a chave primária para incluir a guilda."""
+        existe = await self.bot.db_manager.execute_query(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = $1 AND column_name = 'guild_id'", tabela, fetch="one"
+        )
+        if existe: return
+        await self.bot.db_manager.execute_query(f"ALTER TABLE {tabela} ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0")
+        await self.bot.db_manager.execute_query(f"ALTER TABLE {tabela} ALTER COLUMN guild_id DROP DEFAULT")
+        if chave_primaria:
+            await self.bot.db_manager.execute_query(f"ALTER TABLE {tabela} DROP CONSTRAINT IF EXISTS {tabela}_pkey")
+            await self.bot.db_manager.execute_query(f"ALTER TABLE {tabela} ADD PRIMARY KEY (guild_id, {', '.join(chave_primaria)})")
+        log.info("Migração multi-guilda: coluna guild_id adicionada a '%s'.", tabela)
+
     async def initialize_database_schema(self):
         try:
-            # Cria/Verifica Tabelas Essenciais
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS banco (user_id BIGINT PRIMARY KEY, saldo BIGINT NOT NULL DEFAULT 0)")
-            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS transacoes (id SERIAL PRIMARY KEY, user_id BIGINT NOT NULL, tipo TEXT NOT NULL, valor BIGINT NOT NULL, descricao TEXT, data TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP)""")
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS configuracoes (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
-            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS taxas (user_id BIGINT PRIMARY KEY, status_ciclo TEXT DEFAULT 'PENDENTE', data_entrada TIMESTAMPTZ)""")
+            # Cria/Verifica Tabelas Essenciais (todas as tabelas de dados são separadas por guild_id)
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS banco (guild_id BIGINT NOT NULL, user_id BIGINT NOT NULL, saldo BIGINT NOT NULL DEFAULT 0, PRIMARY KEY (guild_id, user_id))")
+            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS transacoes (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, user_id BIGINT NOT NULL, tipo TEXT NOT NULL, valor BIGINT NOT NULL, descricao TEXT, data TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP)""")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS configuracoes (guild_id BIGINT NOT NULL, chave TEXT NOT NULL, valor TEXT NOT NULL, PRIMARY KEY (guild_id, chave))")
+            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS taxas (guild_id BIGINT NOT NULL, user_id BIGINT NOT NULL, status_ciclo TEXT DEFAULT 'PENDENTE', data_entrada TIMESTAMPTZ, PRIMARY KEY (guild_id, user_id))""")
             try: # Garante compatibilidade
                 await self.bot.db_manager.execute_query("ALTER TABLE taxas ADD COLUMN IF NOT EXISTS status_ciclo TEXT DEFAULT 'PENDENTE'")
                 await self.bot.db_manager.execute_query("ALTER TABLE taxas ADD COLUMN IF NOT EXISTS data_entrada TIMESTAMPTZ")
-            except Exception as e: print(f"Nota (taxas): {e}")
-
-            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS submissoes_orbe (id SERIAL PRIMARY KEY, message_id BIGINT, cor TEXT NOT NULL, valor_total INTEGER NOT NULL, autor_id BIGINT, membros TEXT, status TEXT DEFAULT 'pendente')""")
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS loja (id SERIAL PRIMARY KEY, nome TEXT NOT NULL, preco INTEGER NOT NULL, descricao TEXT)")
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS renda_passiva_log (user_id BIGINT, tipo TEXT, data DATE, valor INTEGER, PRIMARY KEY (user_id, tipo, data))")
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS submissoes_taxa (id SERIAL PRIMARY KEY, message_id BIGINT, user_id BIGINT, status TEXT, anexo_url TEXT)")
+            except Exception as e: log.warning("Nota (taxas): %s", e)
+            await self._garantir_guild_id('banco', ('user_id',))
+            await self._garantir_guild_id('transacoes')
+            await self._garantir_guild_id('configuracoes', ('chave',))
+            await self._garantir_guild_id('taxas', ('user_id',))
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_transacoes_guild_user_data ON transacoes (guild_id, user_id, data)")
+
+            # Ciclos de taxa (um ciclo aberto por guilda) e pagamentos por ciclo (escritos no momento do pagamento)
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS taxa_ciclos (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, inicio TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP, fim TIMESTAMPTZ)")
+            await self._garantir_guild_id('taxa_ciclos')
+            await self.bot.db_manager.execute_query("DROP INDEX IF EXISTS idx_taxa_ciclos_aberto")
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_taxa_ciclos_guild_aberto ON taxa_ciclos (guild_id, id) WHERE fim IS NULL")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS taxa_pagamentos (ciclo_id INTEGER NOT NULL REFERENCES taxa_ciclos(id), user_id BIGINT NOT NULL, metodo TEXT NOT NULL, ref TEXT, valor BIGINT, data TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (ciclo_id, user_id))")
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_taxa_pagamentos_user ON taxa_pagamentos (user_id, ciclo_id)")
+
+            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS submissoes_orbe (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, message_id BIGINT, cor TEXT NOT NULL, valor_total INTEGER NOT NULL, autor_id BIGINT, membros TEXT, status TEXT DEFAULT 'pendente')""")
+            await self._garantir_guild_id('submissoes_orbe')
+            await self.bot.db_manager.execute_query("ALTER TABLE submissoes_orbe ADD COLUMN IF NOT EXISTS data_submissao TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP")
+            await self.bot.db_manager.execute_query("ALTER TABLE submissoes_orbe ADD COLUMN IF NOT EXISTS data_decisao TIMESTAMPTZ")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS orbe_participantes (submissao_id INTEGER NOT NULL REFERENCES submissoes_orbe(id) ON DELETE CASCADE, user_id BIGINT NOT NULL, valor INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (submissao_id, user_id))")
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_orbe_participantes_user ON orbe_participantes (user_id)")
+            await self.bot.db_manager.execute_query("DROP INDEX IF EXISTS idx_submissoes_orbe_status_decisao")
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_submissoes_orbe_guild_status_decisao ON submissoes_orbe (guild_id, status, data_decisao)")
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_submissoes_orbe_message ON submissoes_orbe (message_id)")
+            try: # Migra a coluna legada 'membros' (TEXT separado por vírgulas) para orbe_participantes
+                await self.bot.db_manager.execute_query("""WITH migrados AS (
+                       INSERT INTO orbe_participantes (submissao_id, user_id, valor)
+                       SELECT s.id, m::BIGINT, s.valor_total / cardinality(string_to_array(s.membros, ','))
+                       FROM submissoes_orbe s, unnest(string_to_array(s.membros, ',')) AS m
+                       WHERE s.membros IS NOT NULL AND s.membros <> ''
+                       ON CONFLICT DO NOTHING
+                   )
+                   UPDATE submissoes_orbe SET membros = NULL,
+                          data_decisao = CASE WHEN status <> 'pendente' THEN COALESCE(data_decisao, data_submissao) ELSE data_decisao END
+                   WHERE membros IS NOT NULL""")
+            except Exception as e: log.warning("Nota (orbe_participantes): %s", e)
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS loja (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, nome TEXT NOT NULL, preco INTEGER NOT NULL, descricao TEXT)")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS renda_passiva_log (guild_id BIGINT NOT NULL, user_id BIGINT, tipo TEXT, data DATE, valor INTEGER, PRIMARY KEY (guild_id, user_id, tipo, data))")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS submissoes_taxa (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, message_id BIGINT, user_id BIGINT, status TEXT, anexo_url TEXT)")
+            await self._garantir_guild_id('loja')
+            await self._garantir_guild_id('renda_passiva_log', ('user_id', 'tipo', 'data'))
             try: # Garante compatibilidade
                  await self.bot.db_manager.execute_query("ALTER TABLE submissoes_taxa ADD COLUMN IF NOT EXISTS id SERIAL")
                  await self.bot.db_manager.execute_query("ALTER TABLE submissoes_taxa ADD COLUMN IF NOT EXISTS anexo_url TEXT")
                  await self.bot.db_manager.execute_query("ALTER TABLE submissoes_taxa DROP CONSTRAINT IF EXISTS submissoes_taxa_pkey")
                  await self.bot.db_manager.execute_query("ALTER TABLE submissoes_taxa ADD PRIMARY KEY (id)")
-            except Exception as e: print(f"Nota (submissoes_taxa): {e}")
-            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS reacoes_anuncios (user_id BIGINT, message_id BIGINT, PRIMARY KEY (user_id, message_id))")
-            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS eventos (id SERIAL PRIMARY KEY, nome TEXT NOT NULL, descricao TEXT, tipo_evento TEXT, data_evento TIMESTAMPTZ, recompensa INTEGER DEFAULT 0, max_participantes INTEGER, criador_id BIGINT NOT NULL, message_id BIGINT, status TEXT DEFAULT 'AGENDADO', inscritos BIGINT[] DEFAULT '{}'::BIGINT[], cargo_requerido_id BIGINT, canal_voz_id BIGINT)""")
-
-            # Garante Configs Padrão
-            await self.bot.db_manager.execute_query(
-                 "INSERT INTO configuracoes (chave, valor) SELECT * FROM UNNEST($1::TEXT[], $2::TEXT[]) ON CONFLICT (chave) DO NOTHING",
-                 list(DEFAULT_CONFIGS.keys()), list(DEFAULT_CONFIGS.values())
-            )
-            # Garante Tesouro
-            await self.bot.db_manager.execute_query("INSERT INTO banco (user_id, saldo) VALUES ($1, 0) ON CONFLICT (user_id) DO NOTHING", self.ID_TESOURO_GUILDA)
-            print("Base de dados verificada (Estrutura Final v3.2).")
-        except Exception as e: print(f"❌ Erro CRÍTICO ao inicializar DB: {e}"); raise e
+            except Exception as e: log.warning("Nota (submissoes_taxa): %s", e)
+            await self._garantir_guild_id('submissoes_taxa')
+            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS provas_hash (id SERIAL PRIMARY KEY, origem TEXT NOT NULL, guild_id BIGINT, canal_id BIGINT, message_id BIGINT, user_id BIGINT, anexo_url TEXT, sha256 TEXT NOT NULL, phash BIGINT, p0 INTEGER, p1 INTEGER, p2 INTEGER, p3 INTEGER, data TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP)""")
+            for coluna in ('sha256', 'p0', 'p1', 'p2', 'p3'):
+                await self.bot.db_manager.execute_query(f"CREATE INDEX IF NOT EXISTS idx_provas_hash_{coluna} ON provas_hash ({coluna})")
+            await self.bot.db_manager.execute_query("UPDATE provas_hash SET guild_id = 0 WHERE guild_id IS NULL")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS agendamentos (nome TEXT PRIMARY KEY, ultima_execucao TIMESTAMPTZ)")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS reacoes_anuncios (guild_id BIGINT NOT NULL, user_id BIGINT, message_id BIGINT, PRIMARY KEY (guild_id, user_id, message_id))")
+            await self._garantir_guild_id('reacoes_anuncios', ('user_id', 'message_id'))
+            await self.bot.db_manager.execute_query("""CREATE TABLE IF NOT EXISTS eventos (id SERIAL PRIMARY KEY, guild_id BIGINT NOT NULL, nome TEXT NOT NULL, descricao TEXT, tipo_evento TEXT, data_evento TIMESTAMPTZ, recompensa INTEGER DEFAULT 0, max_participantes INTEGER, criador_id BIGINT NOT NULL, message_id BIGINT, status TEXT DEFAULT 'AGENDADO', inscritos BIGINT[] DEFAULT '{}'::BIGINT[], cargo_requerido_id BIGINT, canal_voz_id BIGINT)""")
+            await self._garantir_guild_id('eventos')
+            await self.bot.db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_eventos_status_data ON eventos (status, data_evento)")
+            await self.bot.db_manager.execute_query("CREATE TABLE IF NOT EXISTS eventos_lembretes (evento_id INTEGER NOT NULL, minutos INTEGER NOT NULL, enviado_em TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (evento_id, minutos))")
+
+            # Configurações padrão, tesouro e ciclo de taxas são criados por guilda (ver preparar_guilda)
+            log.info("Base de dados verificada (Estrutura Final v3.3, multi-guilda).")
+        except Exception as e: log.error("❌ Erro CRÍTICO ao inicializar DB: %s", e); raise e
+
+    async def atribuir_dados_legados(self):
+        """Atribui os dados anteriores ao suporte multi-guilda (guild_id = 0) à guilda onde o bot corria:
+        a única guilda do bot, ou a indicada em GUILD_ID_LEGADO quando o bot está em várias."""
+        legado = await self.bot.db_manager.execute_query("SELECT 1 FROM banco WHERE guild_id = 0 UNION ALL SELECT 1 FROM configuracoes WHERE guild_id = 0 LIMIT 1", fetch="one")
+        if not legado: return
+        guild_id = int(os.getenv('GUILD_ID_LEGADO', '0') or 0) or (self.bot.guilds[0].id if len(self.bot.guilds) == 1 else 0)
+        if not guild_id:
+            return log.warning("⚠️ Existem dados sem guilda (anteriores ao multi-guilda) e o bot está em várias guildas. Defina GUILD_ID_LEGADO para os atribuir.")
+
+        for tabela, chave in TABELAS_POR_GUILDA.items():
+            # Nunca sobrepõe linhas que a guilda já tenha com a mesma chave
+            condicao = ""
+            if chave:
+                condicao = f" AND NOT EXISTS (SELECT 1 FROM {tabela} d WHERE d.guild_id = $1 AND " + " AND ".join(f"d.{c} = {tabela}.{c}" for c in chave) + ")"
+            await self.bot.db_manager.execute_query(f"UPDATE {tabela} SET guild_id = $1 WHERE guild_id = 0{condicao}", guild_id)
+        await self.bot.db_manager.execute_query("UPDATE provas_hash SET guild_id = $1 WHERE guild_id = 0", guild_id)
+        self.bot.db_manager.invalidar_cache_configs()
+        log.info("Dados legados atribuídos à guilda %s.", guild_id)
+
+    async def preparar_guilda(self, guild_id: int):
+        """Garante as configurações padrão, o tesouro e o ciclo de taxas aberto de uma guilda."""
+        await self.bot.db_manager.execute_query(
+             "INSERT INTO configuracoes (guild_id, chave, valor) SELECT $1::BIGINT, * FROM UNNEST($2::TEXT[], $3::TEXT[]) ON CONFLICT (guild_id, chave) DO NOTHING",
+             guild_id, list(DEFAULT_CONFIGS.keys()), list(DEFAULT_CONFIGS.values())
+        )
+        # Cada guilda tem o seu próprio tesouro
+        await self.bot.db_manager.executar(consultas.CRIAR_CONTA, guild_id, self.ID_TESOURO_GUILDA)
+        # Primeiro arranque da guilda: abre o ciclo atual e importa quem já consta como pago
+        await self.bot.db_manager.execute_query("""WITH novo AS (
+               INSERT INTO taxa_ciclos (guild_id, inicio) SELECT $1::BIGINT, CURRENT_TIMESTAMP
+               WHERE NOT EXISTS (SELECT 1 FROM taxa_ciclos WHERE guild_id = $1) RETURNING id
+           )
+           INSERT INTO taxa_pagamentos (ciclo_id, user_id, metodo, ref)
+           SELECT novo.id, t.user_id, 'legado', t.status_ciclo FROM novo, taxas t WHERE t.guild_id = $1 AND t.status_ciclo LIKE 'PAGO_%'""",
+           guild_id
+        )
+        self.bot.db_manager.invalidar_cache_configs(guild_id)
+
+    async def preparar_guildas(self):
+        async with self.bot.db_manager.advisory_lock("preparar_guildas") as obtido:
+            if not obtido: return
+            try: await self.atribuir_dados_legados()
+            except Exception as e: log.error("Erro ao atribuir dados legados: %s", e)
+            for guild in self.bot.guilds:
+                try: await self.preparar_guilda(guild.id)
+                except Exception as e: log.error("Erro ao preparar a guilda %s: %s", guild.id, e)
+        log.info("%s guilda(s) preparada(s).", len(self.bot.guilds))
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.bot.e_lider: return
+        with em_segundo_plano(): await self.preparar_guildas()
+
+    @commands.Cog.listener()
+    async def on_lideranca_obtida(self):
+        # Enquanto em standby, outro processo pode ter alterado configurações
+        self.bot.db_manager.invalidar_cache_configs()
+        if not self.bot.is_ready(): return
+        with em_segundo_plano(): await self.preparar_guildas()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        if self.bot.e_lider: await self.preparar_guilda(guild.id)
 
     @commands.command(name='initdb', hidden=True)
     @commands.is_owner()
@@ -78,7 +223,7 @@ class Admin(commands.Cog):
             channel = await category.create_text_channel(name, overwrites=overwrites or {})
             await asyncio.sleep(1.5) # Pausa para garantir que o canal está totalmente criado
             msg = await channel.send(embed=embed); await msg.pin()
-            if set_config_key: await self.bot.db_manager.set_config_value(set_config_key, str(channel.id))
+            if set_config_key: await self.bot.db_manager.set_config_value(ctx.guild.id, set_config_key, str(channel.id))
             return channel
         except Exception as e: await ctx.send(f"⚠️ Erro ao criar canal `{name}`: {e}")
 
@@ -102,9 +247,9 @@ class Admin(commands.Cog):
             if category := discord.utils.get(guild.categories, name=cat_name):
                 for channel in category.channels: 
                     try: await channel.delete()
-                    except Exception as e: print(f"Não foi possível apagar o canal {channel.name}: {e}")
+                    except Exception as e: log.warning("Não foi possível apagar o canal %s: %s", channel.name, e)
                 try: await category.delete()
-                except Exception as e: print(f"Não foi possível apagar a categoria {category.name}: {e}")
+                except Exception as e: log.warning("Não foi possível apagar a categoria %s: %s", category.name, e)
                 await asyncio.sleep(1.5)
         
         await msg_progresso.edit(content="🔥 Estrutura antiga removida. A criar a nova...")
@@ -112,7 +257,7 @@ class Admin(commands.Cog):
         # Permissões para canais de staff (Nível 1-4)
         perm_roles_ids = set()
         for i in range(1, 5):
-            role_ids_str = await self.bot.db_manager.get_config_value(f'perm_nivel_{i}', '')
+            role_ids_str = await self.bot.db_manager.get_config_value(guild.id, f'perm_nivel_{i}', '')
             if role_ids_str:
                 perm_roles_ids.update(r_id for r_id in role_ids_str.split(',') if r_id.isdigit())
         
@@ -177,7 +322,7 @@ class Admin(commands.Cog):
     async def cargo_definir(self, ctx, tipo: str, cargo: discord.Role):
         tipos_validos = ['membro', 'inadimplente', 'isento']
         if tipo.lower() not in tipos_validos: return await ctx.send(f"❌ Tipo inválido. Válidos: `{', '.join(tipos_validos)}`")
-        await self.bot.db_manager.set_config_value(f"cargo_{tipo.lower()}", str(cargo.id))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, f"cargo_{tipo.lower()}", str(cargo.id))
         await ctx.send(f"✅ Cargo **{tipo.capitalize()}** definido como {cargo.mention}.")
     @cargo.command(name="permissao", hidden=True)
     @check_permission_level(4)
@@ -185,7 +330,7 @@ class Admin(commands.Cog):
         if not 1 <= nivel <= 4: return await ctx.send("❌ Nível deve ser 1-4.")
         if not cargos: return await ctx.send("❌ Mencione pelo menos um cargo.")
         ids_cargos_str = ",".join(str(c.id) for c in cargos)
-        await self.bot.db_manager.set_config_value(f"perm_nivel_{nivel}", ids_cargos_str)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, f"perm_nivel_{nivel}", ids_cargos_str)
         await ctx.send(f"✅ Cargos associados ao **Nível {nivel}**: {', '.join(c.mention for c in cargos)}.")
     
     @commands.group(name="definircanal", invoke_without_command=True, hidden=True)
@@ -196,7 +341,7 @@ class Admin(commands.Cog):
     async def _definir_canal_generico(self, ctx, tipo, canal):
         chave = f"canal_{tipo}"
         if chave not in DEFAULT_CONFIGS: return await ctx.send("❌ Tipo de canal inválido.")
-        await self.bot.db_manager.set_config_value(chave, str(canal.id))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, chave, str(canal.id))
         await ctx.send(f"✅ Canal para `{tipo}` definido como {canal.mention}.")
     @definir_canal.command(name="planejamento", hidden=True)
     async def definir_canal_planejamento(self, ctx, canal: discord.TextChannel): await self._definir_canal_generico(ctx, "planejamento", canal)
@@ -229,19 +374,19 @@ class Admin(commands.Cog):
         await ctx.send("Use `!definirmsg <tipo> <mensagem>`. Tipos: `taxa_inadimplente`, `taxa_abertura`, `taxa_reset`, `taxa_fechamento`.")
     @definir_msg.command(name="taxa_inadimplente", hidden=True)
     async def definir_msg_taxa_inadimplente(self, ctx, *, mensagem: str):
-        await self.bot.db_manager.set_config_value("taxa_mensagem_inadimplente", mensagem)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, "taxa_mensagem_inadimplente", mensagem)
         await ctx.send(f"✅ Mensagem para inadimplentes definida!\n**Preview:**\n{mensagem.format(member=ctx.author.mention, tax_value=123)}")
     @definir_msg.command(name="taxa_abertura", hidden=True)
     async def definir_msg_taxa_abertura(self, ctx, *, mensagem: str):
-        await self.bot.db_manager.set_config_value("taxa_mensagem_abertura", mensagem)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, "taxa_mensagem_abertura", mensagem)
         await ctx.send(f"✅ Mensagem de abertura definida!\n**Preview:**\n{mensagem}")
     @definir_msg.command(name="taxa_reset", hidden=True)
     async def definir_msg_taxa_reset(self, ctx, *, mensagem: str):
-        await self.bot.db_manager.set_config_value("taxa_mensagem_reset", mensagem)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, "taxa_mensagem_reset", mensagem)
         await ctx.send(f"✅ Mensagem do dia de reset definida!\n**Preview:**\n{mensagem}")
     @definir_msg.command(name="taxa_fechamento", hidden=True)
     async def definir_msg_taxa_fechamento(self, ctx, *, mensagem: str):
-        await self.bot.db_manager.set_config_value("taxa_mensagem_fechamento", mensagem)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, "taxa_mensagem_fechamento", mensagem)
         await ctx.send(f"✅ Mensagem de fechamento definida!\n**Preview:**\n{mensagem}")
 
     @commands.group(name="configtaxa", invoke_without_command=True, hidden=True)
@@ -250,14 +395,14 @@ class Admin(commands.Cog):
     @config_taxa.command(name="moedas", hidden=True)
     async def config_taxa_moedas(self, ctx, estado: str):
         valor_bool = 'true' if estado.lower() == 'on' else 'false'
-        await self.bot.db_manager.set_config_value('taxa_aceitar_moedas', valor_bool)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'taxa_aceitar_moedas', valor_bool)
         await ctx.send(f"✅ Pagamento com moedas (`!pagar-taxa`) **{'ATIVADO' if valor_bool == 'true' else 'DESATIVADO'}**.")
 
     @commands.command(name="verificarconfig", aliases=["verconfig"], hidden=True)
     @check_permission_level(4)
     async def verificar_config(self, ctx):
         await ctx.send("🔍 Gerando relatório completo de configurações...")
-        configs = await self.bot.db_manager.execute_query("SELECT chave, valor FROM configuracoes ORDER BY chave ASC", fetch="all")
+        configs = await self.bot.db_manager.execute_query("SELECT chave, valor FROM configuracoes WHERE guild_id = $1 ORDER BY chave ASC", ctx.guild.id, fetch="all")
         configs_dict = {item['chave']: item['valor'] for item in configs}
 
         embed = discord.Embed(title="⚙️ Painel de Configuração Completo", color=discord.Color.orange())
@@ -270,6 +415,7 @@ class Admin(commands.Cog):
             "Mensagens Taxas": ['taxa_mensagem_inadimplente', 'taxa_mensagem_abertura', 'taxa_mensagem_reset', 'taxa_mensagem_fechamento'],
             "IDs Msgs Relatório Taxas": sorted([k for k in DEFAULT_CONFIGS.keys() if k.startswith('taxa_msg_id_')]),
             "Renda Passiva": ['recompensa_voz', 'limite_voz', 'recompensa_chat', 'limite_chat', 'cooldown_chat', 'recompensa_reacao'],
+            "Eventos": ['evento_lembretes_minutos'],
         }
         known_keys = {k for cat_keys in categorias.values() for k in cat_keys}
         other_keys = sorted([k for k in configs_dict if k not in known_keys and k not in DEFAULT_CONFIGS]) # Apenas extras
@@ -307,7 +453,7 @@ class Admin(commands.Cog):
     @check_permission_level(4)
     async def auditar(self, ctx, membro: discord.Member):
         await ctx.send(f"🔍 A iniciar auditoria para **{membro.display_name}**...")
-        transacoes = await self.bot.db_manager.execute_query("SELECT valor, descricao FROM transacoes WHERE user_id = $1 AND tipo = 'deposito'", membro.id, fetch="all")
+        transacoes = await self.bot.db_manager.execute_query("SELECT valor, descricao FROM transacoes WHERE guild_id = $1 AND user_id = $2 AND tipo = 'deposito'", ctx.guild.id, membro.id, fetch="all")
         if not transacoes: return await ctx.send(f"Nenhum ganho encontrado para {membro.display_name}.")
         categorias = defaultdict(lambda: {'total': 0, 'count': 0})
         for t in transacoes:
@@ -321,7 +467,7 @@ class Admin(commands.Cog):
             elif "emissão" in desc or "airdrop" in desc: cat = 'Administrativo'
             categorias[cat]['total'] += t['valor']
             categorias[cat]['count'] += 1
-        saldo = await self.bot.get_cog('Economia').get_saldo(membro.id)
+        saldo = await self.bot.get_cog('Economia').get_saldo(ctx.guild.id, membro.id)
         embed = discord.Embed(title=f"🕵️‍♂️ Relatório de Auditoria: {membro.display_name}", color=discord.Color.dark_blue())
         embed.set_thumbnail(url=membro.display_avatar.url)
         embed.add_field(name="Saldo Atual", value=f"**{saldo:,}** 🪙", inline=False)
@@ -335,9 +481,9 @@ class Admin(commands.Cog):
         if valor <= 0: return await ctx.send("❌ O valor deve ser positivo.")
         economia_cog = self.bot.get_cog('Economia')
         try:
-            await economia_cog.levantar(membro.id, valor, f"Confisco por {ctx.author.name}")
-            await economia_cog.depositar(self.ID_TESOURO_GUILDA, valor, f"Devolução de confisco de {membro.name}")
-            saldo_final = await economia_cog.get_saldo(membro.id)
+            await economia_cog.transferir_saldo(ctx.guild.id, membro.id, self.ID_TESOURO_GUILDA, valor,
+                                                f"Confisco por {ctx.author.name}", f"Devolução de confisco de {membro.name}")
+            saldo_final = await economia_cog.get_saldo(ctx.guild.id, membro.id)
             embed = discord.Embed(title="⚖️ Correção de Saldo", description=f"O saldo de **{membro.display_name}** foi corrigido.", color=discord.Color.dark_red())
             embed.add_field(name="Valor Confiscado", value=f"**{valor:,}** 🪙", inline=True)
             embed.add_field(name="Saldo Final", value=f"**{saldo_final:,}** 🪙", inline=True)
@@ -345,6 +491,65 @@ class Admin(commands.Cog):
         except ValueError as e: await ctx.send(f"❌ **Falha:** {e}")
         except Exception as e: await ctx.send(f"❌ Erro inesperado: {e}")
 
+    @commands.command(name='exportar-transacoes', hidden=True)
+    @check_permission_level(4)
+    @commands.max_concurrency(1, commands.BucketType.guild)
+    async def exportar_transacoes(self, ctx, de: Optional[_data] = None, ate: Optional[_data] = None,
+                                  membro: Optional[discord.Member] = None, formato: str = 'csv'):
+        """Exporta as transações da guilda (ou de um membro) entre duas datas (AAAA-MM-DD, inclusive, em UTC) em CSV ou JSONL
+        comprimido, dividido em vários ficheiros se passar do limite de upload do servidor."""
+        if formato.lower() not in FORMATOS:
+            return await ctx.send(f"❌ Argumento inválido: `{formato}`. Uso: `!exportar-transacoes [de] [ate] [@membro] [csv|jsonl]`, datas em AAAA-MM-DD.")
+        ate = ate or datetime.now(timezone.utc).date()
+        if de and de > ate: return await ctx.send("❌ A data inicial é posterior à data final.")
+
+        # Pela chave primária: as linhas saem pela ordem do índice, sem ordenar o resultado todo
+        condicoes, params = ["guild_id = $1", "data < $2"], [ctx.guild.id, datetime(ate.year, ate.month, ate.day, tzinfo=timezone.utc) + timedelta(days=1)]
+        if de:
+            params.append(datetime(de.year, de.month, de.day, tzinfo=timezone.utc))
+            condicoes.append(f"data >= ${len(params)}")
+        if membro:
+            params.append(membro.id)
+            condicoes.append(f"user_id = ${len(params)}")
+        # Continua depois do último id exportado ($n+1) e não passa do maior id no início da exportação ($n+2)
+        condicoes += [f"id > ${len(params) + 1}", f"id <= ${len(params) + 2}"]
+        query = f"SELECT id, data, user_id, tipo, valor, descricao FROM transacoes WHERE {' AND '.join(condicoes)} ORDER BY id"
+
+        exportacao = ExportacaoGzip(formato.lower(), COLUNAS_EXPORTACAO, ctx.guild.filesize_limit)
+        nome = f"transacoes_{de or 'inicio'}_{ate}" + (f"_{membro.id}" if membro else "")
+        async def enviar(parte):
+            await ctx.send(file=discord.File(parte, filename=f"{nome}_parte{exportacao.partes}.{exportacao.extensao}"))
+
+        await ctx.send(f"⏳ A exportar as transações {'de ' + membro.display_name if membro else 'da guilda'} até {ate:%d/%m/%Y}...")
+        nomes = {self.ID_TESOURO_GUILDA: "Tesouro"}
+        try:
+            teto = await self.bot.db_manager.execute_query("SELECT max(id) AS id FROM transacoes WHERE guild_id = $1", ctx.guild.id, fetch="one")
+            ultimo_id, teto = 0, (teto['id'] if teto else None) or 0
+            # Cada parte tem o seu cursor, fechado (conexão e retrato da transação devolvidos) antes do upload, que pode
+            # demorar; a parte seguinte recomeça depois do último id. Só uma parte existe de cada vez.
+            while True:
+                parte = None
+                async with aclosing(self.bot.db_manager.percorrer(query, *params, ultimo_id, teto, etiqueta='exportar:transacoes')) as paginas:
+                    async for pagina in paginas:
+                        linhas = []
+                        for t in pagina:
+                            if t['user_id'] not in nomes:
+                                membro_linha = ctx.guild.get_member(t['user_id'])
+                                nomes[t['user_id']] = membro_linha.display_name if membro_linha else ""
+                            linhas.append((t['id'], t['data'].isoformat() if t['data'] else "", str(t['user_id']), nomes[t['user_id']], t['tipo'], t['valor'], t['descricao']))
+                        ultimo_id = pagina[-1]['id']
+                        if parte := exportacao.escrever(linhas): break
+                if not parte: break
+                await enviar(parte)
+            if parte := exportacao.fechar(): await enviar(parte)
+        except Exception as e:
+            if parte := exportacao.fechar(): parte.close()
+            log.error("Erro ao exportar as transações da guilda %s: %s", ctx.guild.id, e)
+            return await ctx.send(f"❌ A exportação falhou ao fim de {exportacao.linhas:,} transações: {e}")
+
+        if not exportacao.linhas: return await ctx.send("Nenhuma transação encontrada nesse período.")
+        await ctx.send(f"✅ **{exportacao.linhas:,}** transações exportadas em {exportacao.partes} ficheiro(s).")
+
     @commands.command(name='testar-engajamento', hidden=True)
     @check_permission_level(4)
     async def testar_engajamento(self, ctx):
@@ -352,10 +557,158 @@ class Admin(commands.Cog):
         if not engajamento_cog: return await ctx.send("❌ Módulo de Engajamento não carregado.")
         try:
             await ctx.send("🚀 A enviar mensagem de engajamento de teste...")
-            await engajamento_cog.enviar_mensagem_engajamento()
+            await engajamento_cog.enviar_engajamento_guilda(ctx.guild)
             await ctx.send("✅ Teste concluído.")
         except Exception as e: await ctx.send(f"❌ Falha no teste: {e}")
 
+    @commands.command(name="agendamentos", hidden=True)
+    @check_permission_level(4)
+    async def agendamentos(self, ctx):
+        agendador = self.bot.agendador
+        agora = datetime.now(timezone.utc)
+        embed = discord.Embed(title="⏱️ Tarefas Agendadas", description=f"Fuso horário: `{FUSO_HORARIO.key}`", color=discord.Color.dark_teal())
+        for tarefa in agendador.tarefas.values():
+            ultima = agendador.ultimas_execucoes.get(tarefa.nome)
+            proxima = await tarefa.proxima_ocorrencia(agora)
+            texto = f"**Última:** {f'<t:{int(ultima.timestamp())}:f>' if ultima else '*nunca*'}\n"
+            texto += f"**Próxima:** {f'<t:{int(proxima.timestamp())}:f>' if proxima else '*sem data*'}"
+            if tarefa.ultima_duracao is not None: texto += f"\n**Duração:** {tarefa.ultima_duracao:.1f}s"
+            if tarefa.nova_tentativa: texto += f"\n**Falhas:** {tarefa.falhas} (nova tentativa <t:{int(tarefa.nova_tentativa.timestamp())}:R>)"
+            embed.add_field(name=tarefa.nome, value=texto, inline=False)
+        if not agendador.tarefas: embed.description += "\nNenhuma tarefa registada."
+        await ctx.send(embed=embed)
+
+    @commands.command(name="rastreios", aliases=["traces"], hidden=True)
+    @check_permission_level(4)
+    async def rastreios(self, ctx, quantidade: int = 5, comando: str = None):
+        rastreador = self.bot.rastreador
+        lentos = rastreador.mais_lentos(max(1, min(quantidade, 10)), comando)
+        embed = discord.Embed(
+            title="🐢 Comandos Mais Lentos",
+            description=f"Amostragem: `{rastreador.taxa_amostragem:.0%}` • Rastreios em memória: `{len(rastreador.rastreios)}/{rastreador.rastreios.maxlen}`",
+            color=discord.Color.dark_orange()
+        )
+        for r in lentos:
+            spans = r.resumo()
+            medido = {tipo: sum(s for t, _, _, s in spans if t == tipo) for tipo in ('db', 'rest')}
+            linhas = [f"**BD:** {medido['db'] * 1000:.0f}ms • **REST:** {medido['rest'] * 1000:.0f}ms"]
+            linhas += [f"`{soma * 1000:>6.0f}ms` {tipo} `{nome}`" + (f" ×{chamadas}" if chamadas > 1 else "") for tipo, nome, chamadas, soma in spans[:8]]
+            if len(spans) > 8: linhas.append(f"*... mais {len(spans) - 8} spans*")
+            embed.add_field(
+                name=f"!{r.comando} — {r.total * 1000:.0f}ms{' ❌' if r.erro else ''}",
+                value=f"<t:{int(r.momento.timestamp())}:R> por <@{r.autor_id}>\n" + "\n".join(linhas)[:900],
+                inline=False
+            )
+        if not lentos: embed.description += "\nNenhum rastreio registado."
+        await ctx.send(embed=embed)
+
+    @commands.command(name="dbstats", hidden=True)
+    @check_permission_level(4)
+    async def dbstats(self, ctx, ordenar: str = "tempo", quantidade: int = 10):
+        db = self.bot.db_manager
+        criterios = {
+            "tempo": lambda e: e.tempo_total, "espera": lambda e: e.espera_total, "chamadas": lambda e: e.chamadas,
+            "media": lambda e: e.tempo_medio, "erros": lambda e: e.erros, "linhas": lambda e: e.linhas
+        }
+        if ordenar == "repor":
+            db.repor_estatisticas()
+            return await ctx.send("✅ Estatísticas da base de dados repostas.")
+        if ordenar not in criterios:
+            return await ctx.send(f"❌ Ordenação inválida. Use: {', '.join(f'`{c}`' for c in criterios)} (ou `repor`).")
+
+        estatisticas = list(db.estatisticas.values())
+        pool = db.estado_pool()
+        chamadas = sum(e.chamadas for e in estatisticas)
+        embed = discord.Embed(
+            title="🗄️ Estatísticas da Base de Dados",
+            description=(f"**Pool:** {pool['conexoes'] - pool['livres']} em uso / {pool['conexoes']} abertas (máx. {pool['maximo']})\n"
+                         f"**Queries:** {chamadas:,} • **Erros:** {sum(e.erros for e in estatisticas):,} • "
+                         f"**Espera total pelo pool:** {sum(e.espera_total for e in estatisticas):.1f}s\n"
+                         f"**Limite de query lenta:** {db.limite_lenta * 1000:.0f}ms\n"
+                         + "\n".join(f"**Faixa {f.nome}:** {f.em_uso} em uso{f' (máx. {f.limite})' if f.limite else ''}, {f.em_espera} à espera"
+                                     + (f", cedeu {f.cedencias:,}x" if f.cedencias else "") for f in db.faixas.values())),
+            color=discord.Color.dark_blue()
+        )
+
+        # Tempo de conexão ocupada (query + espera) por módulo de origem
+        por_modulo = defaultdict(float)
+        for e in estatisticas: por_modulo[e.origem.split(":")[0]] += e.tempo_total + e.espera_total
+        texto_modulos = "\n".join(f"`{t:>8.1f}s` {m}" for m, t in sorted(por_modulo.items(), key=lambda x: x[1], reverse=True)[:8])
+        embed.add_field(name="📦 Tempo por Módulo", value=texto_modulos or "Sem dados.", inline=False)
+
+        for e in sorted(estatisticas, key=criterios[ordenar], reverse=True)[:max(1, min(quantidade, 8))]:
+            embed.add_field(
+                name=f"{e.etiqueta} — {e.chamadas:,}x, média {e.tempo_medio * 1000:.1f}ms, máx. {e.tempo_maximo * 1000:.0f}ms",
+                value=(f"Total `{e.tempo_total:.2f}s` • espera `{e.espera_total:.2f}s` • linhas `{e.linhas:,}` • erros `{e.erros}`\n"
+                       f"`{e.origem}`\n```sql\n{e.impressao[:200]}\n```"),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="bloqueios", hidden=True)
+    @check_permission_level(4)
+    async def bloqueios(self, ctx, quantidade: int = 3):
+        vigia = self.bot.vigia
+        percentis = vigia.percentis()
+        texto_lag = " • ".join(f"**p{int(q * 100)}:** {v * 1000:.1f}ms" for q, v in percentis.items()) or "Sem amostras."
+        embed = discord.Embed(
+            title="🧱 Bloqueios do Event Loop",
+            description=f"{texto_lag}\n**Limite:** {vigia.limite * 1000:.0f}ms • **Bloqueios registados:** {len(vigia.bloqueios)}",
+            color=discord.Color.dark_red()
+        )
+        for b in list(vigia.bloqueios)[-max(1, min(quantidade, 5)):][::-1]:
+            duracao = f"{b.duracao * 1000:.0f}ms" if b.duracao is not None else "em curso"
+            stack = "".join(b.stack[-6:]).replace("```", "'''")
+            embed.add_field(name=f"<t:{int(b.momento.timestamp())}:R> — {duracao}", value=f"```py\n{stack[-950:]}\n```", inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="perf", hidden=True)
+    @check_permission_level(4)
+    async def perf(self, ctx):
+        bot, db = self.bot, self.bot.db_manager
+        agora = datetime.now(timezone.utc)
+        uptime = int((agora - bot.iniciado_em).total_seconds())
+        embed = discord.Embed(title="📊 Desempenho do Arauto Bank", color=discord.Color.blurple(), timestamp=agora)
+
+        p50, p95 = COMANDOS_LATENCIA.quantil(0.5), COMANDOS_LATENCIA.quantil(0.95)
+        lag = bot.vigia.percentis()
+        embed.add_field(name="🖥️ Processo", value=(
+            f"**Uptime:** {uptime // 86400}d {uptime % 86400 // 3600}h {uptime % 3600 // 60}m\n"
+            f"**RSS:** {memoria_rss() / 1048576:.1f} MiB\n"
+            f"**Gateway:** {bot.latency * 1000:.0f}ms\n"
+            f"**Lag do loop:** p50 {lag.get(0.5, 0) * 1000:.1f}ms • p95 {lag.get(0.95, 0) * 1000:.1f}ms"
+        ), inline=True)
+        embed.add_field(name="⌨️ Comandos", value=(
+            f"**Invocações:** {sum(s[2] for s in COMANDOS_LATENCIA.series.values()):,}\n"
+            f"**p50:** {f'{p50 * 1000:.0f}ms' if p50 is not None else '—'}\n"
+            f"**p95:** {f'{p95 * 1000:.0f}ms' if p95 is not None else '—'}"
+        ), inline=True)
+
+        pool = db.estado_pool()
+        leituras = db.config_cache_hits + db.config_cache_misses
+        faixas = " • ".join(f"{f.nome} {f.em_uso}/{f.em_espera}" for f in db.faixas.values())
+        embed.add_field(name="🗄️ Base de Dados", value=(
+            f"**Pool:** {pool['conexoes'] - pool['livres']}/{pool['conexoes']} em uso (máx. {pool['maximo']})\n"
+            f"**Faixas (uso/espera):** {faixas}\n"
+            f"**Espera recente:** {db.espera_recente() * 1000:.1f}ms\n"
+            f"**Cache de configs:** {f'{db.config_cache_hits / leituras:.1%}' if leituras else '—'} ({leituras:,} leituras)"
+        ), inline=False)
+
+        taxas_cog, eventos_cog = bot.get_cog('Taxas'), bot.get_cog('Eventos')
+        admissao = bot.admissao
+        embed.add_field(name="📬 Filas", value=(
+            f"**Regularização de cargos:** {taxas_cog.fila_regularizacao.qsize() if taxas_cog else '—'}\n"
+            f"**Renda passiva adiada:** {admissao.em_fila} (modo `{admissao.modo}`, descartados {admissao.contagens['descartados']:,})\n"
+            f"**Lembretes de eventos:** {len(eventos_cog.lembretes) if eventos_cog else '—'}"
+        ), inline=False)
+
+        texto_tarefas = "\n".join(
+            f"**{nome}:** <t:{int(momento.timestamp())}:R> ({duracao:.2f}s)"
+            for nome, (momento, duracao) in sorted(ULTIMAS_TAREFAS.items(), key=lambda t: t[1][0], reverse=True)
+        )
+        embed.add_field(name="⏱️ Tarefas em Segundo Plano", value=texto_tarefas[:1024] or "Nenhuma execução ainda.", inline=False)
+        await ctx.send(embed=embed)
+
     @commands.command(name="sync", hidden=True)
     @commands.is_owner()
     async def sync(self, ctx):
@@ -370,7 +723,7 @@ class Admin(commands.Cog):
     @check_permission_level(4)
     async def verificar_config(self, ctx):
         await ctx.send("🔍 Gerando relatório completo de configurações...")
-        configs = await self.bot.db_manager.execute_query("SELECT chave, valor FROM configuracoes ORDER BY chave ASC", fetch="all")
+        configs = await self.bot.db_manager.execute_query("SELECT chave, valor FROM configuracoes WHERE guild_id = $1 ORDER BY chave ASC", ctx.guild.id, fetch="all")
         configs_dict = {item['chave']: item['valor'] for item in configs}
 
         embed = discord.Embed(title="⚙️ Painel de Configuração Completo", color=discord.Color.orange())
@@ -384,6 +737,7 @@ class Admin(commands.Cog):
             "Mensagens Taxas": ['taxa_mensagem_inadimplente', 'taxa_mensagem_abertura', 'taxa_mensagem_reset', 'taxa_mensagem_fechamento'],
             "IDs Msgs Relatório Taxas": sorted([k for k in DEFAULT_CONFIGS.keys() if k.startswith('taxa_msg_id_')]),
             "Renda Passiva": ['recompensa_voz', 'limite_voz', 'recompensa_chat', 'limite_chat', 'cooldown_chat', 'recompensa_reacao'],
+            "Eventos": ['evento_lembretes_minutos'],
         }
         # Adiciona chaves não categorizadas, se houver
         known_keys = {k for cat_keys in categorias.values() for k in cat_keys}
@@ -432,7 +786,7 @@ class Admin(commands.Cog):
     @config_taxa.command(name="moedas", hidden=True)
     async def config_taxa_moedas(self, ctx, estado: str):
         valor_bool = 'true' if estado.lower() == 'on' else 'false'
-        await self.bot.db_manager.set_config_value('taxa_aceitar_moedas', valor_bool)
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'taxa_aceitar_moedas', valor_bool)
         await ctx.send(f"✅ Pagamento com moedas (`!pagar-taxa`) **{'ATIVADO' if valor_bool == 'true' else 'DESATIVADO'}**.")
     
     # ... (outros comandos admin inalterados) ...
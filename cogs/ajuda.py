@@ -22,7 +22,7 @@ class Ajuda(commands.Cog):
                 "Loja": ["loja", "comprar"],
                 "Eventos": ["listareventos", "participar"],
                 "Taxas": ["pagar-taxa", "paguei-prata"],
-                "Orbes": ["orbe"]
+                "Orbes": ["orbe", "orbes-stats"]
             }
 
             for categoria, lista_comandos in cogs_comandos.items():
@@ -1,60 +1,109 @@
+import logging
 import discord
 from discord.ext import commands
 from datetime import datetime
+from utils import consultas
+
+log = logging.getLogger(__name__)
 
 class Economia(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Cada guilda tem o seu próprio tesouro: a conta (guild_id, 1) na tabela banco
         self.ID_TESOURO_GUILDA = 1
 
-    async def get_saldo(self, user_id: int):
-        resultado = await self.bot.db_manager.execute_query(
-            "SELECT saldo FROM banco WHERE user_id = $1", user_id, fetch="one"
-        )
+    async def get_saldo(self, guild_id: int, user_id: int):
+        resultado = await self.bot.db_manager.executar(consultas.SALDO, guild_id, user_id, fetch="one")
         if not resultado:
-            await self.bot.db_manager.execute_query(
-                "INSERT INTO banco (user_id, saldo) VALUES ($1, 0) ON CONFLICT (user_id) DO NOTHING", user_id
-            )
+            await self.bot.db_manager.executar(consultas.CRIAR_CONTA, guild_id, user_id)
             return 0
         return resultado['saldo']
 
-    async def depositar(self, user_id: int, valor: int, descricao: str):
+    # Os movimentos abaixo recebem `tx` para fazerem parte de uma transação maior (ex: compra na loja, pagamento
+    # de taxa); sem `tx`, cada um corre na sua própria transação (db_manager.em_transacao).
+    async def _bloquear_saldos(self, tx, guild_id: int, *user_ids: int) -> dict:
+        linhas = await tx.executar(consultas.BLOQUEAR_SALDOS, guild_id, sorted(set(user_ids)), fetch="all")
+        return {linha['user_id']: linha['saldo'] for linha in linhas}
+
+    async def depositar(self, guild_id: int, user_id: int, valor: int, descricao: str, tx=None):
+        if tx is None:
+            return await self.bot.db_manager.em_transacao(self.depositar, guild_id, user_id, valor, descricao)
         # Garante que o usuário existe antes de tentar depositar
-        await self.get_saldo(user_id)
-        await self.bot.db_manager.execute_query(
-            "UPDATE banco SET saldo = saldo + $1 WHERE user_id = $2", valor, user_id
-        )
-        await self.bot.db_manager.execute_query(
-            "INSERT INTO transacoes (user_id, tipo, valor, descricao) VALUES ($1, 'deposito', $2, $3)",
-            user_id, valor, descricao
-        )
+        await tx.executar(consultas.CRIAR_CONTA, guild_id, user_id)
+        await tx.executar(consultas.CREDITAR, valor, guild_id, user_id)
+        await tx.executar(consultas.REGISTAR_TRANSACAO, guild_id, user_id, 'deposito', valor, descricao)
 
-    async def levantar(self, user_id: int, valor: int, descricao: str):
-        saldo_atual = await self.get_saldo(user_id)
-        if saldo_atual < valor:
+    async def levantar(self, guild_id: int, user_id: int, valor: int, descricao: str, tx=None):
+        if tx is None:
+            return await self.bot.db_manager.em_transacao(self.levantar, guild_id, user_id, valor, descricao)
+        saldos = await self._bloquear_saldos(tx, guild_id, user_id)
+        if saldos.get(user_id, 0) < valor:
             raise ValueError("Saldo insuficiente.")
 
-        await self.bot.db_manager.execute_query(
-            "UPDATE banco SET saldo = saldo - $1 WHERE user_id = $2", valor, user_id
-        )
-        await self.bot.db_manager.execute_query(
-            "INSERT INTO transacoes (user_id, tipo, valor, descricao) VALUES ($1, 'levantamento', $2, $3)",
-            user_id, valor, descricao
-        )
+        await tx.executar(consultas.DEBITAR, valor, guild_id, user_id)
+        await tx.executar(consultas.REGISTAR_TRANSACAO, guild_id, user_id, 'levantamento', valor, descricao)
+
+    async def depositar_em_lote(self, guild_id: int, user_ids: list, valor: int, descricao: str, tx=None):
+        """Deposita `valor` a cada membro (emissão, sem sair do tesouro), em lotes: um UPSERT dos saldos e o extrato
+        por COPY em cada lote. Devolve o RelatorioLote (membros creditados e lotes que falharam)."""
+        async def creditar(tx_lote, ids):
+            await tx_lote.executar(consultas.CREDITAR_EM_LOTE, guild_id, ids, valor)
+            await tx_lote.copiar('transacoes', consultas.COLUNAS_TRANSACAO, [(guild_id, user_id, 'deposito', valor, descricao) for user_id in ids])
+        return await self.bot.db_manager.em_lotes(sorted(set(user_ids)), creditar, tx=tx)
 
-    async def transferir_do_tesouro(self, destinatario_id: int, valor: int, descricao: str):
-        """Transfere moedas do tesouro para um membro, respeitando o lastro."""
+    async def transferir_saldo(self, guild_id: int, remetente_id: int, destinatario_id: int, valor: int,
+                               descricao_saida: str, descricao_entrada: str, tx=None):
+        """Move `valor` de uma conta para outra numa só transação. Levanta ValueError se o saldo não chegar."""
+        if tx is None:
+            return await self.bot.db_manager.em_transacao(
+                self.transferir_saldo, guild_id, remetente_id, destinatario_id, valor, descricao_saida, descricao_entrada)
+        saldos = await self._bloquear_saldos(tx, guild_id, remetente_id, destinatario_id)
+        if saldos.get(remetente_id, 0) < valor:
+            raise ValueError("Saldo insuficiente.")
+        if destinatario_id not in saldos:
+            await tx.executar(consultas.CRIAR_CONTA, guild_id, destinatario_id)
+
+        await tx.executar(consultas.DEBITAR, valor, guild_id, remetente_id)
+        await tx.executar(consultas.REGISTAR_TRANSACAO, guild_id, remetente_id, 'levantamento', valor, descricao_saida)
+        await tx.executar(consultas.CREDITAR, valor, guild_id, destinatario_id)
+        await tx.executar(consultas.REGISTAR_TRANSACAO, guild_id, destinatario_id, 'deposito', valor, descricao_entrada)
+
+    async def transferir_do_tesouro(self, guild_id: int, destinatario_id: int, valor: int, descricao: str, tx=None):
+        """Transfere moedas do tesouro da guilda para um membro, respeitando o lastro."""
         try:
-            # Garante que a conta do destinatário existe
-            await self.get_saldo(destinatario_id)
-            await self.levantar(self.ID_TESOURO_GUILDA, valor, f"Pagamento para {destinatario_id}: {descricao}")
-            await self.depositar(destinatario_id, valor, descricao)
+            await self.transferir_saldo(guild_id, self.ID_TESOURO_GUILDA, destinatario_id, valor,
+                                        f"Pagamento para {destinatario_id}: {descricao}", descricao, tx=tx)
         except ValueError:
             raise ValueError("O Tesouro da Guilda não tem saldo suficiente para pagar esta recompensa.")
         except Exception as e:
-            print(f"Erro inesperado em transferir_do_tesouro: {e}")
+            log.error("Erro inesperado em transferir_do_tesouro: %s", e)
             raise e
 
+    async def transferir_do_tesouro_em_lote(self, guild_id: int, destinatarios_ids: list, valor: int, descricao: str, tx=None,
+                                            limitar_ao_saldo: bool = False):
+        """Paga o mesmo valor a vários membros a partir do tesouro numa única instrução (atómica).
+        Ou todos recebem, ou ninguém recebe; devolve o número de membros pagos.
+        Com `limitar_ao_saldo`, se o tesouro não chegar para todos, paga só os primeiros de `destinatarios_ids` (por essa
+        ordem) que o saldo cobre, com o saldo do tesouro bloqueado até ao fim da transação; pode devolver 0."""
+        destinatarios_ids = list(dict.fromkeys(destinatarios_ids))
+        if not destinatarios_ids or valor <= 0:
+            return 0
+        if limitar_ao_saldo:
+            if tx is None:
+                return await self.bot.db_manager.em_transacao(
+                    self.transferir_do_tesouro_em_lote, guild_id, destinatarios_ids, valor, descricao, limitar_ao_saldo=True)
+            saldo = (await self._bloquear_saldos(tx, guild_id, self.ID_TESOURO_GUILDA)).get(self.ID_TESOURO_GUILDA, 0)
+            destinatarios_ids = destinatarios_ids[:max(saldo, 0) // valor]
+            if not destinatarios_ids:
+                return 0
+
+        resultado = await (tx or self.bot.db_manager).executar(
+            consultas.PAGAR_EM_LOTE, sorted(destinatarios_ids), valor, self.ID_TESOURO_GUILDA, descricao, guild_id, fetch="one"
+        )
+        if not resultado or resultado['pagos'] == 0:
+            raise ValueError("O Tesouro da Guilda não tem saldo suficiente para pagar esta recompensa.")
+        return resultado['pagos']
+
     @commands.command(
         name='saldo',
         help='Mostra o seu saldo de moedas ou o de outro membro.',
@@ -62,7 +111,7 @@ class Economia(commands.Cog):
     )
     async def saldo(self, ctx, target_user: discord.Member = None):
         target_user = target_user or ctx.author
-        saldo_user = await self.get_saldo(target_user.id)
+        saldo_user = await self.get_saldo(ctx.guild.id, target_user.id)
 
         embed = discord.Embed(color=discord.Color.gold(), timestamp=datetime.utcnow())
         embed.set_author(name=f"Saldo de {target_user.display_name}", icon_url=target_user.display_avatar.url)
@@ -82,10 +131,8 @@ class Economia(commands.Cog):
             return await ctx.send("❌ Tentar transferir para si mesmo ou para um bot? Espertinho. Mas não funciona.")
 
         try:
-            # Garante que a conta do destinatário existe
-            await self.get_saldo(destinatario.id)
-            await self.levantar(ctx.author.id, valor, f"Transferência para {destinatario.name}")
-            await self.depositar(destinatario.id, valor, f"Transferência de {ctx.author.name}")
+            await self.transferir_saldo(ctx.guild.id, ctx.author.id, destinatario.id, valor,
+                                        f"Transferência para {destinatario.name}", f"Transferência de {ctx.author.name}")
 
             embed = discord.Embed(title="✅ Transferência Realizada", color=discord.Color.green(), timestamp=datetime.utcnow())
             embed.add_field(name="Remetente", value=ctx.author.mention, inline=True)
@@ -98,7 +145,7 @@ class Economia(commands.Cog):
             await ctx.send(f"❌ Erro: {e}")
         except Exception as e:
             await ctx.send("Ocorreu um erro inesperado ao realizar a transferência.")
-            print(f"Erro no comando transferir: {e}")
+            log.error("Erro no comando transferir: %s", e)
 
 async def setup(bot):
     await bot.add_cog(Economia(bot))
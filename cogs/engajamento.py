@@ -1,8 +1,15 @@
+import logging
 import discord
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
 import random
 import asyncio
+from functools import partial
+from utils.metricas import medir_tarefa, registar_renda_passiva
+from utils.db_manager import em_segundo_plano
+from utils import consultas
+
+log = logging.getLogger(__name__)
 
 class Engajamento(commands.Cog):
     def __init__(self, bot):
@@ -10,59 +17,83 @@ class Engajamento(commands.Cog):
         self.chat_cooldowns = {}
         self.recompensar_voz.start()
         self.enviar_mensagem_engajamento.start()
-        print("Módulo de Engajamento pronto. A iniciar tarefas de renda passiva.")
+        log.info("Módulo de Engajamento pronto. A iniciar tarefas de renda passiva.")
 
     def cog_unload(self):
         self.recompensar_voz.cancel()
         self.enviar_mensagem_engajamento.cancel()
         
-    async def registrar_renda_passiva(self, user_id, tipo, valor):
+    async def registrar_renda_passiva(self, guild_id, user_id, tipo, valor):
         data_hoje = datetime.utcnow().date()
-        await self.bot.db_manager.execute_query(
-            "INSERT INTO renda_passiva_log (user_id, tipo, data, valor) VALUES ($1, $2, $3, $4) "
-            "ON CONFLICT (user_id, tipo, data) DO UPDATE SET valor = renda_passiva_log.valor + EXCLUDED.valor",
-            user_id, tipo, data_hoje, valor
-        )
+        await self.bot.db_manager.executar(consultas.RENDA_ACUMULAR, guild_id, user_id, tipo, data_hoje, valor)
+        registar_renda_passiva(tipo, valor)
 
-    async def get_total_renda_passiva_diaria(self, user_id, tipo):
+    async def get_total_renda_passiva_diaria(self, guild_id, user_id, tipo):
         data_hoje = datetime.utcnow().date()
-        total = await self.bot.db_manager.execute_query(
-            "SELECT valor FROM renda_passiva_log WHERE user_id = $1 AND tipo = $2 AND data = $3",
-            user_id, tipo, data_hoje,
-            fetch="one"
-        )
+        total = await self.bot.db_manager.executar(consultas.RENDA_DO_DIA, guild_id, user_id, tipo, data_hoje, fetch="one")
         return total['valor'] if total else 0
 
+    async def pagar_renda_passiva(self, guild_id, user_id, tipo, valor, limite_diario, descricao):
+        """Paga renda passiva do tesouro se o limite diário do tipo ainda não foi atingido."""
+        total_ganho_hoje = await self.get_total_renda_passiva_diaria(guild_id, user_id, tipo)
+        if total_ganho_hoje >= limite_diario:
+            return
+        economia_cog = self.bot.get_cog('Economia')
+        await economia_cog.transferir_do_tesouro(guild_id, user_id, valor, descricao)
+        await self.registrar_renda_passiva(guild_id, user_id, tipo, valor)
+
+    async def pagar_renda_passiva_em_lote(self, guild_id, user_ids, tipo, valor, limite_diario, descricao):
+        """pagar_renda_passiva para muitos membros de uma vez (um varrimento de voz): uma leitura dos totais do dia,
+        um pagamento do tesouro a todos e o registo da renda por executemany, numa só transação.
+        Se o tesouro não chegar para todos, são pagos os primeiros de `user_ids` que o saldo cobre (como o antigo
+        pagamento membro a membro) e os restantes ficam sem esta recompensa, com um aviso no log."""
+        data_hoje = datetime.utcnow().date()
+        db_manager = self.bot.db_manager
+        ganhos = {r['user_id']: r['valor'] for r in await db_manager.executar(consultas.RENDA_DO_DIA_EM_LOTE, guild_id, tipo, data_hoje, user_ids, fetch="all")}
+        elegiveis = [user_id for user_id in user_ids if ganhos.get(user_id, 0) < limite_diario]
+        if not elegiveis:
+            return
+        economia_cog = self.bot.get_cog('Economia')
+        async def pagar(tx):
+            pagos = await economia_cog.transferir_do_tesouro_em_lote(guild_id, elegiveis, valor, descricao, tx=tx, limitar_ao_saldo=True)
+            if pagos:
+                await db_manager.executar_em_lote(consultas.RENDA_ACUMULAR, [(guild_id, user_id, tipo, data_hoje, valor) for user_id in elegiveis[:pagos]], tx=tx)
+            return pagos
+        pagos = await db_manager.em_transacao(pagar)
+        if pagos < len(elegiveis):
+            log.warning("Tesouro da guilda %s sem saldo para a renda de %s: %s de %s membros pagos.", guild_id, tipo, pagos, len(elegiveis))
+        if pagos: registar_renda_passiva(tipo, valor, pagos)
+
     @tasks.loop(minutes=5)
     async def recompensar_voz(self):
-        try:
-            configs = await self.bot.db_manager.get_all_configs(['recompensa_voz', 'limite_voz'])
-            recompensa_voz = int(configs.get('recompensa_voz', '0'))
-            limite_voz_minutos = int(configs.get('limite_voz', '0'))
-
-            if recompensa_voz == 0 or limite_voz_minutos == 0:
-                return
-
-            economia_cog = self.bot.get_cog('Economia')
-
-            for guild in self.bot.guilds:
-                for channel in guild.voice_channels:
-                    for member in channel.members:
-                        if member.bot or not member.voice or member.voice.self_deaf or member.voice.self_mute:
-                            continue
-                        
-                        try:
-                            total_ganho_hoje = await self.get_total_renda_passiva_diaria(member.id, 'voz')
-                            limite_diario_moedas = (limite_voz_minutos / 5) * recompensa_voz
-
-                            if total_ganho_hoje < limite_diario_moedas:
-                                await economia_cog.transferir_do_tesouro(member.id, recompensa_voz, "Renda passiva por atividade em voz")
-                                await self.registrar_renda_passiva(member.id, 'voz', recompensa_voz)
-                        except Exception as e:
-                            print(f"Erro ao processar membro de voz {member.id}: {e}")
-                        await asyncio.sleep(0)
-        except Exception as e:
-            print(f"Erro fatal na tarefa de recompensar_voz: {e}")
+        if not self.bot.e_lider: return
+        with medir_tarefa('recompensar_voz'), em_segundo_plano():
+            try:
+                varrimento = datetime.utcnow()
+                for guild in self.bot.guilds:
+                    # Recompensas e limites são configurados por guilda
+                    configs = await self.bot.db_manager.get_all_configs(guild.id, ['recompensa_voz', 'limite_voz'])
+                    recompensa_voz = int(configs.get('recompensa_voz', '0'))
+                    limite_voz_minutos = int(configs.get('limite_voz', '0'))
+
+                    if recompensa_voz == 0 or limite_voz_minutos == 0:
+                        continue
+
+                    membros = [member.id for channel in guild.voice_channels for member in channel.members
+                               if not (member.bot or not member.voice or member.voice.self_deaf or member.voice.self_mute)]
+                    if not membros:
+                        continue
+
+                    # A guilda inteira num só pagamento em lote (também quando adiado pela admissão)
+                    try:
+                        limite_diario_moedas = (limite_voz_minutos / 5) * recompensa_voz
+                        await self.bot.admissao.submeter('voz', (guild.id, 'voz', varrimento), partial(
+                            self.pagar_renda_passiva_em_lote, guild.id, membros, 'voz', recompensa_voz, limite_diario_moedas, "Renda passiva por atividade em voz"
+                        ), quantidade=len(membros))
+                    except Exception as e:
+                        log.error("Erro ao pagar a renda de voz da guilda %s: %s", guild.id, e)
+            except Exception as e:
+                log.error("Erro fatal na tarefa de recompensar_voz: %s", e)
 
     @recompensar_voz.before_loop
     async def before_recompensar_voz(self):
@@ -70,79 +101,79 @@ class Engajamento(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        if message.author.bot or message.guild is None or message.content.startswith('!'):
+        if not self.bot.e_lider or message.author.bot or message.guild is None or message.content.startswith('!'):
             return
-        user_id = message.author.id
+        user_id, guild_id = message.author.id, message.guild.id
         agora = datetime.utcnow()
-        try:
-            configs = await self.bot.db_manager.get_all_configs(['recompensa_chat', 'limite_chat', 'cooldown_chat'])
-            recompensa_chat = int(configs.get('recompensa_chat', '0'))
-            limite_chat = int(configs.get('limite_chat', '0'))
-            cooldown_chat = int(configs.get('cooldown_chat', '60'))
-            if recompensa_chat == 0 or limite_chat == 0:
-                return
-            total_ganho_hoje = await self.get_total_renda_passiva_diaria(user_id, 'chat')
-            if total_ganho_hoje >= limite_chat:
-                return
-            last_message_time = self.chat_cooldowns.get(user_id)
-            if last_message_time and (agora - last_message_time).total_seconds() < cooldown_chat:
-                return
-            self.chat_cooldowns[user_id] = agora
-            economia_cog = self.bot.get_cog('Economia')
-            await economia_cog.transferir_do_tesouro(user_id, recompensa_chat, "Renda passiva por atividade no chat")
-            await self.registrar_renda_passiva(user_id, 'chat', recompensa_chat)
-        except Exception as e:
-            print(f"Erro em on_message para {user_id}: {e}")
+        with em_segundo_plano(): # Renda passiva cede a vez aos comandos
+            try:
+                configs = await self.bot.db_manager.get_all_configs(guild_id, ['recompensa_chat', 'limite_chat', 'cooldown_chat'])
+                recompensa_chat = int(configs.get('recompensa_chat', '0'))
+                limite_chat = int(configs.get('limite_chat', '0'))
+                cooldown_chat = int(configs.get('cooldown_chat', '60'))
+                if recompensa_chat == 0 or limite_chat == 0:
+                    return
+                # O cooldown é verificado em memória antes de qualquer ida à BD
+                last_message_time = self.chat_cooldowns.get((guild_id, user_id))
+                if last_message_time and (agora - last_message_time).total_seconds() < cooldown_chat:
+                    return
+                self.chat_cooldowns[(guild_id, user_id)] = agora
+                await self.bot.admissao.submeter('chat', (guild_id, user_id, 'chat', agora), partial(
+                    self.pagar_renda_passiva, guild_id, user_id, 'chat', recompensa_chat, limite_chat, "Renda passiva por atividade no chat"
+                ))
+            except Exception as e:
+                log.error("Erro em on_message para %s: %s", user_id, e)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        if payload.member.bot:
+        if not self.bot.e_lider or payload.guild_id is None or payload.member is None or payload.member.bot:
             return
 
-        try:
-            configs = await self.bot.db_manager.get_all_configs(['canal_anuncios', 'recompensa_reacao'])
-            canal_anuncios_id = configs.get('canal_anuncios', '0')
-            recompensa_reacao = int(configs.get('recompensa_reacao', '0'))
+        with em_segundo_plano(): # Renda passiva cede a vez aos comandos
+            try:
+                configs = await self.bot.db_manager.get_all_configs(payload.guild_id, ['canal_anuncios', 'recompensa_reacao'])
+                canal_anuncios_id = configs.get('canal_anuncios', '0')
+                recompensa_reacao = int(configs.get('recompensa_reacao', '0'))
 
-            if recompensa_reacao == 0 or str(payload.channel_id) != canal_anuncios_id:
-                return
-            
-            ja_reagiu = await self.bot.db_manager.execute_query(
-                "SELECT 1 FROM reacoes_anuncios WHERE user_id = $1 AND message_id = $2",
-                payload.user_id, payload.message_id,
-                fetch="one"
-            )
-            
-            if ja_reagiu:
-                return
+                if recompensa_reacao == 0 or str(payload.channel_id) != canal_anuncios_id:
+                    return
+                await self.bot.admissao.submeter('reacao', (payload.guild_id, payload.user_id, 'reacao', payload.message_id),
+                                                 partial(self.recompensar_reacao, payload.guild_id, payload.user_id, payload.message_id, recompensa_reacao))
+        
+            except Exception as e:
+                log.error("Erro em on_raw_reaction_add para %s: %s", payload.user_id, e)
 
-            await self.bot.db_manager.execute_query(
-                "INSERT INTO reacoes_anuncios (user_id, message_id) VALUES ($1, $2)",
-                payload.user_id, payload.message_id
-            )
+    async def recompensar_reacao(self, guild_id, user_id, message_id, recompensa_reacao):
+        """Recompensa a primeira reação de um membro a um anúncio (a inserção é a própria verificação)."""
+        primeira = await self.bot.db_manager.executar(consultas.PRIMEIRA_REACAO, guild_id, user_id, message_id, fetch="one")
+        if not primeira:
+            return
 
-            economia_cog = self.bot.get_cog('Economia')
-            await economia_cog.transferir_do_tesouro(payload.user_id, recompensa_reacao, f"Recompensa por reagir ao anúncio {payload.message_id}")
-            await self.registrar_renda_passiva(payload.user_id, 'reacao', recompensa_reacao)
-        
-        except Exception as e:
-            print(f"Erro em on_raw_reaction_add para {payload.user_id}: {e}")
+        economia_cog = self.bot.get_cog('Economia')
+        await economia_cog.transferir_do_tesouro(guild_id, user_id, recompensa_reacao, f"Recompensa por reagir ao anúncio {message_id}")
+        await self.registrar_renda_passiva(guild_id, user_id, 'reacao', recompensa_reacao)
 
     @tasks.loop(hours=2)
     async def enviar_mensagem_engajamento(self):
+        if not self.bot.e_lider: return
+        with medir_tarefa('mensagem_engajamento'), em_segundo_plano():
+            for guild in self.bot.guilds:
+                await self.enviar_engajamento_guilda(guild)
+
+    async def enviar_engajamento_guilda(self, guild: discord.Guild):
         try:
             # --- LÓGICA ATUALIZADA ---
             # Busca tanto o canal de bate-papo quanto o cargo de membro
-            configs = await self.bot.db_manager.get_all_configs(["canal_batepapo", "cargo_membro"])
+            configs = await self.bot.db_manager.get_all_configs(guild.id, ["canal_batepapo", "cargo_membro"])
             canal_id_str = configs.get("canal_batepapo", '0')
             cargo_id_str = configs.get("cargo_membro", '0')
 
             if not canal_id_str or canal_id_str == '0':
                 return
             
-            canal = self.bot.get_channel(int(canal_id_str))
+            canal = guild.get_channel(int(canal_id_str))
             if not canal:
-                print("AVISO: Canal de bate-papo para engajamento não encontrado.")
+                log.warning("AVISO: Canal de bate-papo para engajamento não encontrado na guilda %s.", guild.id)
                 return
 
             # Tenta encontrar o cargo de membro para mencionar
@@ -152,7 +183,7 @@ class Engajamento(commands.Cog):
                 if cargo:
                     mencao_alvo = cargo.mention
                 else:
-                    print(f"AVISO: Cargo de membro com ID {cargo_id_str} não encontrado para a mensagem de engajamento.")
+                    log.warning("AVISO: Cargo de membro com ID %s não encontrado para a mensagem de engajamento.", cargo_id_str)
 
             # Mensagens foram reescritas para serem mais gerais e usarem a menção do cargo
             mensagens = [
@@ -169,12 +200,12 @@ class Engajamento(commands.Cog):
             await canal.send(embed=embed)
 
         except Exception as e:
-            print(f"Erro na tarefa de mensagem de engajamento: {e}")
+            log.error("Erro na tarefa de mensagem de engajamento: %s", e)
 
     @enviar_mensagem_engajamento.before_loop
     async def before_enviar_mensagem_engajamento(self):
         await self.bot.wait_until_ready()
-        print("Tarefa de mensagens de engajamento iniciada.")
+        log.info("Tarefa de mensagens de engajamento iniciada.")
         await asyncio.sleep(random.randint(30, 120))
 
 
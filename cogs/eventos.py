@@ -1,11 +1,18 @@
+import logging
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import datetime
+import asyncio
+import heapq
 from typing import Optional
 from utils.permissions import check_permission_level
+from utils.metricas import medir_tarefa
+from utils.db_manager import em_segundo_plano
+from utils import consultas
+
+log = logging.getLogger(__name__)
 
 # --- CLASSES DE INTERFACE (MODALS, VIEWS, SELECTS) ---
-# (As classes DetalhesEventoModal, RecompensaModal, VagasModal, EventoView e CriacaoEventoView permanecem exatamente como na versão anterior)
 
 class DetalhesEventoModal(discord.ui.Modal, title='Detalhes Essenciais do Evento'):
     def __init__(self, view):
@@ -49,29 +56,41 @@ class VagasModal(discord.ui.Modal, title='Definir Limite de Vagas'):
         except ValueError:
             await interaction.response.send_message("❌ O número de vagas deve ser um número.", ephemeral=True, delete_after=10)
 
-class EventoView(discord.ui.View):
-    def __init__(self, bot, evento_id: int):
-        super().__init__(timeout=None)
-        self.bot = bot
+class EventoBotao(discord.ui.DynamicItem[discord.ui.Button], template=r'evento:(?P<acao>inscrever|desinscrever):(?P<id>[0-9]+)|(?P<legado>inscrever|desinscrever)_evento'):
+    """Botão persistente de inscrição cujo custom_id transporta o ID do evento.
+    Um único registo (`bot.add_dynamic_items`) serve todos os eventos, sem views em memória.
+    Os custom_ids antigos (`inscrever_evento`) são resolvidos pelo message_id e migrados no primeiro clique."""
+    ESTILOS = {
+        'inscrever': ("Inscrever-se", discord.ButtonStyle.success),
+        'desinscrever': ("Desinscrever-se", discord.ButtonStyle.danger),
+    }
+
+    def __init__(self, acao: str, evento_id: int, desativado: bool = False, legado: bool = False):
+        label, style = self.ESTILOS[acao]
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=f"evento:{acao}:{evento_id}", disabled=desativado))
+        self.acao = acao
         self.evento_id = evento_id
+        self.legado = legado
 
-    async def atualizar_mensagem(self, interaction: discord.Interaction):
-        evento = await self.bot.db_manager.execute_query(
-            "SELECT inscritos, max_participantes FROM eventos WHERE id = $1", self.evento_id, fetch="one"
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.client.e_lider # Só o líder responde (standby ignora)
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match, /):
+        if match['id']:
+            return cls(match['acao'], int(match['id']))
+        # Mensagens publicadas antes dos botões dinâmicos: o ID só existe na base de dados
+        evento = await interaction.client.db_manager.execute_query(
+            "SELECT id FROM eventos WHERE guild_id = $1 AND message_id = $2", interaction.guild_id, interaction.message.id, fetch="one"
         )
-        if not evento:
-            for item in self.children:
-                item.disabled = True
-            try:
-                if interaction.message:
-                    await interaction.message.edit(view=self)
-            except Exception:
-                pass
-            return
+        return cls(match['legado'], evento['id'] if evento else 0, legado=True)
 
-        inscritos = evento.get('inscritos') or []
-        max_participantes = evento.get('max_participantes')
+    async def _desativar_mensagem(self, interaction: discord.Interaction):
+        """Desativa os botões de um evento passado/cancelado (feito só quando alguém clica)."""
+        try: await interaction.message.edit(view=EventoView(self.evento_id, desativado=True))
+        except Exception: pass
 
+    async def atualizar_mensagem(self, interaction: discord.Interaction, inscritos: list, max_participantes: Optional[int]):
         embed = None
         if interaction.message and interaction.message.embeds:
             embed = interaction.message.embeds[0]
@@ -91,30 +110,33 @@ class EventoView(discord.ui.View):
                     pass
                 break
 
+        # Reenvia sempre a view com os custom_ids atuais (migra mensagens antigas)
+        view = EventoView(self.evento_id)
         try:
-            if interaction.response.is_done():
-                await interaction.followup.edit_message(message_id=interaction.message.id, embed=embed, view=self)
-            else:
-                await interaction.response.edit_message(embed=embed, view=self)
+            await interaction.message.edit(embed=embed, view=view)
         except Exception:
-            try:
-                if interaction.message:
-                    await interaction.message.edit(embed=embed, view=self)
-            except Exception:
-                pass
+            pass
 
-    @discord.ui.button(label="Inscrever-se", style=discord.ButtonStyle.success, custom_id="inscrever_evento")
-    async def inscrever_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
+        db_manager = interaction.client.db_manager
 
-        evento = await self.bot.db_manager.execute_query(
-            "SELECT inscritos, max_participantes, cargo_requerido_id FROM eventos WHERE id = $1",
-            self.evento_id, fetch="one"
-        )
-
+        evento = await db_manager.executar(consultas.EVENTO_INSCRICOES, self.evento_id, interaction.guild_id, fetch="one")
         if not evento:
+            await self._desativar_mensagem(interaction)
             return await interaction.followup.send("❌ Este evento já não existe.", ephemeral=True)
 
+        data_evento = evento.get('data_evento')
+        if evento.get('status') != 'AGENDADO' or (data_evento and data_evento <= datetime.datetime.now(datetime.timezone.utc)):
+            await self._desativar_mensagem(interaction)
+            return await interaction.followup.send("⌛ As inscrições para este evento já estão encerradas.", ephemeral=True)
+
+        if self.acao == 'inscrever':
+            await self.inscrever(interaction, evento)
+        else:
+            await self.desinscrever(interaction)
+
+    async def inscrever(self, interaction: discord.Interaction, evento):
         inscritos = evento.get('inscritos') or []
         max_participantes = evento.get('max_participantes')
         cargo_requerido_id = evento.get('cargo_requerido_id')
@@ -128,31 +150,36 @@ class EventoView(discord.ui.View):
         if cargo_requerido_id:
             cargo_requerido = interaction.guild.get_role(int(cargo_requerido_id))
             if not cargo_requerido or cargo_requerido not in interaction.user.roles:
-                return await interaction.followup.send(f"❌ Apenas membros com o cargo {cargo_requerido.mention} se podem inscrever.", ephemeral=True)
+                mencao = cargo_requerido.mention if cargo_requerido else "exigido"
+                return await interaction.followup.send(f"❌ Apenas membros com o cargo {mencao} se podem inscrever.", ephemeral=True)
 
-        await self.bot.db_manager.execute_query(
-            "UPDATE eventos SET inscritos = array_append(inscritos, $1) WHERE id = $2",
-            interaction.user.id, self.evento_id
+        resultado = await interaction.client.db_manager.executar(
+            consultas.EVENTO_INSCREVER, interaction.user.id, self.evento_id, interaction.guild_id, fetch="one"
         )
+        if not resultado:
+            return await interaction.followup.send("❌ Não foi possível confirmar a inscrição (evento lotado ou já inscrito).", ephemeral=True)
 
-        await self.atualizar_mensagem(interaction)
+        await self.atualizar_mensagem(interaction, resultado['inscritos'] or [], resultado['max_participantes'])
         await interaction.followup.send("✅ Inscrição confirmada! Vemo-nos lá.", ephemeral=True)
 
-    @discord.ui.button(label="Desinscrever-se", style=discord.ButtonStyle.danger, custom_id="desinscrever_evento")
-    async def desinscrever_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer(ephemeral=True, thinking=True)
-
-        resultado = await self.bot.db_manager.execute_query(
-            "UPDATE eventos SET inscritos = array_remove(inscritos, $1) WHERE id = $2 AND $1 = ANY(inscritos) RETURNING id",
-            interaction.user.id, self.evento_id, fetch="one"
+    async def desinscrever(self, interaction: discord.Interaction):
+        resultado = await interaction.client.db_manager.executar(
+            consultas.EVENTO_DESINSCREVER, interaction.user.id, self.evento_id, interaction.guild_id, fetch="one"
         )
 
         if resultado:
-            await self.atualizar_mensagem(interaction)
+            await self.atualizar_mensagem(interaction, resultado['inscritos'] or [], resultado['max_participantes'])
             await interaction.followup.send("✅ Inscrição removida. Que pena!", ephemeral=True)
         else:
             await interaction.followup.send("🤔 Você não estava inscrito neste evento.", ephemeral=True)
 
+class EventoView(discord.ui.View):
+    """View pública de um evento; os botões são dinâmicos e não precisam de ficar registados."""
+    def __init__(self, evento_id: int, desativado: bool = False):
+        super().__init__(timeout=None)
+        self.add_item(EventoBotao('inscrever', evento_id, desativado))
+        self.add_item(EventoBotao('desinscrever', evento_id, desativado))
+
 class CriacaoEventoView(discord.ui.View):
     def __init__(self, bot, author):
         super().__init__(timeout=1800)
@@ -237,11 +264,11 @@ class CriacaoEventoView(discord.ui.View):
 
         try:
             resultado = await self.bot.db_manager.execute_query(
-                """INSERT INTO eventos (nome, descricao, tipo_evento, data_evento, recompensa, max_participantes, criador_id, cargo_requerido_id)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8) RETURNING id""",
+                """INSERT INTO eventos (nome, descricao, tipo_evento, data_evento, recompensa, max_participantes, criador_id, cargo_requerido_id, guild_id)
+                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) RETURNING id""",
                 self.evento_data['nome'], self.evento_data.get('descricao'), self.evento_data.get('tipo_evento'),
                 self.evento_data['data_evento'], self.evento_data.get('recompensa', 0), self.evento_data.get('max_participantes'),
-                interaction.user.id, cargo_id, fetch="one"
+                interaction.user.id, cargo_id, interaction.guild.id, fetch="one"
             )
         except Exception as e:
             try:
@@ -252,10 +279,15 @@ class CriacaoEventoView(discord.ui.View):
 
         evento_id = resultado['id']
 
-        canal_eventos_id = await self.bot.db_manager.get_config_value('canal_eventos', '0')
+        # Agenda os lembretes do novo evento sem esperar pela próxima reconstrução
+        eventos_cog = self.bot.get_cog('Eventos')
+        if eventos_cog:
+            await eventos_cog.agendar_lembretes(interaction.guild.id, evento_id, self.evento_data['data_evento'])
+
+        canal_eventos_id = await self.bot.db_manager.get_config_value(interaction.guild.id, 'canal_eventos', '0')
         canal = None
         if canal_eventos_id and canal_eventos_id != '0' and str(canal_eventos_id).isdigit():
-            canal = self.bot.get_channel(int(canal_eventos_id))
+            canal = interaction.guild.get_channel(int(canal_eventos_id))
 
         final_embed = discord.Embed(
             title=f"[{self.evento_data.get('tipo_evento','INDEFINIDO').upper()}] {self.evento_data['nome']}",
@@ -276,7 +308,7 @@ class CriacaoEventoView(discord.ui.View):
 
         if canal:
             try:
-                public_view = EventoView(self.bot, evento_id)
+                public_view = EventoView(evento_id)
                 msg = await canal.send(embed=final_embed, view=public_view)
                 await self.bot.db_manager.execute_query("UPDATE eventos SET message_id = $1 WHERE id = $2", msg.id, evento_id)
                 try:
@@ -314,29 +346,143 @@ class CriacaoEventoView(discord.ui.View):
 class Eventos(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Min-heap de (momento_envio, evento_id, minutos_antes) com os lembretes por enviar
+        self.lembretes = []
+        self._acordar_lembretes = asyncio.Event()
+        self.despachar_lembretes.start()
+
+    def cog_unload(self):
+        self.despachar_lembretes.cancel()
+
+    # --- Lembretes de Eventos (heap de prazos) ---
+    async def _get_antecedencias(self, guild_id: int):
+        """Lê as antecedências configuradas na guilda (em minutos), da maior para a menor."""
+        valor = await self.bot.db_manager.get_config_value(guild_id, 'evento_lembretes_minutos', '60,10')
+        minutos = {int(m) for m in (valor or '').split(',') if m.strip().isdigit() and int(m) > 0}
+        return sorted(minutos, reverse=True)
+
+    def _calcular_lembretes(self, evento_id, data_evento, antecedencias, ja_enviados, agora):
+        """Devolve as entradas do heap para um evento.
+        Dos lembretes cujo momento já passou, só o mais próximo do início é mantido (envio imediato)."""
+        entradas, atrasado = [], None
+        for minutos in antecedencias:
+            if minutos in ja_enviados: continue
+            momento = data_evento - datetime.timedelta(minutes=minutos)
+            if momento > agora: entradas.append((momento, evento_id, minutos))
+            elif atrasado is None or minutos < atrasado[2]: atrasado = (agora, evento_id, minutos)
+        if atrasado: entradas.append(atrasado)
+        return entradas
+
+    async def carregar_lembretes(self):
+        """Reconstrói o heap a partir da base de dados (todas as guildas), ignorando lembretes já enviados."""
+        agora = datetime.datetime.now(datetime.timezone.utc)
+        eventos = await self.bot.db_manager.execute_query(
+            """SELECT e.id, e.guild_id, e.data_evento, COALESCE(array_agg(l.minutos) FILTER (WHERE l.minutos IS NOT NULL), '{}') AS enviados
+               FROM eventos e LEFT JOIN eventos_lembretes l ON l.evento_id = e.id
+               WHERE e.status = 'AGENDADO' AND e.data_evento > $1
+               GROUP BY e.id, e.guild_id, e.data_evento""",
+            agora, fetch="all"
+        )
+        heap, antecedencias = [], {}
+        for evento in eventos or []:
+            if evento['guild_id'] not in antecedencias:
+                antecedencias[evento['guild_id']] = await self._get_antecedencias(evento['guild_id'])
+            heap.extend(self._calcular_lembretes(evento['id'], evento['data_evento'], antecedencias[evento['guild_id']], set(evento['enviados']), agora))
+        heapq.heapify(heap)
+        self.lembretes = heap
+        self._acordar_lembretes.set()
+        log.info("Lembretes de eventos carregados: %s pendentes.", len(heap))
+
+    async def agendar_lembretes(self, guild_id: int, evento_id: int, data_evento: datetime.datetime):
+        """Adiciona ao heap os lembretes de um evento recém-criado."""
+        try:
+            antecedencias = await self._get_antecedencias(guild_id)
+            agora = datetime.datetime.now(datetime.timezone.utc)
+            if data_evento <= agora: return
+            for entrada in self._calcular_lembretes(evento_id, data_evento, antecedencias, set(), agora):
+                heapq.heappush(self.lembretes, entrada)
+            self._acordar_lembretes.set()
+        except Exception as e: log.error("Erro ao agendar lembretes do evento %s: %s", evento_id, e)
+
+    def remover_lembretes(self, evento_id: int):
+        """Retira do heap todos os lembretes de um evento (ex: cancelado)."""
+        self.lembretes = [entrada for entrada in self.lembretes if entrada[1] != evento_id]
+        heapq.heapify(self.lembretes)
+        self._acordar_lembretes.set()
+
+    @tasks.loop()
+    async def despachar_lembretes(self):
+        # Dorme até ao próximo prazo do heap (ou até ser acordado por uma alteração)
+        self._acordar_lembretes.clear()
+        espera = None
+        if self.lembretes:
+            espera = max(0.0, (self.lembretes[0][0] - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+        try: await asyncio.wait_for(self._acordar_lembretes.wait(), timeout=espera)
+        except asyncio.TimeoutError: pass
+
+        agora = datetime.datetime.now(datetime.timezone.utc)
+        while self.lembretes and self.lembretes[0][0] <= agora:
+            _, evento_id, minutos = heapq.heappop(self.lembretes)
+            if not self.bot.e_lider: continue # O líder tem o seu próprio heap; a reclamação na BD evita duplicados
+            try:
+                with medir_tarefa('lembrete_evento'), em_segundo_plano(): await self._enviar_lembrete(evento_id, minutos)
+            except Exception as e: log.error("Erro ao enviar lembrete do evento %s (T-%sm): %s", evento_id, minutos, e)
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        """Regista a view persistente quando o bot está pronto."""
-        # Passa um evento_id=0 simbólico, pois ele será substituído pelo ID real no custom_id
-        try:
-            self.bot.add_view(EventoView(self.bot, evento_id=0))
-        except Exception:
-            pass
+    async def on_lideranca_obtida(self):
+        # Um standby promovido reconstrói o heap: eventos criados pelo líder anterior ficam incluídos
+        try: await self.carregar_lembretes()
+        except Exception as e: log.error("Erro ao recarregar lembretes após obter liderança: %s", e)
+
+    @despachar_lembretes.before_loop
+    async def before_despachar_lembretes(self):
+        await self.bot.wait_until_ready()
+        try: await self.carregar_lembretes()
+        except Exception as e: log.error("Erro ao carregar lembretes de eventos: %s", e)
+
+    async def _enviar_lembrete(self, evento_id: int, minutos: int):
+        # Reclama o lembrete antes de enviar: após um restart nunca é enviado duas vezes
+        reclamado = await self.bot.db_manager.execute_query(
+            "INSERT INTO eventos_lembretes (evento_id, minutos) VALUES ($1, $2) ON CONFLICT DO NOTHING RETURNING evento_id",
+            evento_id, minutos, fetch="one"
+        )
+        if not reclamado: return
+        evento = await self.bot.db_manager.execute_query(
+            "SELECT guild_id, nome, data_evento, inscritos, message_id FROM eventos WHERE id = $1 AND status = 'AGENDADO'",
+            evento_id, fetch="one"
+        )
+        if not evento or not (guild := self.bot.get_guild(evento['guild_id'])): return
 
+        inicio = f"<t:{int(evento['data_evento'].timestamp())}:R>"
+        texto = f"⏰ **Lembrete:** o evento **{evento['nome']}** começa {inicio}!"
+        inscritos = evento['inscritos'] or []
+
+        canal_eventos_id = await self.bot.db_manager.get_config_value(guild.id, 'canal_eventos', '0')
+        if canal_eventos_id and canal_eventos_id.isdigit() and (canal := guild.get_channel(int(canal_eventos_id))):
+            mencoes = " ".join(f"<@{user_id}>" for user_id in inscritos)
+            try:
+                referencia = canal.get_partial_message(evento['message_id']).to_reference(fail_if_not_exists=False) if evento['message_id'] else None
+                await canal.send(f"{texto}\n{mencoes}"[:2000], reference=referencia, mention_author=False)
+            except Exception as e: log.error("Erro ao enviar lembrete no canal de eventos: %s", e)
+
+        for user_id in inscritos:
+            if not (user := self.bot.get_user(user_id)): continue
+            try: await user.send(texto)
+            except discord.Forbidden: pass
+            except Exception as e: log.error("Falha DM lembrete %s: %s", user_id, e)
 
     @commands.command(name='agendarevento', help='Inicia o assistente para criar um novo evento.')
     @check_permission_level(1)
     async def agendarevento(self, ctx: commands.Context):
         # --- ALTERAÇÃO PRINCIPAL AQUI ---
-        canal_planejamento_id_str = await self.bot.db_manager.get_config_value('canal_planejamento', '0')
+        canal_planejamento_id_str = await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_planejamento', '0')
         
         # Verifica se o comando está a ser usado no canal correto
         if str(ctx.channel.id) != canal_planejamento_id_str:
             canal_planejamento = None
             try:
                 if canal_planejamento_id_str and canal_planejamento_id_str != '0' and canal_planejamento_id_str.isdigit():
-                    canal_planejamento = self.bot.get_channel(int(canal_planejamento_id_str))
+                    canal_planejamento = ctx.guild.get_channel(int(canal_planejamento_id_str))
             except Exception:
                 canal_planejamento = None
 
@@ -358,5 +504,39 @@ class Eventos(commands.Cog):
         # Envia a mensagem no canal, sem o 'ephemeral=True'
         await ctx.send(embed=embed, view=view)
 
+    @commands.command(name='cancelarevento', help='Cancela um evento agendado e os seus lembretes.', usage='!cancelarevento 12')
+    @check_permission_level(1)
+    async def cancelarevento(self, ctx: commands.Context, evento_id: int):
+        evento = await self.bot.db_manager.execute_query(
+            "UPDATE eventos SET status = 'CANCELADO' WHERE id = $1 AND guild_id = $2 AND status = 'AGENDADO' RETURNING nome, message_id",
+            evento_id, ctx.guild.id, fetch="one"
+        )
+        if not evento:
+            return await ctx.send("❌ Evento não encontrado ou já não está agendado.")
+        self.remover_lembretes(evento_id)
+
+        # Marca a mensagem pública como cancelada e remove os botões
+        canal_eventos_id = await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_eventos', '0')
+        if evento['message_id'] and canal_eventos_id and canal_eventos_id.isdigit() and (canal := ctx.guild.get_channel(int(canal_eventos_id))):
+            try:
+                msg = await canal.fetch_message(evento['message_id'])
+                embed = msg.embeds[0] if msg.embeds else discord.Embed()
+                embed.title = f"❌ CANCELADO | {embed.title or evento['nome']}"
+                embed.color = discord.Color.dark_grey()
+                await msg.edit(embed=embed, view=None)
+            except Exception as e: log.error("Erro ao atualizar mensagem do evento cancelado %s: %s", evento_id, e)
+
+        await ctx.send(f"✅ Evento **{evento['nome']}** (ID: {evento_id}) cancelado.")
+
+    @commands.command(name='definir-lembretes-evento', hidden=True, usage='!definir-lembretes-evento 60 10')
+    @check_permission_level(4)
+    async def definir_lembretes_evento(self, ctx: commands.Context, *minutos: int):
+        minutos_validos = sorted({m for m in minutos if m > 0}, reverse=True)
+        if not minutos_validos:
+            return await ctx.send("❌ Indique pelo menos uma antecedência positiva em minutos (ex: `!definir-lembretes-evento 60 10`).")
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'evento_lembretes_minutos', ",".join(str(m) for m in minutos_validos))
+        await self.carregar_lembretes()
+        await ctx.send(f"✅ Lembretes de eventos definidos para **{', '.join(f'T-{m}m' for m in minutos_validos)}**.")
+
 async def setup(bot):
     await bot.add_cog(Eventos(bot))
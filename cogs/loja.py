@@ -13,7 +13,7 @@ class Loja(commands.Cog):
     )
     async def ver_loja(self, ctx):
         itens = await self.bot.db_manager.execute_query(
-            "SELECT id, nome, preco, descricao FROM loja ORDER BY id ASC", fetch="all"
+            "SELECT id, nome, preco, descricao FROM loja WHERE guild_id = $1 ORDER BY id ASC", ctx.guild.id, fetch="all"
         )
 
         if not itens:
@@ -33,22 +33,26 @@ class Loja(commands.Cog):
         usage='!comprar 1'
     )
     async def comprar_item(self, ctx, item_id: int):
-        item = await self.bot.db_manager.execute_query(
-            "SELECT nome, preco FROM loja WHERE id = $1", item_id, fetch="one"
-        )
-
-        if not item:
-            return await ctx.send("Item não encontrado. Ou digitou o ID errado ou está a ver coisas.")
-
-        nome_item, preco_item = item['nome'], item['preco']
         economia_cog = self.bot.get_cog('Economia')
 
+        async def cobrar(tx):
+            # O item fica bloqueado até ao fim da compra: o preço cobrado é o que foi lido, mesmo com um !delitem a meio
+            item = await tx.execute_query(
+                "SELECT nome, preco FROM loja WHERE guild_id = $1 AND id = $2 FOR SHARE", ctx.guild.id, item_id, fetch="one"
+            )
+            if item:
+                await economia_cog.levantar(ctx.guild.id, ctx.author.id, item['preco'], f"Compra na loja: {item['nome']}", tx=tx)
+            return item
+
         try:
-            await economia_cog.levantar(ctx.author.id, preco_item, f"Compra na loja: {nome_item}")
+            item = await self.bot.db_manager.em_transacao(cobrar)
+            if not item:
+                return await ctx.send("Item não encontrado. Ou digitou o ID errado ou está a ver coisas.")
+            nome_item, preco_item = item['nome'], item['preco']
 
-            canal_resgates_id_str = await self.bot.db_manager.get_config_value('canal_resgates', '0')
+            canal_resgates_id_str = await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_resgates', '0')
             if canal_resgates_id_str != '0':
-                canal = self.bot.get_channel(int(canal_resgates_id_str))
+                canal = ctx.guild.get_channel(int(canal_resgates_id_str))
                 if canal:
                     embed = discord.Embed(
                         title="📦 Nova Compra na Loja",
@@ -76,8 +80,8 @@ class Loja(commands.Cog):
         descricao = partes[1].strip() if len(partes) > 1 else "Sem descrição."
 
         resultado = await self.bot.db_manager.execute_query(
-            "INSERT INTO loja (nome, preco, descricao) VALUES ($1, $2, $3) RETURNING id",
-            nome, preco, descricao, fetch="one"
+            "INSERT INTO loja (guild_id, nome, preco, descricao) VALUES ($1, $2, $3, $4) RETURNING id",
+            ctx.guild.id, nome, preco, descricao, fetch="one"
         )
         novo_id = resultado['id']
         await ctx.send(f"✅ Item '{nome}' adicionado à loja com o **ID: {novo_id}**.")
@@ -86,7 +90,7 @@ class Loja(commands.Cog):
     @check_permission_level(4)
     async def del_item(self, ctx, item_id: int):
         item_removido = await self.bot.db_manager.execute_query(
-            "DELETE FROM loja WHERE id = $1 RETURNING nome", item_id, fetch="one"
+            "DELETE FROM loja WHERE guild_id = $1 AND id = $2 RETURNING nome", ctx.guild.id, item_id, fetch="one"
         )
 
         if item_removido:
@@ -1,7 +1,13 @@
+import logging
 import discord
 from discord.ext import commands
 from utils.permissions import check_permission_level
 from utils.views import OrbeAprovacaoView
+from utils.provas import calcular_hashes, procurar_duplicados, registar_prova, adicionar_alerta_duplicados
+from datetime import datetime, timedelta, timezone
+from utils import consultas
+
+log = logging.getLogger(__name__)
 
 class Orbes(commands.Cog):
     def __init__(self, bot):
@@ -21,7 +27,7 @@ class Orbes(commands.Cog):
             await ctx.send(f"❌ Cor de orbe inválida. Use uma das seguintes: {', '.join(self.cores_orbe.keys())}.")
             return
         
-        await self.bot.db_manager.set_config_value(f"orbe_{cor_lower}", str(valor))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, f"orbe_{cor_lower}", str(valor))
         await ctx.send(f"✅ Recompensa para a orbe **{self.cores_orbe[cor_lower]['nome']}** definida para **{valor}** moedas.")
 
     @commands.command(
@@ -43,10 +49,10 @@ class Orbes(commands.Cog):
 
         todos_membros = [ctx.author] + [m for m in membros if not m.bot]
         membros_unicos = sorted(list(set(todos_membros)), key=lambda m: m.id)
-        membros_ids_str = ",".join(str(m.id) for m in membros_unicos)
+        membros_ids = [m.id for m in membros_unicos]
         membros_mencoes = "\n".join(f"• {m.mention}" for m in membros_unicos)
 
-        valor_total_str = await self.bot.db_manager.get_config_value(f'orbe_{cor_lower}', '0')
+        valor_total_str = await self.bot.db_manager.get_config_value(ctx.guild.id, f'orbe_{cor_lower}', '0')
         valor_total = int(valor_total_str)
         if valor_total == 0:
             await ctx.send(f"⚠️ A recompensa para a orbe {cor} ainda não foi configurada pela administração. Fez o trabalho todo para nada... por enquanto.")
@@ -54,8 +60,8 @@ class Orbes(commands.Cog):
 
         recompensa_individual = valor_total // len(membros_unicos)
 
-        canal_aprovacao_id_str = await self.bot.db_manager.get_config_value('canal_aprovacao', '0')
-        canal_aprovacao = self.bot.get_channel(int(canal_aprovacao_id_str))
+        canal_aprovacao_id_str = await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_aprovacao', '0')
+        canal_aprovacao = ctx.guild.get_channel(int(canal_aprovacao_id_str))
 
         if not canal_aprovacao:
             await ctx.send("⚠️ O canal de aprovações não foi configurado. Contacte um administrador.")
@@ -72,22 +78,79 @@ class Orbes(commands.Cog):
         embed.set_image(url=imagem.url)
         embed.set_footer(text="Aguardando aprovação da Staff...")
 
+        # Identifica prints já usados noutras submissões (hash exato + perceptual)
+        hashes = None
+        try:
+            hashes = await calcular_hashes(imagem)
+            adicionar_alerta_duplicados(embed, await procurar_duplicados(self.bot.db_manager, ctx.guild.id, *hashes))
+        except Exception as e:
+            log.error("Erro ao verificar duplicados do print de orbe: %s", e)
+
         view = OrbeAprovacaoView(self.bot)
         
         try:
             msg_aprovacao = await canal_aprovacao.send(embed=embed, view=view)
             
-            await self.bot.db_manager.execute_query(
-                "INSERT INTO submissoes_orbe (message_id, cor, valor_total, autor_id, membros, status) VALUES ($1, $2, $3, $4, $5, $6)",
-                msg_aprovacao.id, cor_lower, valor_total, ctx.author.id, membros_ids_str, 'pendente'
+            await self.bot.db_manager.executar(
+                consultas.ORBE_SUBMETER, msg_aprovacao.id, cor_lower, valor_total, ctx.author.id, membros_ids, recompensa_individual, ctx.guild.id
             )
+            if hashes:
+                await registar_prova(self.bot.db_manager, 'orbe', msg_aprovacao, ctx.author.id, imagem.url, *hashes)
 
             await ctx.message.add_reaction("✅")
             await ctx.send("✅ Submissão enviada para análise! A staff já vai ver se essa orbe é real ou se é mais uma miragem sua.", delete_after=10)
 
         except Exception as e:
             await ctx.send("❌ Ocorreu um erro ao enviar a sua submissão. Tente novamente.")
-            print(f"Erro no comando orbe: {e}")
+            log.error("Erro no comando orbe: %s", e)
+
+    @commands.command(
+        name="orbes-stats",
+        aliases=["orbesstats"],
+        help='Mostra os maiores caçadores de orbes, as capturas por cor e as moedas ganhas num período (em dias; 0 = desde sempre).',
+        usage='!orbes-stats 30'
+    )
+    async def orbes_stats(self, ctx, dias: int = 30):
+        if dias < 0:
+            return await ctx.send("❌ O período deve ser um número de dias positivo (ou 0 para desde sempre).")
+        desde = datetime.now(timezone.utc) - timedelta(days=dias) if dias else datetime.fromtimestamp(0, timezone.utc)
+
+        top_cacadores = await self.bot.db_manager.execute_query(
+            """SELECT p.user_id, count(*) AS capturas, sum(p.valor) AS moedas
+               FROM submissoes_orbe s JOIN orbe_participantes p ON p.submissao_id = s.id
+               WHERE s.guild_id = $2 AND s.status = 'aprovado' AND s.data_decisao >= $1
+               GROUP BY p.user_id ORDER BY moedas DESC, capturas DESC LIMIT 10""",
+            desde, ctx.guild.id, fetch="all"
+        )
+        por_cor = await self.bot.db_manager.execute_query(
+            """SELECT cor, count(*) AS capturas, sum(valor_total) AS moedas
+               FROM submissoes_orbe WHERE guild_id = $2 AND status = 'aprovado' AND data_decisao >= $1
+               GROUP BY cor ORDER BY capturas DESC""",
+            desde, ctx.guild.id, fetch="all"
+        )
+        if not por_cor:
+            return await ctx.send("🔮 Nenhuma orbe aprovada neste período. Os caçadores andam a dormir?")
+
+        periodo = f"Últimos {dias} dias" if dias else "Desde sempre"
+        total_capturas = sum(c['capturas'] for c in por_cor)
+        total_moedas = sum(c['moedas'] or 0 for c in por_cor)
+        embed = discord.Embed(
+            title="🔮 Estatísticas de Orbes",
+            description=f"**Período:** {periodo}\n**Orbes aprovadas:** {total_capturas}\n**Moedas pagas:** {total_moedas:,} 🪙",
+            color=discord.Color.purple()
+        )
+        medalhas = ["🥇", "🥈", "🥉"]
+        texto_top = "\n".join(
+            f"{medalhas[i] if i < 3 else f'`{i + 1}.`'} <@{c['user_id']}> — **{c['capturas']}** orbes, `{c['moedas'] or 0:,}` 🪙"
+            for i, c in enumerate(top_cacadores)
+        )
+        embed.add_field(name="🏆 Top Caçadores", value=texto_top or "Sem dados.", inline=False)
+        texto_cores = "\n".join(
+            f"**{self.cores_orbe.get(c['cor'], {}).get('nome', c['cor'])}:** {c['capturas']} orbes (`{c['moedas'] or 0:,}` 🪙)"
+            for c in por_cor
+        )
+        embed.add_field(name="🎨 Capturas por Cor", value=texto_cores, inline=False)
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Orbes(bot))
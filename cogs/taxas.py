@@ -1,3 +1,4 @@
+import logging
 import discord
 from discord.ext import commands, tasks
 from utils.permissions import check_permission_level
@@ -5,7 +6,14 @@ from datetime import datetime, time, timedelta, timezone
 from collections import defaultdict
 import asyncio
 from utils.views import TaxaPrataView
-from zoneinfo import ZoneInfo
+from utils.agendador import FUSO_HORARIO
+from utils.provas import calcular_hashes, procurar_duplicados, registar_prova, adicionar_alerta_duplicados
+from utils.metricas import medir_tarefa
+from utils.db_manager import em_segundo_plano
+from utils import consultas
+from utils.consultas import CICLO_ATUAL
+
+log = logging.getLogger(__name__)
 
 # Função format_list_for_embed (inalterada)
 def format_list_for_embed(member_data, limit=40):
@@ -20,32 +28,59 @@ def format_list_for_embed(member_data, limit=40):
 class Taxas(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ciclo_semanal_taxas.start()
+        # Fila de membros a regularizar (cargos) fora do caminho das interações
+        self.fila_regularizacao = asyncio.Queue()
+        self.processar_fila_regularizacao.start()
         self.atualizar_relatorio_automatico.start()
-        self.gerenciar_canal_e_anuncios_taxas.start()
-        print("Módulo de Taxas v3.3 (UX Melhorada) pronto.")
+        # Tarefas de calendário: estado persistido e recuperação de execuções perdidas (utils/agendador.py).
+        # O reset semanal é uma tarefa por guilda (cada guilda tem o seu dia), registada quando a guilda fica disponível.
+        self.bot.agendador.registar('taxas_canal_pagamento', time(hour=0, minute=1), self.gerenciar_canal_e_anuncios_taxas)
+        for guild in self.bot.guilds: self._registar_ciclo_guilda(guild.id)
+        log.info("Módulo de Taxas v3.3 (UX Melhorada) pronto.")
 
     def cog_unload(self):
-        self.ciclo_semanal_taxas.cancel()
+        self.processar_fila_regularizacao.cancel()
         self.atualizar_relatorio_automatico.cancel()
-        self.gerenciar_canal_e_anuncios_taxas.cancel()
+        self.bot.agendador.remover('taxas_canal_pagamento')
+        for nome in [n for n in self.bot.agendador.tarefas if n.startswith('taxas_ciclo_semanal:')]:
+            self.bot.agendador.remover(nome)
+
+    def _registar_ciclo_guilda(self, guild_id: int):
+        self.bot.agendador.registar(
+            f'taxas_ciclo_semanal:{guild_id}', time(hour=12, minute=0),
+            lambda agendado_para: self.ciclo_semanal_taxas(guild_id, agendado_para),
+            dias_semana=lambda: self._dias_reset(guild_id)
+        )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds: self._registar_ciclo_guilda(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self._registar_ciclo_guilda(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.bot.agendador.remover(f'taxas_ciclo_semanal:{guild.id}')
 
     # --- Listener on_member_update (inalterado) ---
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
+        if not self.bot.e_lider: return
         try:
-            configs = await self.bot.db_manager.get_all_configs(['cargo_membro'])
+            configs = await self.bot.db_manager.get_all_configs(after.guild.id, ['cargo_membro'])
             cargo_membro_id = int(configs.get('cargo_membro', '0') or 0)
             if cargo_membro_id == 0: return
             cargo_membro = after.guild.get_role(cargo_membro_id)
             if not cargo_membro: return
             if cargo_membro not in before.roles and cargo_membro in after.roles:
                 await self.bot.db_manager.execute_query(
-                    """INSERT INTO taxas (user_id, status_ciclo, data_entrada) VALUES ($1, 'ISENTO_NOVO_MEMBRO', $2)
-                       ON CONFLICT (user_id) DO UPDATE SET data_entrada = EXCLUDED.data_entrada, status_ciclo = 'ISENTO_NOVO_MEMBRO'""",
-                    after.id, datetime.now(timezone.utc))
-                print(f"Novo membro {after.name} registado para isenção de taxa.")
-        except Exception as e: print(f"Erro no listener on_member_update: {e}")
+                    """INSERT INTO taxas (guild_id, user_id, status_ciclo, data_entrada) VALUES ($1, $2, 'ISENTO_NOVO_MEMBRO', $3)
+                       ON CONFLICT (guild_id, user_id) DO UPDATE SET data_entrada = EXCLUDED.data_entrada, status_ciclo = 'ISENTO_NOVO_MEMBRO'""",
+                    after.guild.id, after.id, datetime.now(timezone.utc))
+                log.info("Novo membro %s registado para isenção de taxa.", after.name)
+        except Exception as e: log.error("Erro no listener on_member_update: %s", e)
 
     # --- Regularizar Membro (inalterado) ---
     async def regularizar_membro(self, membro: discord.Member, configs: dict):
@@ -60,12 +95,35 @@ class Taxas(commands.Cog):
             
             if to_add: await membro.add_roles(*to_add, reason="Taxa regularizada")
             if to_remove: await membro.remove_roles(*to_remove, reason="Taxa regularizada")
-        except Exception as e: print(f"Erro ao regularizar {membro.name}: {e}")
+        except Exception as e: log.error("Erro ao regularizar %s: %s", membro.name, e)
+
+    def agendar_regularizacao(self, membro: discord.Member):
+        """Coloca o membro na fila de regularização de cargos (não bloqueia quem chama)."""
+        self.fila_regularizacao.put_nowait(membro)
+
+    @tasks.loop()
+    async def processar_fila_regularizacao(self):
+        membros = [await self.fila_regularizacao.get()]
+        while not self.fila_regularizacao.empty(): # Agrupa o que estiver em espera: uma leitura de configs por lote
+            membros.append(self.fila_regularizacao.get_nowait())
+        try:
+            with medir_tarefa('fila_regularizacao'), em_segundo_plano():
+                # Uma leitura de configs por guilda presente no lote
+                por_guilda = defaultdict(dict)
+                for m in membros: por_guilda[m.guild.id][m.id] = m
+                for guild_id, membros_guilda in por_guilda.items():
+                    configs = await self.bot.db_manager.get_all_configs(guild_id, ['cargo_membro', 'cargo_inadimplente'])
+                    for membro in membros_guilda.values():
+                        await self.regularizar_membro(membro, configs)
+        except Exception as e: log.error("Erro ao processar fila de regularização: %s", e)
+
+    @processar_fila_regularizacao.before_loop
+    async def before_fila_regularizacao(self): await self.bot.wait_until_ready()
 
     # --- Tarefas em Segundo Plano (_update_report_message, atualizar_relatorio_automatico, gerenciar_canal_e_anuncios_taxas, ciclo_semanal_taxas inalteradas) ---
     async def _update_report_message(self, canal: discord.TextChannel, config_key: str, embed: discord.Embed):
         try:
-            msg_id = int(await self.bot.db_manager.get_config_value(config_key, '0') or 0)
+            msg_id = int(await self.bot.db_manager.get_config_value(canal.guild.id, config_key, '0') or 0)
         except ValueError: msg_id = 0
         current_embed_dict = embed.to_dict()
 
@@ -83,33 +141,39 @@ class Taxas(commands.Cog):
                     try:
                         if msg_id: await msg.edit(content=None, embed=error_embed); return
                     except Exception: pass
-                print(f"Erro HTTP ao editar relatório ({config_key}): {e}"); msg_id = 0
+                log.error("Erro HTTP ao editar relatório (%s): %s", config_key, e); msg_id = 0
 
         try: # Cria nova mensagem
             nova_msg = await canal.send(embed=embed)
-            await self.bot.db_manager.set_config_value(config_key, str(nova_msg.id))
+            await self.bot.db_manager.set_config_value(canal.guild.id, config_key, str(nova_msg.id))
         except discord.HTTPException as e:
              if getattr(e, "code", None) == 50035:
                  count = embed.description.count('\n') + 1 if embed.description != "Nenhum membro nesta categoria." else 0
                  error_embed = discord.Embed(title=embed.title, description=f"Erro: Lista de {count} membros muito longa.", color=discord.Color.orange())
-                 try: nova_msg = await canal.send(embed=error_embed); await self.bot.db_manager.set_config_value(config_key, str(nova_msg.id))
-                 except Exception as final_e: print(f"Falha CRÍTICA ao enviar erro relatório ({config_key}): {final_e}")
-             else: print(f"Falha CRÍTICA ao enviar relatório ({config_key}): {e}")
+                 try: nova_msg = await canal.send(embed=error_embed); await self.bot.db_manager.set_config_value(canal.guild.id, config_key, str(nova_msg.id))
+                 except Exception as final_e: log.error("Falha CRÍTICA ao enviar erro relatório (%s): %s", config_key, final_e)
+             else: log.error("Falha CRÍTICA ao enviar relatório (%s): %s", config_key, e)
 
     @tasks.loop(minutes=10)
     async def atualizar_relatorio_automatico(self):
+        if not self.bot.e_lider: return
+        with medir_tarefa('relatorio_taxas'), em_segundo_plano():
+            for guild in self.bot.guilds:
+                await self._atualizar_relatorio_guilda(guild)
+
+    async def _atualizar_relatorio_guilda(self, guild: discord.Guild):
         try:
-            canal_id = int(await self.bot.db_manager.get_config_value('canal_relatorio_taxas', '0') or 0)
+            canal_id = int(await self.bot.db_manager.get_config_value(guild.id, 'canal_relatorio_taxas', '0') or 0)
             if canal_id == 0: return
-            canal = self.bot.get_channel(canal_id)
+            canal = guild.get_channel(canal_id)
             if not canal: return
 
-            cargo_isento_id = int(await self.bot.db_manager.get_config_value('cargo_isento', '0') or 0)
+            cargo_isento_id = int(await self.bot.db_manager.get_config_value(guild.id, 'cargo_isento', '0') or 0)
             membros_cargo_isento_ids = set()
             if cargo_isento_id and (cargo_isento := canal.guild.get_role(cargo_isento_id)):
                 membros_cargo_isento_ids = {m.id for m in cargo_isento.members}
 
-            registros = await self.bot.db_manager.execute_query("SELECT user_id, status_ciclo FROM taxas", fetch="all")
+            registros = await self.bot.db_manager.execute_query("SELECT user_id, status_ciclo FROM taxas WHERE guild_id = $1", guild.id, fetch="all")
             status_map = defaultdict(list); isentos_cargo_report = []
 
             for r in registros:
@@ -131,15 +195,18 @@ class Taxas(commands.Cog):
             await self._update_report_message(canal, 'taxa_msg_id_isentos_novos', embed_isentos_novos)
             embed_isentos_cargo = discord.Embed(title=f"🛡️ Isentos (Cargo) ({len(isentos_cargo_report)})", description=format_list_for_embed(isentos_cargo_report), color=discord.Color.dark_grey())
             await self._update_report_message(canal, 'taxa_msg_id_isentos_cargo', embed_isentos_cargo)
-        except Exception as e: print(f"Erro task atualizar_relatorio_automatico: {e}")
+        except Exception as e: log.error("Erro task atualizar_relatorio_automatico (guilda %s): %s", guild.id, e)
 
     @atualizar_relatorio_automatico.before_loop
     async def before_relatorio(self): await self.bot.wait_until_ready()
 
-    @tasks.loop(time=time(hour=0, minute=1, tzinfo=ZoneInfo("America/Sao_Paulo"))) # 00:01 GMT-3
-    async def gerenciar_canal_e_anuncios_taxas(self):
+    async def gerenciar_canal_e_anuncios_taxas(self, agendado_para: datetime = None): # Diariamente às 00:01 (FUSO_HORARIO)
+        for guild in self.bot.guilds:
+            await self._gerenciar_canal_guilda(guild, agendado_para)
+
+    async def _gerenciar_canal_guilda(self, guild: discord.Guild, agendado_para: datetime = None):
         try:
-            configs = await self.bot.db_manager.get_all_configs([
+            configs = await self.bot.db_manager.get_all_configs(guild.id, [
                 'canal_pagamento_taxas', 'cargo_membro',
                 'taxa_dia_abertura', 'taxa_dia_semana', 'taxa_mensagem_abertura', 'taxa_mensagem_fechamento',
                 'canal_log_taxas'
@@ -148,12 +215,12 @@ class Taxas(commands.Cog):
             dia_abertura = int(configs.get('taxa_dia_abertura', '5') or 5); dia_reset = int(configs.get('taxa_dia_semana', '6') or 6)
             dia_fechamento = (dia_reset + 1) % 7
             if canal_id == 0 or cargo_id == 0: return
-            canal = self.bot.get_channel(canal_id);
+            canal = guild.get_channel(canal_id);
             if not canal: return
             cargo = canal.guild.get_role(cargo_id);
             if not cargo: return
 
-            hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).weekday(); perms = canal.overwrites_for(cargo)
+            hoje = (agendado_para or datetime.now(FUSO_HORARIO)).astimezone(FUSO_HORARIO).weekday(); perms = canal.overwrites_for(cargo)
 
             if hoje == dia_abertura:
                 if perms.send_messages is not True:
@@ -170,40 +237,36 @@ class Taxas(commands.Cog):
                         await asyncio.sleep(10) # Espera 10s
                         await canal.purge(limit=200, check=lambda msg: not msg.pinned)
                         await self._enviar_instrucoes_pagamento(canal)
-                    except Exception as e: print(f"Erro limpar/instruir {canal.name}: {e}")
+                    except Exception as e: log.error("Erro limpar/instruir %s: %s", canal.name, e)
                     await self._log_acao_canal(f"Canal {canal.mention} **FECHADO** e limpo.", canal)
-        except Exception as e: print(f"Erro task gerenciar_canal_e_anuncios_taxas: {e}")
+        except Exception as e: log.error("Erro task gerenciar_canal_e_anuncios_taxas (guilda %s): %s", guild.id, e)
 
-    @gerenciar_canal_e_anuncios_taxas.before_loop
-    async def before_gerenciar_canal(self): await self.bot.wait_until_ready()
+    async def _dias_reset(self, guild_id: int):
+        return {int(await self.bot.db_manager.get_config_value(guild_id, 'taxa_dia_semana', '6') or 6)}
 
-    @tasks.loop(time=time(hour=12, minute=0, tzinfo=datetime.now().astimezone().tzinfo))
-    async def ciclo_semanal_taxas(self):
-         dia_reset = int(await self.bot.db_manager.get_config_value('taxa_dia_semana', '6') or 6)
-         if datetime.now().astimezone().weekday() == dia_reset:
-             print(f"[{datetime.now()}] Iniciando ciclo semanal COMPLETO de taxas...")
-             await self.executar_ciclo_de_taxas(resetar_ciclo=True)
+    async def ciclo_semanal_taxas(self, guild_id: int, agendado_para: datetime = None): # Às 12:00 (FUSO_HORARIO) do dia de reset da guilda
+         guild = self.bot.get_guild(guild_id)
+         if not guild: return log.error("ERRO: Guilda %s indisponível para o ciclo de taxas.", guild_id)
+         log.info("[%s] Iniciando ciclo semanal COMPLETO de taxas da guilda %s (agendado para %s)...", datetime.now(), guild_id, agendado_para)
+         await self.executar_ciclo_de_taxas(guild, resetar_ciclo=True)
 
-    async def executar_ciclo_de_taxas(self, ctx=None, resetar_ciclo: bool = False):
-        guild = ctx.guild if ctx else (self.bot.guilds[0] if self.bot.guilds else None)
-        if not guild: return print("ERRO: Bot não está em nenhum servidor.")
-        
-        configs = await self.bot.db_manager.get_all_configs([
+    async def executar_ciclo_de_taxas(self, guild: discord.Guild, ctx=None, resetar_ciclo: bool = False):
+        configs = await self.bot.db_manager.get_all_configs(guild.id, [
             'cargo_membro', 'cargo_inadimplente', 'cargo_isento', 'canal_log_taxas',
             'taxa_mensagem_inadimplente', 'taxa_semanal_valor', 'canal_pagamento_taxas', 'taxa_mensagem_reset'
         ])
-        canal_log = self.bot.get_channel(int(configs.get('canal_log_taxas', '0') or 0))
+        canal_log = guild.get_channel(int(configs.get('canal_log_taxas', '0') or 0))
         msg_inadimplente_template = configs.get('taxa_mensagem_inadimplente')
         valor_taxa = configs.get('taxa_semanal_valor', '0')
 
         if resetar_ciclo: # Anúncio de reset
              canal_pagamento_id = int(configs.get('canal_pagamento_taxas', '0') or 0)
              msg_reset = configs.get('taxa_mensagem_reset', '')
-             if canal_pagamento_id and msg_reset and (canal_pgto := self.bot.get_channel(canal_pagamento_id)):
+             if canal_pagamento_id and msg_reset and (canal_pgto := guild.get_channel(canal_pagamento_id)):
                  try: await canal_pgto.send(embed=discord.Embed(title="🚨 Último Dia para Pagamento", description=msg_reset, color=discord.Color.orange()))
-                 except Exception as e: print(f"Erro ao enviar msg reset: {e}")
+                 except Exception as e: log.error("Erro ao enviar msg reset: %s", e)
 
-        membros_pendentes_db = await self.bot.db_manager.execute_query("SELECT user_id, data_entrada FROM taxas WHERE status_ciclo = 'PENDENTE'", fetch="all")
+        membros_pendentes_db = await self.bot.db_manager.execute_query("SELECT user_id, data_entrada FROM taxas WHERE guild_id = $1 AND status_ciclo = 'PENDENTE'", guild.id, fetch="all")
         novos_isentos, inadimplentes, falhas, isentos_cargo = [], [], [], []
         uma_semana_atras = datetime.now(timezone.utc) - timedelta(days=7)
         cargo_isento = guild.get_role(int(configs.get('cargo_isento', '0') or 0))
@@ -216,7 +279,7 @@ class Taxas(commands.Cog):
             data_entrada = registro.get('data_entrada')
             if data_entrada and data_entrada > uma_semana_atras:
                 novos_isentos.append(membro)
-                await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'ISENTO_NOVO_MEMBRO' WHERE user_id = $1", membro.id)
+                await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'ISENTO_NOVO_MEMBRO' WHERE guild_id = $1 AND user_id = $2", guild.id, membro.id)
                 continue
             try: # Aplica inadimplência
                 membro_role = guild.get_role(int(configs.get('cargo_membro', '0') or 0))
@@ -228,7 +291,7 @@ class Taxas(commands.Cog):
                      inadimplentes.append(membro)
                      if msg_inadimplente_template: # Envia DM
                          try: await membro.send(msg_inadimplente_template.format(member=membro.mention, tax_value=valor_taxa))
-                         except Exception as e: print(f"Falha DM {membro.name}: {e}")
+                         except Exception as e: log.error("Falha DM %s: %s", membro.name, e)
             except Exception as e: falhas.append(f"{membro.mention} (`{membro.id}`): {e}")
 
         embed = discord.Embed(title="Relatório Detalhado do Ciclo de Taxas", timestamp=datetime.now(timezone.utc))
@@ -240,7 +303,15 @@ class Taxas(commands.Cog):
         resetados_db = []
         if resetar_ciclo:
             embed.description = "**Modo: Ciclo Semanal Completo (com Reset)**"
-            resetados_db = await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE status_ciclo LIKE 'PAGO_%' OR status_ciclo = 'ISENTO_%' RETURNING user_id", fetch="all")
+            # Fecha o ciclo atual da guilda, abre o seguinte e volta a pôr os membros como pendentes (tudo ou nada)
+            async with self.bot.db_manager.transaction() as tx:
+                novo_ciclo = await tx.execute_query(
+                    "WITH fechado AS (UPDATE taxa_ciclos SET fim = CURRENT_TIMESTAMP WHERE guild_id = $1 AND fim IS NULL) INSERT INTO taxa_ciclos (guild_id, inicio) VALUES ($1, CURRENT_TIMESTAMP) RETURNING id",
+                    guild.id, fetch="one")
+                resetados_db = await tx.execute_query(
+                    "UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE guild_id = $1 AND (status_ciclo LIKE 'PAGO_%' OR status_ciclo = 'ISENTO_%') RETURNING user_id",
+                    guild.id, fetch="all")
+            log.info("Ciclo de taxas #%s aberto (guilda %s).", novo_ciclo['id'], guild.id)
             membros_resetados = [m.mention for r in resetados_db if (m := guild.get_member(r['user_id']))]
             embed.add_field(name=f"🔄 Status Resetados para Pendente ({len(membros_resetados)})", value=format_list_for_embed(membros_resetados), inline=False)
         if falhas: embed.add_field(name=f"❌ Falhas ({len(falhas)})", value="\n".join(falhas), inline=False)
@@ -248,8 +319,8 @@ class Taxas(commands.Cog):
         if ctx: await ctx.send(embed=embed) # Envia embed detalhado no ctx
         if canal_log:
             try: await canal_log.send(embed=embed)
-            except Exception as e: print(f"Erro ao enviar log: {e}")
-        print(f"Ciclo taxas: {len(inadimplentes)} inad., {len(novos_isentos)} isen. novos, {len(isentos_cargo)} isen. cargo." + (f" {len(resetados_db)} resetados." if resetar_ciclo else ""))
+            except Exception as e: log.error("Erro ao enviar log: %s", e)
+        log.info("Ciclo taxas (guilda %s): %s inad., %s isen. novos, %s isen. cargo.%s", guild.id, len(inadimplentes), len(novos_isentos), len(isentos_cargo), f" {len(resetados_db)} resetados." if resetar_ciclo else "")
 
     # --- Comandos do Utilizador (LÓGICA ATUALIZADA) ---
     @commands.command(name="pagar-taxa")
@@ -258,18 +329,18 @@ class Taxas(commands.Cog):
         try: await ctx.message.delete()
         except: pass
 
-        configs = await self.bot.db_manager.get_all_configs([
+        configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, [
              'taxa_semanal_valor', 'taxa_aceitar_moedas', 'cargo_inadimplente', 'canal_pagamento_taxas'
         ])
 
         # --- 1. VERIFICAÇÃO DE CANAL ---
         canal_pagamento_id = int(configs.get('canal_pagamento_taxas', '0') or 0)
         if canal_pagamento_id and ctx.channel.id != canal_pagamento_id:
-             canal_p = self.bot.get_channel(canal_pagamento_id); mention = f" em {canal_p.mention}" if canal_p else ""
+             canal_p = ctx.guild.get_channel(canal_pagamento_id); mention = f" em {canal_p.mention}" if canal_p else ""
              return await ctx.send(f"❌ {ctx.author.mention}, use este comando{mention}.", delete_after=15)
 
         # --- 2. VERIFICAÇÃO DE STATUS DE PAGAMENTO (PRIORITÁRIA) ---
-        status_db = await self.bot.db_manager.execute_query("SELECT status_ciclo FROM taxas WHERE user_id = $1", ctx.author.id, fetch="one")
+        status_db = await self.bot.db_manager.executar(consultas.TAXA_ESTADO, ctx.guild.id, ctx.author.id, fetch="one")
         status_atual = status_db['status_ciclo'] if status_db else 'PENDENTE'
         if status_atual.startswith('PAGO'):
             return await ctx.send(f"✅ {ctx.author.mention}, você já pagou a taxa para este ciclo. Não precisa de pagar novamente.", delete_after=20)
@@ -289,13 +360,17 @@ class Taxas(commands.Cog):
             valor_taxa = int(configs.get('taxa_semanal_valor', 0) or 0)
             if valor_taxa == 0: return await ctx.send("ℹ️ Sistema de taxas desativado.", delete_after=20)
 
-            economia = self.bot.get_cog('Economia'); saldo_atual = await economia.get_saldo(ctx.author.id)
+            economia = self.bot.get_cog('Economia'); saldo_atual = await economia.get_saldo(ctx.guild.id, ctx.author.id)
             if saldo_atual < valor_taxa:
                 return await ctx.send(f"❌ {ctx.author.mention}, saldo insuficiente! Precisa de **{valor_taxa}** 🪙, possui **{saldo_atual}** 🪙.", delete_after=20)
 
             status_pagamento = 'PAGO_ANTECIPADO' if ctx.channel.permissions_for(ctx.author).send_messages else 'PAGO_ATRASADO'
-            await economia.levantar(ctx.author.id, valor_taxa, f"Pagamento de taxa semanal ({status_pagamento})")
-            await self.bot.db_manager.execute_query("INSERT INTO taxas (user_id, status_ciclo) VALUES ($1, $2) ON CONFLICT (user_id) DO UPDATE SET status_ciclo = $2", ctx.author.id, status_pagamento)
+            async def cobrar(tx):
+                # Débito e registo na mesma transação: um segundo !pagar-taxa em simultâneo não paga duas vezes
+                await economia.levantar(ctx.guild.id, ctx.author.id, valor_taxa, f"Pagamento de taxa semanal ({status_pagamento})", tx=tx)
+                if not await tx.executar(consultas.TAXA_REGISTAR_PAGAMENTO, ctx.guild.id, ctx.author.id, status_pagamento, 'moedas', status_pagamento, valor_taxa, fetch="one"):
+                    raise ValueError("a taxa deste ciclo já estava paga.")
+            await self.bot.db_manager.em_transacao(cobrar)
             
             msg_sucesso = f"✅ Pagamento de **{valor_taxa}** 🪙 recebido, {ctx.author.mention}! Status: **{status_pagamento}**."
             if discord.utils.get(ctx.author.roles, id=int(configs.get('cargo_inadimplente', '0') or 0)):
@@ -305,21 +380,25 @@ class Taxas(commands.Cog):
 
     @commands.command(name="paguei-prata")
     async def paguei_prata(self, ctx):
-        # Apaga o comando do utilizador imediatamente
-        try: await ctx.message.delete()
-        except: pass
-        
-        configs = await self.bot.db_manager.get_all_configs(['cargo_inadimplente', 'canal_pagamento_taxas', 'canal_aprovacao'])
+        # O comando do utilizador é apagado no fim, em todos os caminhos: antes disso o anexo ainda pode ser
+        # descarregado do CDN para os hashes de deteção de prints reutilizados
+        try: await self._submeter_prata(ctx)
+        finally:
+            try: await ctx.message.delete()
+            except: pass
+
+    async def _submeter_prata(self, ctx):
+        configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['cargo_inadimplente', 'canal_pagamento_taxas', 'canal_aprovacao'])
         canal_pagamento_id = int(configs.get('canal_pagamento_taxas', '0') or 0)
         canal_aprovacao_id = int(configs.get('canal_aprovacao', '0') or 0)
 
         # --- 1. VERIFICAÇÃO DE CANAL ---
         if canal_pagamento_id and ctx.channel.id != canal_pagamento_id:
-             canal_p = self.bot.get_channel(canal_pagamento_id); mention = f" em {canal_p.mention}" if canal_p else ""
+             canal_p = ctx.guild.get_channel(canal_pagamento_id); mention = f" em {canal_p.mention}" if canal_p else ""
              return await ctx.send(f"❌ {ctx.author.mention}, use este comando{mention}.", delete_after=15)
 
         # --- 2. VERIFICAÇÃO DE STATUS DE PAGAMENTO (PRIORITÁRIA) ---
-        status_db = await self.bot.db_manager.execute_query("SELECT status_ciclo FROM taxas WHERE user_id = $1", ctx.author.id, fetch="one")
+        status_db = await self.bot.db_manager.executar(consultas.TAXA_ESTADO, ctx.guild.id, ctx.author.id, fetch="one")
         status_atual = status_db['status_ciclo'] if status_db else 'PENDENTE'
         if status_atual.startswith('PAGO'):
             return await ctx.send(f"✅ {ctx.author.mention}, você já pagou a taxa para este ciclo.", delete_after=20)
@@ -335,29 +414,36 @@ class Taxas(commands.Cog):
             return await ctx.send(f"❌ {ctx.author.mention}, anexe o print na **mesma mensagem**.", delete_after=20)
         
         if not canal_aprovacao_id: return await ctx.send("⚠️ Canal de aprovações não configurado. Contacte a staff.", delete_after=30)
-        canal_aprovacao = self.bot.get_channel(canal_aprovacao_id)
+        canal_aprovacao = ctx.guild.get_channel(canal_aprovacao_id)
         if not canal_aprovacao: return await ctx.send(f"⚠️ Erro: Canal de aprovações (ID: {canal_aprovacao_id}) não encontrado.", delete_after=30)
 
         attachment = ctx.message.attachments[0]
         embed_aprovacao = discord.Embed(title="🧾 Submissão: Pagamento em Prata", description=f"**Membro:** {ctx.author.mention} (`{ctx.author.id}`)", color=discord.Color.orange(), timestamp=datetime.now(timezone.utc))
         embed_aprovacao.set_image(url=attachment.url); embed_aprovacao.set_footer(text="Aguardando ação da Staff...")
 
+        hashes = None # Deteção de prints reutilizados
+        try:
+            hashes = await calcular_hashes(attachment)
+            adicionar_alerta_duplicados(embed_aprovacao, await procurar_duplicados(self.bot.db_manager, ctx.guild.id, *hashes))
+        except Exception as e: log.error("Erro ao verificar duplicados do comprovativo: %s", e)
+
         try:
             msg_aprovacao = await canal_aprovacao.send(embed=embed_aprovacao, view=TaxaPrataView(self.bot))
             await self.bot.db_manager.execute_query(
-                "INSERT INTO submissoes_taxa (user_id, message_id, status, anexo_url) VALUES ($1, $2, $3, $4)",
-                ctx.author.id, msg_aprovacao.id, 'pendente', attachment.url
+                "INSERT INTO submissoes_taxa (guild_id, user_id, message_id, status, anexo_url) VALUES ($1, $2, $3, $4, $5)",
+                ctx.guild.id, ctx.author.id, msg_aprovacao.id, 'pendente', attachment.url
             )
+            if hashes: await registar_prova(self.bot.db_manager, 'taxa', msg_aprovacao, ctx.author.id, attachment.url, *hashes)
             await ctx.send(f"✅ {ctx.author.mention}, comprovativo enviado para análise! Aguarde a aprovação.", delete_after=60)
             # Não reagimos mais à mensagem, pois ela será apagada.
         except Exception as e:
-            print(f"Erro ao enviar submissão de prata: {e}")
+            log.error("Erro ao enviar submissão de prata: %s", e)
             await ctx.send("❌ Falha ao enviar o comprovativo. Tente novamente ou contacte a staff.", delete_after=20)
             
     # --- NOVO COMANDO DE AJUDA ESPECÍFICO ---
     @commands.command(name="ajudataxa")
     async def ajuda_taxa(self, ctx):
-        canal_pagamento_id = int(await self.bot.db_manager.get_config_value('canal_pagamento_taxas', '0') or 0)
+        canal_pagamento_id = int(await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_pagamento_taxas', '0') or 0)
         
         # Só funciona no canal de pagamento
         if not canal_pagamento_id or ctx.channel.id != canal_pagamento_id:
@@ -370,45 +456,73 @@ class Taxas(commands.Cog):
         except: pass
         
         # Envia uma versão temporária das instruções (sem fixar)
-        embed_instrucoes = await self._construir_embed_instrucoes()
+        embed_instrucoes = await self._construir_embed_instrucoes(ctx.guild.id)
         await ctx.send(embed=embed_instrucoes, delete_after=120) # Aumentado para 2 minutos
 
+    @commands.command(
+        name="historico-taxa",
+        aliases=["historicotaxa"],
+        help='Mostra os pagamentos de taxa dos últimos ciclos (seus ou de outro membro).',
+        usage='!historico-taxa @Membro'
+    )
+    async def historico_taxa(self, ctx, membro: discord.Member = None, ciclos: int = 8):
+        membro = membro or ctx.author
+        ciclos = max(1, min(ciclos, 25))
+        historico = await self.bot.db_manager.execute_query(
+            """SELECT c.id, c.inicio, c.fim, p.metodo, p.valor, p.data FROM taxa_ciclos c
+               LEFT JOIN taxa_pagamentos p ON p.ciclo_id = c.id AND p.user_id = $1
+               WHERE c.guild_id = $3
+               ORDER BY c.id DESC LIMIT $2""",
+            membro.id, ciclos, ctx.guild.id, fetch="all")
+        if not historico: return await ctx.send("Ainda não existe nenhum ciclo de taxas registado.")
+
+        icones = {'moedas': '🪙', 'prata': '🥈', 'manual': '🛠️', 'legado': '📁'}
+        linhas = []
+        for h in historico:
+            periodo = f"{h['inicio'].strftime('%d/%m')} – {h['fim'].strftime('%d/%m') if h['fim'] else 'atual'}"
+            if h['metodo']: linhas.append(f"`#{h['id']}` {periodo}: {icones.get(h['metodo'], '✅')} **{h['metodo']}** em {h['data'].strftime('%d/%m %H:%M')}")
+            else: linhas.append(f"`#{h['id']}` {periodo}: ❌ sem pagamento registado")
+        embed = discord.Embed(title=f"🧾 Histórico de Taxas de {membro.display_name}", description="\n".join(linhas), color=discord.Color.gold())
+        await ctx.send(embed=embed)
+
     # --- Comandos de Administração (inalterados) ---
     @commands.command(name="forcar-taxa", hidden=True)
     @check_permission_level(4)
     async def forcar_taxa(self, ctx):
          await ctx.send("🔥 Forçando execução do ciclo de penalidades (sem resetar)...")
-         await self.executar_ciclo_de_taxas(ctx, resetar_ciclo=False)
+         await self.executar_ciclo_de_taxas(ctx.guild, ctx, resetar_ciclo=False)
 
     @commands.command(name="sincronizar-pagamentos", hidden=True)
     @check_permission_level(4)
     async def sincronizar_pagamentos(self, ctx):
-        await ctx.send("⚙️ **Iniciando Sincronização Total de Pagamentos!**\nA analisar pagamentos em moedas e em prata...")
-        configs = await self.bot.db_manager.get_all_configs(['taxa_dia_semana', 'taxa_semanal_valor', 'cargo_inadimplente', 'cargo_membro'])
-        dia_reset = int(configs.get('taxa_dia_semana', '6') or 6)
-        valor_taxa = int(configs.get('taxa_semanal_valor', 0) or 0)
-        hoje = datetime.now(timezone.utc)
-        dias_desde_reset = (hoje.weekday() - dia_reset + 7) % 7
-        ultimo_reset = (hoje - timedelta(days=dias_desde_reset)).replace(hour=12, minute=0, second=0, microsecond=0)
-
-        pagamentos_moedas = await self.bot.db_manager.execute_query("SELECT DISTINCT user_id FROM transacoes WHERE (descricao LIKE 'Pagamento de taxa semanal%') AND data >= $1 AND valor = $2", ultimo_reset, valor_taxa, fetch="all")
-        pagadores_moedas_ids = {p['user_id'] for p in pagamentos_moedas} if pagamentos_moedas else set()
-        pagamentos_prata = await self.bot.db_manager.execute_query("SELECT user_id FROM submissoes_taxa WHERE status = 'aprovado'", fetch="all")
-        pagadores_prata_ids = {p['user_id'] for p in pagamentos_prata} if pagamentos_prata else set()
-        todos_pagadores_ids = pagadores_moedas_ids.union(pagadores_prata_ids)
-        if not todos_pagadores_ids: return await ctx.send("Nenhum pagamento (moedas ou prata) encontrado para sincronizar.")
+        await ctx.send("⚙️ **Iniciando Sincronização de Pagamentos!**\nA analisar os pagamentos registados no ciclo atual...")
+        configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['cargo_inadimplente', 'cargo_membro'])
+        # Consulta limitada ao ciclo aberto (indexada por ciclo_id), em vez de varrer todo o histórico
+        pagamentos = await self.bot.db_manager.execute_query(
+            """SELECT c.id AS ciclo_id, c.inicio, p.user_id FROM taxa_ciclos c
+               LEFT JOIN taxa_pagamentos p ON p.ciclo_id = c.id
+               WHERE c.id = (SELECT id FROM taxa_ciclos WHERE guild_id = $1 AND fim IS NULL ORDER BY id DESC LIMIT 1)""", ctx.guild.id, fetch="all")
+        if not pagamentos: return await ctx.send("❌ Nenhum ciclo de taxas aberto. Use `!initdb` para o criar.")
+        ciclo_id, inicio_ciclo = pagamentos[0]['ciclo_id'], pagamentos[0]['inicio']
+        todos_pagadores_ids = {p['user_id'] for p in pagamentos if p['user_id']}
+        if not todos_pagadores_ids: return await ctx.send(f"Nenhum pagamento (moedas ou prata) registado no ciclo #{ciclo_id} para sincronizar.")
+
+        # Garante o status PAGO de todos os pagadores numa única instrução (sem rebaixar PAGO_ANTECIPADO/MANUAL)
+        await self.bot.db_manager.execute_query(
+            """INSERT INTO taxas (guild_id, user_id, status_ciclo) SELECT $2::BIGINT, unnest($1::BIGINT[]), 'PAGO_ATRASADO'
+               ON CONFLICT (guild_id, user_id) DO UPDATE SET status_ciclo = 'PAGO_ATRASADO' WHERE taxas.status_ciclo NOT LIKE 'PAGO_%'""",
+            list(todos_pagadores_ids), ctx.guild.id)
 
         corrigidos, ja_regulares = [], []
         for user_id in todos_pagadores_ids:
             membro = ctx.guild.get_member(user_id)
             if not membro: continue
-            await self.bot.db_manager.execute_query("INSERT INTO taxas (user_id, status_ciclo) VALUES ($1, 'PAGO_ATRASADO') ON CONFLICT (user_id) DO UPDATE SET status_ciclo = 'PAGO_ATRASADO'", user_id)
             cargo_inadimplente = ctx.guild.get_role(int(configs.get('cargo_inadimplente', '0') or 0))
             if cargo_inadimplente and cargo_inadimplente in membro.roles:
                 await self.regularizar_membro(membro, configs); corrigidos.append(membro.mention)
             else: ja_regulares.append(membro.mention)
 
-        embed = discord.Embed(title="✅ Sincronização de Pagamentos Concluída", description=f"Analisado período desde {ultimo_reset.strftime('%d/%m %H:%M')} UTC.")
+        embed = discord.Embed(title="✅ Sincronização de Pagamentos Concluída", description=f"Analisado o ciclo #{ciclo_id}, aberto em {inicio_ciclo.strftime('%d/%m %H:%M')} UTC.")
         embed.add_field(name=f"Acesso Restaurado ({len(corrigidos)})", value=format_list_for_embed(corrigidos), inline=False)
         embed.add_field(name=f"Pagamentos Contabilizados ({len(ja_regulares)})", value=format_list_for_embed(ja_regulares), inline=False)
         await ctx.send(embed=embed)
@@ -419,40 +533,43 @@ class Taxas(commands.Cog):
          await ctx.send("Use `!taxamanual <status> <@membro>`. Status: `pago`, `isento`, `removerpago`, `removerisento`.")
 
     async def _log_manual_action(self, ctx, membro, acao):
-        if canal_log := self.bot.get_channel(int(await self.bot.db_manager.get_config_value('canal_log_taxas', '0') or 0)):
+        if canal_log := ctx.guild.get_channel(int(await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_log_taxas', '0') or 0)):
             await canal_log.send(f"ℹ️ **Ação Manual:** {ctx.author.mention} definiu o status de {membro.mention} como **{acao}**.")
     @taxa_manual.command(name="pago", hidden=True)
     async def taxa_manual_pago(self, ctx, membro: discord.Member):
         try:
-            configs = await self.bot.db_manager.get_all_configs(['cargo_inadimplente', 'cargo_membro'])
-            await self.bot.db_manager.execute_query("INSERT INTO taxas (user_id, status_ciclo) VALUES ($1, 'PAGO_MANUAL') ON CONFLICT (user_id) DO UPDATE SET status_ciclo = 'PAGO_MANUAL'", membro.id)
+            configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['cargo_inadimplente', 'cargo_membro'])
+            await self.bot.db_manager.executar(
+                consultas.TAXA_REGISTAR_PAGAMENTO, ctx.guild.id, membro.id, 'PAGO_MANUAL', 'manual', str(ctx.author.id), None)
             await self.regularizar_membro(membro, configs); await ctx.send(f"✅ {membro.mention} marcado como **PAGO**."); await self._log_manual_action(ctx, membro, "PAGO_MANUAL")
         except Exception as e: await ctx.send(f"❌ Erro: {e}")
     @taxa_manual.command(name="isento", hidden=True)
     async def taxa_manual_isento(self, ctx, membro: discord.Member):
         try:
-            configs = await self.bot.db_manager.get_all_configs(['cargo_inadimplente', 'cargo_membro'])
-            await self.bot.db_manager.execute_query("INSERT INTO taxas (user_id, status_ciclo) VALUES ($1, 'ISENTO_MANUAL') ON CONFLICT (user_id) DO UPDATE SET status_ciclo = 'ISENTO_MANUAL'", membro.id)
+            configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['cargo_inadimplente', 'cargo_membro'])
+            await self.bot.db_manager.executar(consultas.TAXA_DEFINIR_ESTADO, ctx.guild.id, membro.id, 'ISENTO_MANUAL')
             await self.regularizar_membro(membro, configs); await ctx.send(f"✅ {membro.mention} marcado como **ISENTO**."); await self._log_manual_action(ctx, membro, "ISENTO_MANUAL")
         except Exception as e: await ctx.send(f"❌ Erro: {e}")
     @taxa_manual.command(name="removerpago", hidden=True)
     async def taxa_manual_remover_pago(self, ctx, membro: discord.Member):
         try:
-            await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE user_id = $1 AND status_ciclo LIKE 'PAGO_%'", membro.id)
+            await self.bot.db_manager.execute_query(
+                f"""WITH removido AS (DELETE FROM taxa_pagamentos WHERE ciclo_id = {CICLO_ATUAL.format(guild='$2')} AND user_id = $1)
+                    UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE guild_id = $2 AND user_id = $1 AND status_ciclo LIKE 'PAGO_%'""", membro.id, ctx.guild.id)
             await ctx.send(f"✅ Status PAGO removido de {membro.mention}. Status: **PENDENTE**."); await self._log_manual_action(ctx, membro, "PENDENTE (Remoção de PAGO)")
         except Exception as e: await ctx.send(f"❌ Erro: {e}")
     @taxa_manual.command(name="removerisento", hidden=True)
     async def taxa_manual_remover_isento(self, ctx, membro: discord.Member):
         try:
-            await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE user_id = $1 AND status_ciclo LIKE 'ISENTO_%'", membro.id)
+            await self.bot.db_manager.execute_query("UPDATE taxas SET status_ciclo = 'PENDENTE' WHERE guild_id = $1 AND user_id = $2 AND status_ciclo LIKE 'ISENTO_%'", ctx.guild.id, membro.id)
             await ctx.send(f"✅ Status ISENTO removido de {membro.mention}. Status: **PENDENTE**."); await self._log_manual_action(ctx, membro, "PENDENTE (Remoção de ISENTO)")
         except Exception as e: await ctx.send(f"❌ Erro: {e}")
 
     async def _controlar_canal_pagamento(self, ctx, abrir: bool):
-        configs = await self.bot.db_manager.get_all_configs(['canal_pagamento_taxas', 'cargo_membro'])
+        configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['canal_pagamento_taxas', 'cargo_membro'])
         canal_id = int(configs.get('canal_pagamento_taxas', '0') or 0); cargo_id = int(configs.get('cargo_membro', '0') or 0)
         if not canal_id or not cargo_id: return await ctx.send("❌ Canal ou cargo membro não configurados.")
-        canal = self.bot.get_channel(canal_id); cargo = ctx.guild.get_role(cargo_id)
+        canal = ctx.guild.get_channel(canal_id); cargo = ctx.guild.get_role(cargo_id)
         if not canal or not cargo: return await ctx.send("❌ Canal ou cargo não encontrados.")
         try:
             perms = canal.overwrites_for(cargo); perms.send_messages = abrir
@@ -466,9 +583,9 @@ class Taxas(commands.Cog):
     @check_permission_level(4)
     async def fechar_canal_pagamento(self, ctx): await self._controlar_canal_pagamento(ctx, abrir=False)
 
-    async def _construir_embed_instrucoes(self):
-        valor_taxa = await self.bot.db_manager.get_config_value('taxa_semanal_valor', '0')
-        aceita_moedas = (await self.bot.db_manager.get_config_value('taxa_aceitar_moedas', 'true') or 'true') == 'true'
+    async def _construir_embed_instrucoes(self, guild_id: int):
+        valor_taxa = await self.bot.db_manager.get_config_value(guild_id, 'taxa_semanal_valor', '0')
+        aceita_moedas = (await self.bot.db_manager.get_config_value(guild_id, 'taxa_aceitar_moedas', 'true') or 'true') == 'true'
         embed = discord.Embed(title="🪙 Instruções para Pagamento da Taxa Semanal", description=f"A taxa semanal é de **{valor_taxa} moedas**. Veja abaixo como pagar:", color=discord.Color.gold())
         if aceita_moedas:
             embed.add_field(name="Opção 1: Pagar com Moedas (GC 🪙)", value="- Use o comando `!pagar-taxa` neste canal.\n- O valor será debitado **automaticamente**.\n- O seu acesso é restaurado **imediatamente**.", inline=False)
@@ -480,7 +597,7 @@ class Taxas(commands.Cog):
         return embed
 
     async def _enviar_instrucoes_pagamento(self, canal: discord.TextChannel):
-        embed_instrucoes = await self._construir_embed_instrucoes()
+        embed_instrucoes = await self._construir_embed_instrucoes(canal.guild.id)
         try:
              async for msg in canal.history(limit=10):
                  if msg.pinned and msg.author == self.bot.user and msg.embeds and msg.embeds[0].title.startswith("🪙 Instruções"):
@@ -489,14 +606,14 @@ class Taxas(commands.Cog):
              msg_instrucoes = await canal.send(embed=embed_instrucoes)
              try: await msg_instrucoes.pin()
              except Exception: pass
-        except Exception as e: print(f"Erro ao enviar/fixar instruções: {e}")
+        except Exception as e: log.error("Erro ao enviar/fixar instruções: %s", e)
 
     @commands.command(name="limparcanalpagamento", hidden=True)
     @check_permission_level(4)
     async def limpar_canal_pagamento(self, ctx):
-        canal_id = int(await self.bot.db_manager.get_config_value('canal_pagamento_taxas', '0') or 0)
+        canal_id = int(await self.bot.db_manager.get_config_value(ctx.guild.id, 'canal_pagamento_taxas', '0') or 0)
         if not canal_id: return await ctx.send("❌ Canal de pagamento não configurado.")
-        canal = self.bot.get_channel(canal_id)
+        canal = ctx.guild.get_channel(canal_id)
         if not canal: return await ctx.send("❌ Canal de pagamento não encontrado.")
         if canal != ctx.channel: return await ctx.send(f"❌ Comando deve ser usado em {canal.mention}.")
 
@@ -512,7 +629,7 @@ class Taxas(commands.Cog):
     @check_permission_level(4)
     async def definir_taxa(self, ctx, valor: int):
         if valor < 0: return await ctx.send("❌ O valor não pode ser negativo.")
-        await self.bot.db_manager.set_config_value('taxa_semanal_valor', str(valor))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'taxa_semanal_valor', str(valor))
         await ctx.send(f"✅ Valor da taxa semanal definido para **{valor}** moedas.")
 
     @commands.command(name="definir-taxa-dia", hidden=True)
@@ -520,7 +637,7 @@ class Taxas(commands.Cog):
     async def definir_taxa_dia(self, ctx, dia_da_semana: int):
         if not 0 <= dia_da_semana <= 6: return await ctx.send("❌ Dia inválido (0=Segunda, 6=Domingo).")
         dias = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
-        await self.bot.db_manager.set_config_value('taxa_dia_semana', str(dia_da_semana))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'taxa_dia_semana', str(dia_da_semana))
         await ctx.send(f"✅ O ciclo de reset das taxas foi agendado para **{dias[dia_da_semana]}**.")
 
     @commands.command(name="definir-taxa-dia-abertura", hidden=True)
@@ -528,7 +645,7 @@ class Taxas(commands.Cog):
     async def definir_taxa_dia_abertura(self, ctx, dia_da_semana: int):
         if not 0 <= dia_da_semana <= 6: return await ctx.send("❌ Dia inválido (0=Segunda, 6=Domingo).")
         dias = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
-        await self.bot.db_manager.set_config_value('taxa_dia_abertura', str(dia_da_semana))
+        await self.bot.db_manager.set_config_value(ctx.guild.id, 'taxa_dia_abertura', str(dia_da_semana))
         await ctx.send(f"✅ Janela de pagamento de taxas abrirá toda **{dias[dia_da_semana]}**.")
 
 
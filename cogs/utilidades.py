@@ -1,8 +1,10 @@
+import logging
 import discord
 from discord.ext import commands
 from utils.permissions import check_permission_level
 from datetime import datetime, date
-import asyncio
+
+log = logging.getLogger(__name__)
 
 class Utilidades(commands.Cog):
     def __init__(self, bot):
@@ -18,14 +20,14 @@ class Utilidades(commands.Cog):
     @commands.command(name="info-moeda", aliases=["infomoeda"])
     async def info_moeda(self, ctx):
         """Mostra as estatísticas vitais da economia da guilda."""
-        configs = await self.bot.db_manager.get_all_configs(['lastro_total_prata', 'taxa_conversao_prata'])
+        configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['lastro_total_prata', 'taxa_conversao_prata'])
         total_prata = int(configs.get('lastro_total_prata', '0'))
         taxa_conversao = int(configs.get('taxa_conversao_prata', '1000'))
         
         suprimento_maximo = total_prata // taxa_conversao if taxa_conversao > 0 else 0
         
         economia_cog = self.bot.get_cog('Economia')
-        saldo_tesouro = await economia_cog.get_saldo(self.ID_TESOURO_GUILDA)
+        saldo_tesouro = await economia_cog.get_saldo(ctx.guild.id, self.ID_TESOURO_GUILDA)
 
         moedas_em_circulacao = suprimento_maximo - saldo_tesouro
 
@@ -56,14 +58,14 @@ class Utilidades(commands.Cog):
         user_id = ctx.author.id
         
         transacoes = await self.bot.db_manager.execute_query(
-            "SELECT tipo, valor, descricao, data FROM transacoes WHERE user_id = $1 AND DATE(data AT TIME ZONE 'UTC') = $2 ORDER BY data DESC",
-            user_id, data_alvo,
+            "SELECT tipo, valor, descricao, data FROM transacoes WHERE guild_id = $3 AND user_id = $1 AND DATE(data AT TIME ZONE 'UTC') = $2 ORDER BY data DESC",
+            user_id, data_alvo, ctx.guild.id,
             fetch="all"
         )
         
         renda_passiva = await self.bot.db_manager.execute_query(
-            "SELECT tipo, SUM(valor) as total FROM renda_passiva_log WHERE user_id = $1 AND data = $2 GROUP BY tipo",
-            user_id, data_alvo,
+            "SELECT tipo, SUM(valor) as total FROM renda_passiva_log WHERE guild_id = $3 AND user_id = $1 AND data = $2 GROUP BY tipo",
+            user_id, data_alvo, ctx.guild.id,
             fetch="all"
         )
 
@@ -115,13 +117,13 @@ class Utilidades(commands.Cog):
         
         try:
             # Utiliza a nova função segura que garante o lastro
-            await economia_cog.transferir_do_tesouro(membro.id, valor, f"Emissão de moedas por {ctx.author.name}")
+            await economia_cog.transferir_do_tesouro(ctx.guild.id, membro.id, valor, f"Emissão de moedas por {ctx.author.name}")
             await ctx.send(f"✅ Emissão de **{valor}** moedas para {membro.mention} processada com sucesso.")
         except ValueError as e:
             await ctx.send(f"❌ Erro: {e}")
         except Exception as e:
             await ctx.send("Ocorreu um erro inesperado ao processar a emissão.")
-            print(f"Erro no comando emitir: {e}")
+            log.error("Erro no comando emitir: %s", e)
 
     @commands.command(name="resgatar")
     @check_permission_level(3)
@@ -132,13 +134,13 @@ class Utilidades(commands.Cog):
         economia_cog = self.bot.get_cog('Economia')
         
         try:
-            await economia_cog.levantar(membro.id, valor, f"Resgate de moedas por {ctx.author.name}")
+            await economia_cog.levantar(ctx.guild.id, membro.id, valor, f"Resgate de moedas por {ctx.author.name}")
 
-            configs = await self.bot.db_manager.get_all_configs(['canal_resgates', 'taxa_conversao_prata'])
+            configs = await self.bot.db_manager.get_all_configs(ctx.guild.id, ['canal_resgates', 'taxa_conversao_prata'])
             canal_resgates_id = int(configs.get('canal_resgates', '0'))
 
             if canal_resgates_id != 0:
-                canal = self.bot.get_channel(canal_resgates_id)
+                canal = ctx.guild.get_channel(canal_resgates_id)
                 if canal:
                     taxa_conversao = int(configs.get('taxa_conversao_prata', '1000'))
                     valor_prata = valor * taxa_conversao
@@ -172,20 +174,13 @@ class Utilidades(commands.Cog):
 
         economia_cog = self.bot.get_cog('Economia')
         
-        msg_espera = await ctx.send(f"A iniciar o airdrop de **{valor}** moedas para **{len(membros_alvo)}** membros. Isto pode demorar um pouco...")
+        msg_espera = await ctx.send(f"A iniciar o airdrop de **{valor}** moedas para **{len(membros_alvo)}** membros...")
 
-        erros = 0
-        sucessos = 0
-        for membro in membros_alvo:
-            try:
-                await economia_cog.depositar(membro.id, valor, "Airdrop da Administração")
-                sucessos += 1
-            except Exception as e:
-                print(f"Erro ao depositar airdrop para {membro.name}: {e}")
-                erros += 1
-            await asyncio.sleep(0.2) 
-
-        await msg_espera.edit(content=f"✅ Airdrop concluído! **{sucessos}** membros receberam as moedas. Falhas: **{erros}**.")
+        # Todos os membros em lotes (saldos num UPSERT, extrato por COPY); um lote que falha não trava os outros
+        relatorio = await economia_cog.depositar_em_lote(ctx.guild.id, [m.id for m in membros_alvo], valor, "Airdrop da Administração")
+        log.info("Airdrop de %s na guilda %s: %s", valor, ctx.guild.id, relatorio.resumo())
+
+        await msg_espera.edit(content=f"✅ Airdrop concluído! **{relatorio.linhas}** membros receberam as moedas. Falhas: **{relatorio.linhas_falhadas}**.")
 
 
 async def setup(bot):
@@ -1,18 +1,38 @@
+import logging
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import asyncio
 import difflib
+import math
+import time
+from datetime import datetime, timezone
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Rastreio de comandos: fração de invocações amostradas e tamanho do buffer
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+TRACE_BUFFER = int(os.getenv('TRACE_BUFFER', '200'))
+# Endpoint /metrics (Prometheus); METRICS_PORT=0 desativa
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
 
 # Importa os componentes de utilidades
 from utils.db_manager import DatabaseManager
+from utils.agendador import Agendador
+from utils.lideranca import EleicaoLider
+from utils.admissao import ControladorAdmissao
+from utils.vigia_loop import VigiaLoop
+from utils.metricas import METRICAS, ServidorMetricas, COMANDOS_TOTAL, COMANDOS_LATENCIA
+from utils.rastreio import Rastreador, registar_span
+from utils.logs import configurar_logs, definir_contexto
 from utils.views import OrbeAprovacaoView, TaxaPrataView
+from cogs.eventos import EventoBotao
+
+log = logging.getLogger(__name__)
 
 # Define as intenções do bot
 intents = discord.Intents.default()
@@ -25,6 +45,10 @@ intents.reactions = True
 
 # --- CHECK GLOBAL PARA RESTRIÇÃO DE CANAIS ---
 async def global_channel_check(ctx):
+    # Em DMs não há guilda (nem configurações/economia); só a ajuda funciona
+    if ctx.guild is None:
+        return ctx.command is not None and ctx.command.name == 'ajuda'
+
     # Administradores podem sempre
     if ctx.author.guild_permissions.administrator:
         return True
@@ -50,42 +74,55 @@ async def global_channel_check(ctx):
                 pass
         return False
 
-    # Em DMs permite
-    return True
-
-class ArautoBankBot(commands.Bot):
+# AutoShardedBot: o número de shards é o recomendado pelo Discord; todas as guildas são servidas por este processo
+class ArautoBankBot(commands.AutoShardedBot):
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents, case_insensitive=True)
+        self.rastreador = Rastreador(TRACE_SAMPLE_RATE, TRACE_BUFFER)
+        super().__init__(command_prefix='!', intents=intents, case_insensitive=True, http_trace=self.rastreador.trace_config())
         self.db_manager = DatabaseManager(dsn=DATABASE_URL)
+        self.agendador = Agendador(self)
+        self.lideranca = EleicaoLider(self, dsn=DATABASE_URL)
+        self.vigia = VigiaLoop()
+        self.iniciado_em = datetime.now(timezone.utc)
+        self.admissao = ControladorAdmissao(self)
+        self.servidor_metricas = ServidorMetricas(METRICAS, METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
         self.allowed_categories = ["🏦 ARAUTO BANK", "💸 TAXA SEMANAL", "⚙️ ADMINISTRAÇÃO"]
 
         # Remove comando de ajuda padrão e adiciona check global
         self.remove_command('help')
         self.add_check(global_channel_check)
+        self.before_invoke(self._antes_do_comando)
+        self.after_invoke(self._depois_do_comando)
 
     async def setup_hook(self):
-        print("A executar setup_hook...")
+        log.info("A executar setup_hook...")
         await self.db_manager.connect()
+        await self.lideranca.iniciar()
+        await self.iniciar_metricas()
+        self.vigia.iniciar()
+        self.admissao.iniciar()
 
         # Regista views persistentes
         try:
             self.add_view(OrbeAprovacaoView(self))
             self.add_view(TaxaPrataView(self))
-            print("Vistas persistentes registadas.")
+            # Botões de eventos: um único registo dinâmico serve todos os eventos
+            self.add_dynamic_items(EventoBotao)
+            log.info("Vistas persistentes registadas.")
         except Exception as e:
-            print(f"Aviso: falha ao registar views persistentes: {e}")
+            log.warning("Aviso: falha ao registar views persistentes: %s", e)
 
         # Carrega cog de admin primeiro para inicializar DB
         try:
             await self.load_extension('cogs.admin')
             admin_cog = self.get_cog('Admin')
             if admin_cog:
-                print("A inicializar o esquema da base de dados...")
+                log.info("A inicializar o esquema da base de dados...")
                 await admin_cog.initialize_database_schema()
             else:
                 raise Exception("Não foi possível obter o Cog Admin após carregamento.")
         except Exception as e:
-            print(f"ERRO CRÍTICO ao carregar/inicializar o Admin Cog: {e}")
+            log.error("ERRO CRÍTICO ao carregar/inicializar o Admin Cog: %s", e)
             return
 
         # Lista de cogs principais
@@ -96,15 +133,71 @@ class ArautoBankBot(commands.Bot):
         for cog_name in cogs_to_load:
             try:
                 await self.load_extension(cog_name)
-                print(f"Cog '{cog_name}' carregado com sucesso.")
+                log.info("Cog '%s' carregado com sucesso.", cog_name)
             except Exception as e:
-                print(f"ERRO ao carregar o cog '{cog_name}': {e}")
+                log.error("ERRO ao carregar o cog '%s': %s", cog_name, e)
+
+        # Inicia o agendador depois de todos os cogs registarem as suas tarefas
+        self.agendador.iniciar()
+        log.info("Setup_hook concluído.")
+
+    async def iniciar_metricas(self):
+        self.db_manager.registar_metricas()
+        METRICAS.gauge('arauto_gateway_latencia_segundos', 'Latência do heartbeat do gateway, por shard.',
+                       lambda: {(str(shard_id),): latencia for shard_id, latencia in self.latencies if math.isfinite(latencia)}, ('shard',))
+        METRICAS.gauge('arauto_lider', '1 se este processo é o líder.', lambda: int(self.e_lider))
+        if not self.servidor_metricas: return
+        try:
+            await self.servidor_metricas.iniciar()
+        except OSError as e:
+            # Uma porta ocupada não deve impedir o bot de arrancar
+            log.warning("Aviso: não foi possível iniciar o servidor de métricas: %s", e)
+            self.servidor_metricas = None
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        inicio = ctx.inicio_invocacao = time.perf_counter()
+        nome = ctx.command.qualified_name
+        definir_contexto(guild=ctx.guild.id if ctx.guild else None, user=ctx.author.id, command=nome)
+        # A amostragem é decidida aqui para que checks e conversores também fiquem no rastreio
+        self.rastreador.iniciar(ctx)
+        try:
+            await super().invoke(ctx)
+        finally:
+            self.rastreador.terminar(ctx) # Checks falhados não chegam ao after_invoke
+            duracao = time.perf_counter() - inicio
+            resultado = 'erro' if ctx.command_failed else 'ok'
+            COMANDOS_LATENCIA.observar(duracao, nome)
+            COMANDOS_TOTAL.inc(nome, resultado)
+            log.info("Comando %s concluído (%s)", nome, resultado, extra={'duracao': duracao})
 
-        print("Setup_hook concluído.")
+    async def _antes_do_comando(self, ctx):
+        # Tudo o que correu até aqui foram checks de permissão e conversão de argumentos
+        registar_span('comando', 'checks e argumentos', ctx.inicio_invocacao, time.perf_counter() - ctx.inicio_invocacao)
+
+    async def _depois_do_comando(self, ctx):
+        self.rastreador.terminar(ctx)
+
+    async def close(self):
+        self.admissao.parar()
+        self.vigia.parar()
+        if self.servidor_metricas:
+            await self.servidor_metricas.parar()
+        await super().close()
+
+    @property
+    def e_lider(self) -> bool:
+        """Só o processo líder executa comandos, renda passiva e tarefas em segundo plano."""
+        return self.lideranca.e_lider
+
+    async def on_message(self, message):
+        # Instâncias em standby recebem o gateway mas não respondem a comandos
+        if not self.e_lider: return
+        await self.process_commands(message)
 
     async def on_ready(self):
-        print(f'Logado como {self.user.name} (ID: {self.user.id})')
-        print('------')
+        log.info("Logado como %s (ID: %s) em %s guilda(s), %s shard(s)", self.user.name, self.user.id, len(self.guilds), self.shard_count)
 
     # --- FUNÇÃO on_command_error ATUALIZADA ---
     async def on_command_error(self, ctx, error):
@@ -177,10 +270,17 @@ class ArautoBankBot(commands.Bot):
              except Exception:
                  pass
 
+        elif isinstance(error, commands.MaxConcurrencyReached):
+             try:
+                 await ctx.send(f"⏳ {ctx.author.mention}, o comando `!{ctx.command.name}` já está a correr neste servidor. Aguarde que termine.", delete_after=30)
+             except Exception:
+                 pass
+
         elif isinstance(error, commands.CommandInvokeError):
              # Erros que acontecem DENTRO da lógica do comando
              original = getattr(error, "original", error)
-             print(f"Erro ao invocar comando '{getattr(ctx.command, 'qualified_name', str(ctx.command))}': {original}")
+             log.error("Erro ao invocar comando '%s': %s", getattr(ctx.command, 'qualified_name', str(ctx.command)), original,
+                       exc_info=(type(original), original, original.__traceback__))
              try:
                  await ctx.send(
                      f"🤯 {ctx.author.mention}, ocorreu um erro inesperado ao executar o comando `!{ctx.command.name}`. "
@@ -194,7 +294,7 @@ class ArautoBankBot(commands.Bot):
         else:
              # Outros erros genéricos da biblioteca
              try:
-                 print(f"Erro inesperado não tratado para o comando '{getattr(ctx.command, 'qualified_name', str(ctx.command))}': {error}")
+                 log.error("Erro inesperado não tratado para o comando '%s': %s", getattr(ctx.command, 'qualified_name', str(ctx.command)), error)
                  await ctx.send(
                      f"🤔 {ctx.author.mention}, algo correu mal com o comando `!{ctx.command.name}`. "
                      f"Erro: `{error}`",
@@ -205,8 +305,10 @@ class ArautoBankBot(commands.Bot):
 
 # --- Iniciar o Bot ---
 if __name__ == "__main__":
+    configurar_logs()
     if not TOKEN or not DATABASE_URL:
-        print("ERRO CRÍTICO: DISCORD_TOKEN ou DATABASE_URL não definidos no .env")
+        log.error("ERRO CRÍTICO: DISCORD_TOKEN ou DATABASE_URL não definidos no .env")
     else:
         bot = ArautoBankBot()
-        bot.run(TOKEN)
+        # log_handler=None: os registos do discord.py seguem pela mesma fila (configurar_logs)
+        bot.run(TOKEN, log_handler=None)
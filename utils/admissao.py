@@ -0,0 +1,103 @@
+import logging
+import asyncio
+import os
+from collections import OrderedDict
+from utils.metricas import METRICAS
+from utils.db_manager import em_segundo_plano
+
+log = logging.getLogger(__name__)
+
+NORMAL, ADIAR, DESCARTAR = 'normal', 'adiar', 'descartar'
+_NIVEIS = {NORMAL: 0, ADIAR: 1, DESCARTAR: 2}
+
+RENDA_PASSIVA_ADIADA = METRICAS.contador('arauto_renda_passiva_adiada_total', 'Pagamentos de renda passiva adiados por pressão, por tipo.', ('tipo',))
+RENDA_PASSIVA_DESCARTADA = METRICAS.contador('arauto_renda_passiva_descartada_total', 'Pagamentos de renda passiva descartados, por tipo e motivo.', ('tipo', 'motivo'))
+
+class ControladorAdmissao:
+    """Decide se a renda passiva corre já, é adiada ou é descartada, consoante a pressão no sistema.
+
+    Sinais: espera recente por conexões do pool e atraso (lag) do event loop (medido pelo VigiaLoop). Acima de `limite_adiar`
+    os pagamentos ficam numa fila em memória e são aplicados quando a pressão baixa; acima de
+    `limite_descartar` são descartados. Só se volta a um modo mais leve quando o sinal desce abaixo
+    de metade do limite (histerese), para não oscilar. Os comandos nunca passam por aqui."""
+    def __init__(self, bot, limite_adiar: float = None, limite_descartar: float = None, capacidade: int = 5000, intervalo: float = 0.5):
+        self.bot = bot
+        self.limite_adiar = limite_adiar if limite_adiar is not None else float(os.getenv('ADMISSAO_ADIAR_MS', '100')) / 1000
+        self.limite_descartar = limite_descartar if limite_descartar is not None else float(os.getenv('ADMISSAO_DESCARTAR_MS', '500')) / 1000
+        self.capacidade = capacidade
+        self.intervalo = intervalo
+        self.modo = NORMAL
+        self.adiados = OrderedDict() # {chave: (tipo, funcao_async, quantidade)}, aplicados por ordem de chegada
+        self.contagens = {'adiados': 0, 'descartados': 0, 'aplicados': 0}
+        self._tarefa = None
+        METRICAS.gauge('arauto_admissao_modo', 'Modo de degradação da renda passiva (0=normal, 1=adiar, 2=descartar).', lambda: _NIVEIS[self.modo])
+        METRICAS.gauge('arauto_admissao_fila', 'Pagamentos de renda passiva adiados à espera.', lambda: self.em_fila)
+
+    @property
+    def em_fila(self) -> int:
+        """Pagamentos adiados à espera (um pagamento em lote conta os membros que paga)."""
+        return sum(quantidade for _, _, quantidade in self.adiados.values())
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+
+    def parar(self):
+        if self._tarefa: self._tarefa.cancel()
+
+    def pressao(self) -> float:
+        """Pior dos sinais, em segundos."""
+        return max(self.bot.db_manager.espera_recente(), self.bot.vigia.lag_recente())
+
+    def _avaliar(self):
+        pressao = self.pressao()
+        if pressao >= self.limite_descartar or (self.modo == DESCARTAR and pressao >= self.limite_descartar / 2): novo = DESCARTAR
+        elif pressao >= self.limite_adiar or (self.modo != NORMAL and pressao >= self.limite_adiar / 2): novo = ADIAR
+        else: novo = NORMAL
+        if novo != self.modo:
+            log.info("[Admissão] Renda passiva: %s -> %s (pressão %.0fms; adiados %s, descartados %s, em fila %s)", self.modo, novo, pressao * 1000, self.contagens['adiados'], self.contagens['descartados'], self.em_fila)
+            self.modo = novo
+
+    def descartar(self, tipo: str, motivo: str = 'pressao', quantidade: int = 1):
+        self.contagens['descartados'] += quantidade
+        RENDA_PASSIVA_DESCARTADA.inc(tipo, motivo, valor=quantidade)
+
+    async def submeter(self, tipo: str, chave, funcao, quantidade: int = 1) -> bool:
+        """Executa `funcao()` (renda passiva) já, adia-a ou descarta-a conforme o modo atual.
+        `chave` identifica o pagamento; um pagamento com a mesma chave já em fila não é duplicado.
+        `quantidade` é o número de membros pagos por `funcao` (pagamentos em lote), para as contagens.
+        Devolve True se foi executado ou adiado."""
+        if self.modo == NORMAL and not self.adiados:
+            await funcao()
+            return True
+        if self.modo == DESCARTAR:
+            self.descartar(tipo, quantidade=quantidade)
+            return False
+        if chave in self.adiados:
+            return True
+        if len(self.adiados) >= self.capacidade:
+            self.descartar(tipo, 'fila_cheia', quantidade)
+            return False
+        self.adiados[chave] = (tipo, funcao, quantidade)
+        self.contagens['adiados'] += quantidade
+        RENDA_PASSIVA_ADIADA.inc(tipo, valor=quantidade)
+        return True
+
+    async def _drenar(self):
+        """Aplica os pagamentos adiados enquanto o sistema estiver em modo normal."""
+        with em_segundo_plano():
+            while self.adiados and self.modo == NORMAL:
+                _, (tipo, funcao, quantidade) = self.adiados.popitem(last=False)
+                try:
+                    await funcao()
+                    self.contagens['aplicados'] += quantidade
+                except Exception as e: log.error("[Admissão] Erro ao aplicar renda passiva adiada (%s): %s", tipo, e)
+                self._avaliar()
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            self._avaliar()
+            if self.modo == NORMAL and self.adiados and self.bot.e_lider:
+                try: await self._drenar()
+                except Exception as e: log.error("[Admissão] Erro ao drenar a fila de renda passiva: %s", e)
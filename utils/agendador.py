@@ -0,0 +1,173 @@
+import logging
+import asyncio
+import os
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from utils.metricas import registar_tarefa
+from utils.db_manager import em_segundo_plano
+
+log = logging.getLogger(__name__)
+
+# Fuso horário único de todas as tarefas agendadas (definível por variável de ambiente)
+FUSO_HORARIO = ZoneInfo(os.getenv('BOT_TIMEZONE', 'America/Sao_Paulo'))
+
+class Tarefa:
+    """Tarefa diária (ou em dias da semana específicos) a uma hora fixa no FUSO_HORARIO."""
+    def __init__(self, nome: str, horario: time, callback, dias_semana=None):
+        self.nome = nome
+        self.horario = horario
+        self.callback = callback
+        # None = todos os dias; conjunto de weekdays (0=Segunda); ou coroutine que devolve o conjunto
+        self.dias_semana = dias_semana
+        self.ultima_duracao = None
+        # Verificação anterior (momento e ocorrência devida nesse momento), para distinguir downtime de mudanças de horário
+        self.verificada_em = self.ocorrencia_vista = None
+        # Falhas seguidas da ocorrência atual e momento da próxima tentativa
+        self.falhas, self.nova_tentativa = 0, None
+
+    async def _dias(self):
+        if callable(self.dias_semana): return await self.dias_semana()
+        return self.dias_semana
+
+    def _no_dia(self, dia):
+        return datetime.combine(dia, self.horario.replace(tzinfo=FUSO_HORARIO))
+
+    async def ultima_ocorrencia(self, agora: datetime):
+        """Momento agendado mais recente que já passou (até 7 dias para trás)."""
+        dias, hoje = await self._dias(), agora.astimezone(FUSO_HORARIO).date()
+        for recuo in range(8):
+            dia = hoje - timedelta(days=recuo)
+            if dias is None or dia.weekday() in dias:
+                momento = self._no_dia(dia)
+                if momento <= agora: return momento
+        return None
+
+    async def proxima_ocorrencia(self, agora: datetime):
+        dias, hoje = await self._dias(), agora.astimezone(FUSO_HORARIO).date()
+        for avanco in range(9):
+            dia = hoje + timedelta(days=avanco)
+            if dias is None or dia.weekday() in dias:
+                momento = self._no_dia(dia)
+                if momento > agora: return momento
+        return None
+
+class Agendador:
+    """Agendador de tarefas tipo cron com estado persistido na tabela `agendamentos`.
+    Cada tarefa corre uma única vez por ocorrência: após downtime, a ocorrência perdida mais
+    recente é executada ao arrancar, e um advisory lock do Postgres impede execuções em paralelo
+    entre processos. Uma ocorrência que falha é repetida com espera crescente (até TENTATIVAS vezes);
+    uma que passa a existir no passado por mudança do horário (ex: dia da taxa) não é executada."""
+    TENTATIVAS = 5
+    ESPERA_TENTATIVA = 60 # Segundos antes da 2.ª tentativa; duplica a cada falha
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.tarefas = {}
+        self.ultimas_execucoes = {}
+        self._tarefa_loop = None
+        self._acordar = asyncio.Event()
+
+    def registar(self, nome: str, horario: time, callback, dias_semana=None):
+        tarefa = Tarefa(nome, horario, callback, dias_semana)
+        if (anterior := self.tarefas.get(nome)): # Re-registo (ex: on_ready após reconexão): mantém o estado
+            tarefa.ultima_duracao, tarefa.verificada_em, tarefa.ocorrencia_vista = anterior.ultima_duracao, anterior.verificada_em, anterior.ocorrencia_vista
+            tarefa.falhas, tarefa.nova_tentativa = anterior.falhas, anterior.nova_tentativa
+        self.tarefas[nome] = tarefa
+        self._acordar.set()
+
+    def remover(self, nome: str):
+        self.tarefas.pop(nome, None)
+
+    def iniciar(self):
+        if self._tarefa_loop is None or self._tarefa_loop.done():
+            self._tarefa_loop = asyncio.create_task(self._loop())
+
+    def parar(self):
+        if self._tarefa_loop: self._tarefa_loop.cancel()
+
+    async def _get_ultima_execucao(self, tarefa: Tarefa, ocorrencia: datetime):
+        if tarefa.nome in self.ultimas_execucoes: return self.ultimas_execucoes[tarefa.nome]
+        # Primeira vez que a tarefa é vista: regista a ocorrência atual como base, sem executar
+        registo = await self.bot.db_manager.execute_query(
+            """INSERT INTO agendamentos (nome, ultima_execucao) VALUES ($1, $2)
+               ON CONFLICT (nome) DO UPDATE SET nome = EXCLUDED.nome RETURNING ultima_execucao""",
+            tarefa.nome, ocorrencia, fetch="one"
+        )
+        self.ultimas_execucoes[tarefa.nome] = registo['ultima_execucao']
+        return registo['ultima_execucao']
+
+    async def _executar(self, tarefa: Tarefa, ocorrencia: datetime):
+        async with self.bot.db_manager.advisory_lock(f"agendador:{tarefa.nome}") as obtido:
+            if not obtido: return # Outro processo está a executar esta tarefa
+            # Revalida dentro do lock: outro processo pode já ter executado esta ocorrência
+            registo = await self.bot.db_manager.execute_query(
+                "SELECT ultima_execucao FROM agendamentos WHERE nome = $1", tarefa.nome, fetch="one"
+            )
+            if registo and registo['ultima_execucao'] and registo['ultima_execucao'] >= ocorrencia:
+                self.ultimas_execucoes[tarefa.nome] = registo['ultima_execucao']
+                return
+
+            log.info("[Agendador] A executar '%s' (agendada para %s).", tarefa.nome, ocorrencia.isoformat())
+            inicio = asyncio.get_running_loop().time()
+            erro = None
+            try: await tarefa.callback(ocorrencia)
+            except Exception as e: erro = e
+            tarefa.ultima_duracao = asyncio.get_running_loop().time() - inicio
+            registar_tarefa(tarefa.nome.split(':')[0], tarefa.ultima_duracao)
+
+            if erro:
+                tarefa.falhas += 1
+                if tarefa.falhas < self.TENTATIVAS:
+                    # A ocorrência fica por marcar: volta a ser tentada (também após um reinício)
+                    espera = self.ESPERA_TENTATIVA * 2 ** (tarefa.falhas - 1)
+                    tarefa.nova_tentativa = datetime.now(timezone.utc) + timedelta(seconds=espera)
+                    log.error("[Agendador] Erro na tarefa '%s' (tentativa %s de %s, nova tentativa em %ss): %s",
+                              tarefa.nome, tarefa.falhas, self.TENTATIVAS, espera, erro)
+                    return
+                log.error("[Agendador] Tarefa '%s' falhou %s vezes; a ocorrência de %s fica por executar: %s",
+                          tarefa.nome, tarefa.falhas, ocorrencia.isoformat(), erro)
+            tarefa.falhas, tarefa.nova_tentativa = 0, None
+            await self._marcar(tarefa, ocorrencia)
+
+    async def _marcar(self, tarefa: Tarefa, ocorrencia: datetime):
+        await self.bot.db_manager.execute_query(
+            "UPDATE agendamentos SET ultima_execucao = $2 WHERE nome = $1", tarefa.nome, ocorrencia
+        )
+        self.ultimas_execucoes[tarefa.nome] = ocorrencia
+
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        with em_segundo_plano(): await self._ciclo()
+
+    async def _ciclo(self):
+        while True:
+            self._acordar.clear()
+            agora = datetime.now(timezone.utc)
+            proximas = []
+            # Em standby nada é executado; as ocorrências perdidas correm quando este processo for líder
+            for tarefa in (list(self.tarefas.values()) if self.bot.e_lider else []):
+                try:
+                    ocorrencia = await tarefa.ultima_ocorrencia(agora)
+                    nova = ocorrencia != tarefa.ocorrencia_vista
+                    if nova: tarefa.falhas, tarefa.nova_tentativa = 0, None
+                    # Já tinha passado na verificação anterior sem ser a ocorrência devida: foi o horário que mudou
+                    # (ex: reset das taxas mudado para um dia já passado desta semana). Só se recupera o que caiu em downtime.
+                    reagendada = nova and ocorrencia and tarefa.verificada_em and ocorrencia <= tarefa.verificada_em
+                    tarefa.verificada_em, tarefa.ocorrencia_vista = agora, ocorrencia
+                    if ocorrencia:
+                        ultima = await self._get_ultima_execucao(tarefa, ocorrencia)
+                        if ultima is None or ultima < ocorrencia:
+                            if reagendada:
+                                log.info("[Agendador] Horário de '%s' mudou: a ocorrência de %s não é executada.", tarefa.nome, ocorrencia.isoformat())
+                                await self._marcar(tarefa, ocorrencia)
+                            elif tarefa.nova_tentativa is None or tarefa.nova_tentativa <= agora:
+                                await self._executar(tarefa, ocorrencia)
+                    if tarefa.nova_tentativa: proximas.append(tarefa.nova_tentativa)
+                    if (proxima := await tarefa.proxima_ocorrencia(agora)): proximas.append(proxima)
+                except Exception as e: log.error("[Agendador] Erro ao avaliar '%s': %s", tarefa.nome, e)
+
+            # Dorme até à próxima ocorrência (máx. 60s, para apanhar mudanças de configuração)
+            espera = 60.0
+            if proximas: espera = min(espera, max(1.0, (min(proximas) - datetime.now(timezone.utc)).total_seconds()))
+            try: await asyncio.wait_for(self._acordar.wait(), timeout=espera)
+            except asyncio.TimeoutError: pass
@@ -0,0 +1,127 @@
+"""Consultas com nome dos caminhos quentes, declaradas uma única vez.
+
+Os cogs chamam-nas pelo nome:
+    await db_manager.executar(consultas.SALDO, guild_id, user_id, fetch="one")
+Cada uma é preparada uma vez por conexão pela cache de statements do asyncpg (dimensionada para caberem todas),
+por isso não há parse/plano por chamada nem o mesmo SQL escrito de maneiras diferentes em vários cogs.
+O SQL pouco frequente (DDL, relatórios, comandos de administração) continua em execute_query."""
+
+CONSULTAS = {} # {nome: sql}
+
+def consulta(nome: str, sql: str) -> str:
+    if nome in CONSULTAS and CONSULTAS[nome] != sql:
+        raise ValueError(f"Consulta '{nome}' declarada duas vezes com SQL diferente.")
+    CONSULTAS[nome] = sql
+    return nome
+
+# Subquery do ciclo de taxa aberto de uma guilda (há sempre exatamente um por guilda).
+# Usar com CICLO_ATUAL.format(guild='$N'), onde $N é o parâmetro com o guild_id.
+CICLO_ATUAL = "(SELECT id FROM taxa_ciclos WHERE guild_id = {guild} AND fim IS NULL ORDER BY id DESC LIMIT 1)"
+
+# --- Banco e transações ---
+SALDO = consulta('banco.saldo', "SELECT saldo FROM banco WHERE guild_id = $1 AND user_id = $2")
+# Bloqueia as contas até ao fim da transação, sempre pela mesma ordem (duas transferências cruzadas não fazem deadlock)
+BLOQUEAR_SALDOS = consulta('banco.bloquear_saldos',
+    "SELECT user_id, saldo FROM banco WHERE guild_id = $1 AND user_id = ANY($2::BIGINT[]) ORDER BY user_id FOR UPDATE")
+CRIAR_CONTA = consulta('banco.criar_conta', "INSERT INTO banco (guild_id, user_id, saldo) VALUES ($1, $2, 0) ON CONFLICT (guild_id, user_id) DO NOTHING")
+CREDITAR = consulta('banco.creditar', "UPDATE banco SET saldo = saldo + $1 WHERE guild_id = $2 AND user_id = $3")
+DEBITAR = consulta('banco.debitar', "UPDATE banco SET saldo = saldo - $1 WHERE guild_id = $2 AND user_id = $3")
+REGISTAR_TRANSACAO = consulta('transacoes.registar',
+    "INSERT INTO transacoes (guild_id, user_id, tipo, valor, descricao) VALUES ($1, $2, $3, $4, $5)")
+COLUNAS_TRANSACAO = ('guild_id', 'user_id', 'tipo', 'valor', 'descricao') # Para COPY (copiar_registos)
+# Crédito de $3 a cada membro de $2 (criando as contas em falta); o extrato vai à parte, por COPY
+CREDITAR_EM_LOTE = consulta('banco.creditar_em_lote', """INSERT INTO banco (guild_id, user_id, saldo)
+    SELECT $1, membro, $3::BIGINT FROM unnest($2::BIGINT[]) AS membro
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET saldo = banco.saldo + EXCLUDED.saldo""")
+# Débito do tesouro ($3) e crédito a cada destinatário ($1) numa única instrução: ou todos recebem, ou ninguém
+PAGAR_EM_LOTE = consulta('banco.pagar_em_lote', """WITH debito AS (
+        UPDATE banco SET saldo = saldo - $2::BIGINT * cardinality($1::BIGINT[])
+        WHERE guild_id = $5 AND user_id = $3 AND saldo >= $2::BIGINT * cardinality($1::BIGINT[])
+        RETURNING user_id
+    ), credito AS (
+        INSERT INTO banco (guild_id, user_id, saldo)
+        SELECT $5, destinatario, $2::BIGINT FROM unnest($1::BIGINT[]) AS destinatario
+        WHERE EXISTS (SELECT 1 FROM debito)
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET saldo = banco.saldo + EXCLUDED.saldo
+        RETURNING user_id
+    ), registo AS (
+        INSERT INTO transacoes (guild_id, user_id, tipo, valor, descricao)
+        SELECT $5, $3, 'levantamento', $2::BIGINT, 'Pagamento para ' || user_id || ': ' || $4::TEXT FROM credito
+        UNION ALL
+        SELECT $5, user_id, 'deposito', $2::BIGINT, $4::TEXT FROM credito
+    )
+    SELECT count(*) AS pagos FROM credito""")
+
+# --- Configurações ---
+CONFIGS_GUILDA = consulta('configuracoes.guilda', "SELECT chave, valor FROM configuracoes WHERE guild_id = $1")
+DEFINIR_CONFIG = consulta('configuracoes.definir',
+    "INSERT INTO configuracoes (guild_id, chave, valor) VALUES ($1, $2, $3) ON CONFLICT (guild_id, chave) DO UPDATE SET valor = EXCLUDED.valor")
+
+# --- Renda passiva ---
+RENDA_ACUMULAR = consulta('renda_passiva.acumular',
+    "INSERT INTO renda_passiva_log (guild_id, user_id, tipo, data, valor) VALUES ($1, $2, $3, $4, $5) "
+    "ON CONFLICT (guild_id, user_id, tipo, data) DO UPDATE SET valor = renda_passiva_log.valor + EXCLUDED.valor")
+RENDA_DO_DIA = consulta('renda_passiva.do_dia', "SELECT valor FROM renda_passiva_log WHERE guild_id = $1 AND user_id = $2 AND tipo = $3 AND data = $4")
+RENDA_DO_DIA_EM_LOTE = consulta('renda_passiva.do_dia_em_lote',
+    "SELECT user_id, valor FROM renda_passiva_log WHERE guild_id = $1 AND tipo = $2 AND data = $3 AND user_id = ANY($4::BIGINT[])")
+PRIMEIRA_REACAO = consulta('reacoes_anuncios.registar',
+    "INSERT INTO reacoes_anuncios (guild_id, user_id, message_id) VALUES ($1, $2, $3) ON CONFLICT DO NOTHING RETURNING user_id")
+
+# --- Eventos (botões de inscrição) ---
+EVENTO_INSCRICOES = consulta('eventos.inscricoes',
+    "SELECT inscritos, max_participantes, cargo_requerido_id, status, data_evento FROM eventos WHERE id = $1 AND guild_id = $2")
+EVENTO_INSCREVER = consulta('eventos.inscrever', """UPDATE eventos SET inscritos = array_append(inscritos, $1)
+    WHERE id = $2 AND guild_id = $3 AND NOT ($1 = ANY(COALESCE(inscritos, '{}'))) AND (max_participantes IS NULL OR cardinality(COALESCE(inscritos, '{}')) < max_participantes)
+    RETURNING inscritos, max_participantes""")
+EVENTO_DESINSCREVER = consulta('eventos.desinscrever',
+    "UPDATE eventos SET inscritos = array_remove(inscritos, $1) WHERE id = $2 AND guild_id = $3 AND $1 = ANY(inscritos) RETURNING inscritos, max_participantes")
+
+# --- Orbes ---
+ORBE_SUBMETER = consulta('orbes.submeter', """WITH submissao AS (
+        INSERT INTO submissoes_orbe (guild_id, message_id, cor, valor_total, autor_id, status) VALUES ($7, $1, $2, $3, $4, 'pendente') RETURNING id
+    )
+    INSERT INTO orbe_participantes (submissao_id, user_id, valor)
+    SELECT submissao.id, membro, $6 FROM submissao, unnest($5::BIGINT[]) AS membro""")
+# Só um clique consegue mudar o status 'pendente'
+ORBE_RECLAMAR = consulta('orbes.reclamar', """WITH reclamada AS (
+        UPDATE submissoes_orbe SET status = $1, data_decisao = CURRENT_TIMESTAMP
+        WHERE guild_id = $3 AND message_id = $2 AND status = 'pendente' RETURNING id, autor_id, valor_total
+    )
+    SELECT r.autor_id, r.valor_total, array_remove(array_agg(p.user_id ORDER BY p.user_id), NULL) AS membros
+    FROM reclamada r LEFT JOIN orbe_participantes p ON p.submissao_id = r.id
+    GROUP BY r.id, r.autor_id, r.valor_total""")
+
+# --- Taxas ---
+TAXA_ESTADO = consulta('taxas.estado', "SELECT status_ciclo FROM taxas WHERE guild_id = $1 AND user_id = $2")
+TAXA_DEFINIR_ESTADO = consulta('taxas.definir_estado',
+    "INSERT INTO taxas (guild_id, user_id, status_ciclo) VALUES ($1, $2, $3) ON CONFLICT (guild_id, user_id) DO UPDATE SET status_ciclo = EXCLUDED.status_ciclo")
+# Estado do membro e pagamento no ciclo aberto: $4 método, $5 referência, $6 valor (NULL se não for em moedas).
+# Sem linha devolvida, o membro já tinha um pagamento registado neste ciclo.
+TAXA_REGISTAR_PAGAMENTO = consulta('taxas.registar_pagamento', f"""WITH status AS (
+        INSERT INTO taxas (guild_id, user_id, status_ciclo) VALUES ($1, $2, $3) ON CONFLICT (guild_id, user_id) DO UPDATE SET status_ciclo = EXCLUDED.status_ciclo
+    )
+    INSERT INTO taxa_pagamentos (ciclo_id, user_id, metodo, ref, valor) VALUES ({CICLO_ATUAL.format(guild='$1')}, $2, $4, $5, $6::BIGINT)
+    ON CONFLICT (ciclo_id, user_id) DO NOTHING RETURNING ciclo_id""")
+# Reclama a submissão de prata PENDENTE e, se aprovada, marca o membro como pago no ciclo aberto
+TAXA_RECLAMAR_PRATA = consulta('taxas.reclamar_prata', f"""WITH reclamada AS (
+        UPDATE submissoes_taxa SET status = $1 WHERE guild_id = $3 AND message_id = $2 AND status = 'pendente' RETURNING id, user_id
+    ), pagamento AS (
+        INSERT INTO taxas (guild_id, user_id, status_ciclo) SELECT $3, user_id, 'PAGO_ATRASADO' FROM reclamada WHERE $1 = 'aprovado'
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET status_ciclo = 'PAGO_ATRASADO'
+    ), registo AS (
+        INSERT INTO taxa_pagamentos (ciclo_id, user_id, metodo, ref)
+        SELECT {CICLO_ATUAL.format(guild='$3')}, user_id, 'prata', id::TEXT
+        FROM reclamada WHERE $1 = 'aprovado'
+        ON CONFLICT (ciclo_id, user_id) DO NOTHING
+    )
+    SELECT id, user_id FROM reclamada""")
+
+# --- Provas (hashes dos prints) ---
+# Os blocos ($2-$5) usam os índices; a distância completa de 64 bits ao dhash $7 (no máx. $8) é filtrada aqui, para que
+# um bloco muito comum (ex: zona de interface repetida nos prints) não encha o LIMIT de falsos candidatos.
+# As cópias exatas (sha256) vêm sempre primeiro. bit_count(bit) requer Postgres 14+.
+PROVAS_CANDIDATAS = consulta('provas.candidatas', """SELECT origem, guild_id, canal_id, message_id, user_id, data, sha256, phash FROM provas_hash
+    WHERE guild_id = $6 AND (sha256 = $1 OR ((p0 = $2 OR p1 = $3 OR p2 = $4 OR p3 = $5) AND bit_count((phash # $7)::bit(64)) <= $8))
+    ORDER BY sha256 = $1 DESC, data DESC LIMIT 200""")
+PROVAS_REGISTAR = consulta('provas.registar', """INSERT INTO provas_hash (origem, guild_id, canal_id, message_id, user_id, anexo_url, sha256, phash, p0, p1, p2, p3)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)""")
@@ -1,67 +1,473 @@
+import logging
 import asyncpg
 import asyncio
+import os
+import sys
+import time
+import re
+import contextvars
+import random
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from utils.metricas import METRICAS, DB_QUERY_LATENCIA, DB_POOL_ESPERA, DB_QUERY_ERROS, DB_TRANSACOES_REPETIDAS
+from utils.rastreio import registar_span
+from utils.db_memoria import PoolMemoria, e_dsn_memoria
+from utils.consultas import CONSULTAS, CONFIGS_GUILDA, DEFINIR_CONFIG
+
+log = logging.getLogger(__name__)
+
+# Primeiro verbo SQL e primeira tabela referenciada (para etiquetar as métricas das queries)
+_RE_VERBO = re.compile(r"^\s*(WITH|SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|DROP)\b", re.IGNORECASE)
+_RE_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([a-z_][a-z0-9_]*)", re.IGNORECASE)
+
+def etiqueta_query(query: str) -> str:
+    """Deriva uma etiqueta de baixa cardinalidade para uma query, ex: 'select:banco'."""
+    verbo = _RE_VERBO.match(query)
+    tabela = _RE_TABELA.search(query)
+    return f"{verbo.group(1).lower() if verbo else 'outra'}:{tabela.group(1).lower() if tabela else '-'}"
+
+_RE_LITERAIS = re.compile(r"'(?:[^']|'')*'|(?<![$\w])\d+(?:\.\d+)?\b")
+_RE_ESPACOS = re.compile(r"\s+")
+
+def impressao_query(query: str) -> str:
+    """Normaliza uma query (espaços colapsados, literais como '?') para agregar estatísticas."""
+    return _RE_ESPACOS.sub(" ", _RE_LITERAIS.sub("?", query)).strip()
+
+def _origem_chamada() -> str:
+    """Primeiro frame fora deste módulo (ex: 'cogs/economia.py:42 get_saldo')."""
+    frame = sys._getframe(1)
+    while frame and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if not frame: return "?"
+    ficheiro = os.path.relpath(frame.f_code.co_filename)
+    return f"{ficheiro}:{frame.f_lineno} {frame.f_code.co_name}"
+
+# Faixa de prioridade da tarefa atual: comandos e interações são 'interativa' (por omissão);
+# renda passiva e tarefas em segundo plano correm na faixa 'fundo' (ver em_segundo_plano)
+_FAIXA = contextvars.ContextVar('faixa_bd', default='interativa')
+
+@contextmanager
+def em_segundo_plano():
+    """Marca as queries do bloco como trabalho de fundo: `with em_segundo_plano(): ...`"""
+    token = _FAIXA.set('fundo')
+    try: yield
+    finally: _FAIXA.reset(token)
+
+class Faixa:
+    """Fila de pedidos de conexão de uma prioridade. `limite` (se definido) é o máximo de conexões em uso."""
+    def __init__(self, nome: str, limite: int = None):
+        self.nome = nome
+        self.limite = limite
+        self.semaforo = asyncio.Semaphore(limite) if limite else None
+        self.em_espera = 0
+        self.sem_espera = asyncio.Event() # Definido enquanto em_espera == 0
+        self.sem_espera.set()
+        self.em_uso = 0
+        self.cedencias = 0 # Vezes que um pedido de fundo esperou por pedidos interativos
+
+class EstatisticaQuery:
+    """Totais acumulados de uma impressão de query desde o arranque."""
+    __slots__ = ('impressao', 'etiqueta', 'origem', 'chamadas', 'erros', 'linhas', 'tempo_total', 'tempo_maximo', 'espera_total')
+
+    def __init__(self, impressao: str, etiqueta: str, origem: str):
+        self.impressao, self.etiqueta, self.origem = impressao, etiqueta, origem
+        self.chamadas = self.erros = self.linhas = 0
+        self.tempo_total = self.tempo_maximo = self.espera_total = 0.0
+
+    @property
+    def tempo_medio(self) -> float:
+        return self.tempo_total / self.chamadas if self.chamadas else 0.0
+
+class RelatorioLote:
+    """Resultado de uma escrita em lotes: linhas escritas e, por lote falhado, (índice do 1.º registo, registos, erro)."""
+    __slots__ = ('linhas', 'lotes', 'falhas', 'duracao')
+
+    def __init__(self):
+        self.linhas = self.lotes = 0
+        self.falhas = []
+        self.duracao = 0.0
+
+    @property
+    def linhas_falhadas(self) -> int:
+        return sum(n for _, n, _ in self.falhas)
+
+    def resumo(self) -> str:
+        texto = f"{self.linhas} linhas em {self.lotes} lotes ({self.duracao * 1000:.0f}ms)"
+        if self.falhas:
+            texto += f"; {len(self.falhas)} lotes falharam ({self.linhas_falhadas} registos): " + "; ".join(
+                f"#{inicio}+{n}: {erro}" for inicio, n, erro in self.falhas[:3])
+        return texto
+
+class Transacao:
+    """Unidade de trabalho: as queries correm todas na mesma conexão e são confirmadas de uma só vez no fim do bloco.
+    Tem a mesma interface de queries do DatabaseManager (execute_query/executar/transaction), por isso os métodos
+    que recebem `tx` funcionam com qualquer um dos dois."""
+    def __init__(self, db: 'DatabaseManager', conexao, isolamento: str = None):
+        self._db = db
+        self.conexao = conexao
+        self.isolamento = isolamento or 'read_committed'
+
+    async def execute_query(self, query, *params, fetch=None, etiqueta: str = None):
+        return await self._db._executar(query, params, fetch, etiqueta, conexao=self.conexao)
+
+    async def executar(self, nome: str, *params, fetch=None):
+        return await self._db._executar(CONSULTAS[nome], params, fetch, nome, conexao=self.conexao)
+
+    async def copiar(self, tabela: str, colunas: tuple, registos: list):
+        """COPY dos `registos` (tuplos pela ordem de `colunas`) para `tabela`, de uma só vez (sem lotes)."""
+        async def copiar(conn): await conn.copy_records_to_table(tabela, records=registos, columns=list(colunas))
+        await self._db._executar(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN", registos, None, f"copy:{tabela}",
+                                 conexao=self.conexao, em_massa=copiar)
+
+    async def executar_muitos(self, query: str, argumentos: list):
+        """executemany de `query` (SQL ou nome de uma consulta de utils/consultas.py), de uma só vez (sem lotes)."""
+        etiqueta = query if query in CONSULTAS else None
+        sql = CONSULTAS.get(query, query)
+        async def executar(conn): await conn.executemany(sql, argumentos)
+        await self._db._executar(sql, argumentos, None, etiqueta, conexao=self.conexao, em_massa=executar)
+
+    @asynccontextmanager
+    async def transaction(self, isolamento: str = None):
+        """Dentro de uma transação, abre um savepoint: um erro no bloco só desfaz o que foi feito nele.
+        Um savepoint corre sempre com o isolamento da transação de fora: pedir outro levanta ValueError."""
+        if isolamento and isolamento != self.isolamento:
+            raise ValueError(f"Isolamento '{isolamento}' pedido dentro de uma transação '{self.isolamento}': "
+                             "abra a unidade de trabalho de fora com esse isolamento.")
+        async with self.conexao.transaction():
+            yield self
 
 class DatabaseManager:
-    def __init__(self, dsn: str, min_conn: int = 2, max_conn: int = 10):
+    LOTE = 5000 # Registos por lote nas escritas em massa
+
+    def __init__(self, dsn: str, min_conn: int = 2, max_conn: int = 10, config_ttl: float = 60.0, limite_lenta: float = None,
+                 reserva_interativa: int = None):
         self._dsn = dsn
         self._min_conn = min_conn
         self._max_conn = max_conn
         self._pool = None
+        # O trabalho de fundo nunca ocupa as últimas `reserva_interativa` conexões do pool
+        reserva = reserva_interativa if reserva_interativa is not None else int(os.getenv('DB_RESERVA_INTERATIVA', '3'))
+        self.faixas = {
+            'interativa': Faixa('interativa'),
+            'fundo': Faixa('fundo', limite=max(1, max_conn - reserva)),
+        }
+        # Cache de configurações por guilda: {guild_id: (momento_leitura, {chave: valor})}
+        self._config_cache = {}
+        self._config_ttl = config_ttl
+        self.config_cache_hits = 0
+        self.config_cache_misses = 0
+        # Estatísticas por impressão de query; o SQL de cada chamada só é normalizado uma vez
+        self.estatisticas = {} # {impressao: EstatisticaQuery}
+        self._por_query = {} # {query: EstatisticaQuery}
+        # Média móvel exponencial da espera por conexões (sinal de pressão para a admissão de renda passiva)
+        self._espera_media = 0.0
+        self._espera_momento = time.monotonic()
+        self.limite_lenta = limite_lenta if limite_lenta is not None else float(os.getenv('DB_SLOW_QUERY_MS', '500')) / 1000
 
     async def connect(self):
-        """Inicializa o pool de conexões com asyncpg."""
+        """Inicializa o pool de conexões com asyncpg (ou a base SQLite em memória, com o DSN `memoria://`)."""
+        if e_dsn_memoria(self._dsn):
+            self._pool = PoolMemoria(max_size=self._max_conn)
+            log.info("Base de dados em memória (SQLite) inicializada: só para testes e benchmarks.")
+            return
         try:
             self._pool = await asyncpg.create_pool(
                 dsn=self._dsn,
                 min_size=self._min_conn,
-                max_size=self._max_conn
+                max_size=self._max_conn,
+                # As consultas com nome usam a cache de statements preparados de cada conexão (LRU por SQL):
+                # há lugar para todas e ainda para as 100 queries ad-hoc mais recentes (o valor por omissão)
+                statement_cache_size=len(CONSULTAS) + 100
             )
-            print("Pool de conexões com a base de dados (asyncpg) inicializado com sucesso.")
+            log.info("Pool de conexões com a base de dados (asyncpg) inicializado com sucesso.")
         except Exception as e:
-            print(f"ERRO CRÍTICO ao inicializar o pool de conexões: {e}")
+            log.error("ERRO CRÍTICO ao inicializar o pool de conexões: %s", e)
             raise
 
     async def close(self):
         """Fecha o pool de conexões."""
         if self._pool:
             await self._pool.close()
-            print("Pool de conexões fechado.")
+            log.info("Pool de conexões fechado.")
+
+    def estado_pool(self) -> dict:
+        """Conexões abertas, livres e máximo do pool."""
+        if not self._pool: return {'conexoes': 0, 'livres': 0, 'maximo': self._max_conn}
+        return {'conexoes': self._pool.get_size(), 'livres': self._pool.get_idle_size(), 'maximo': self._max_conn}
+
+    def registar_metricas(self):
+        """Expõe o estado do pool como gauges (lidos apenas quando /metrics é consultado)."""
+        METRICAS.gauge('arauto_db_pool_conexoes', 'Conexões abertas no pool.', lambda: self.estado_pool()['conexoes'])
+        METRICAS.gauge('arauto_db_pool_livres', 'Conexões livres no pool.', lambda: self.estado_pool()['livres'])
+        METRICAS.gauge('arauto_db_pool_maximo', 'Tamanho máximo do pool.', lambda: self._max_conn)
+        METRICAS.gauge('arauto_db_faixa_em_espera', 'Pedidos à espera de conexão, por faixa de prioridade.',
+                       lambda: {(f.nome,): f.em_espera for f in self.faixas.values()}, ('faixa',))
+        METRICAS.gauge('arauto_db_faixa_em_uso', 'Conexões em uso, por faixa de prioridade.',
+                       lambda: {(f.nome,): f.em_uso for f in self.faixas.values()}, ('faixa',))
+        METRICAS.gauge('arauto_config_cache_acertos_total', 'Leituras de configuração servidas pela cache.', lambda: self.config_cache_hits)
+        METRICAS.gauge('arauto_config_cache_falhas_total', 'Leituras de configuração que foram à base de dados.', lambda: self.config_cache_misses)
+
+    async def _ceder_a_interativos(self, faixa: Faixa, tempo_maximo: float = 1.0):
+        """Um pedido de fundo espera enquanto houver comandos à espera de conexão (no máx. `tempo_maximo`, sem inanição)."""
+        interativa = self.faixas['interativa']
+        if not interativa.em_espera: return
+        faixa.cedencias += 1
+        try: await asyncio.wait_for(interativa.sem_espera.wait(), tempo_maximo)
+        except asyncio.TimeoutError: pass
+
+    @asynccontextmanager
+    async def _conexao(self, faixa: str = None):
+        """Obtém uma conexão do pool na faixa de prioridade `faixa` (por omissão, a da tarefa atual)."""
+        faixa = self.faixas[faixa or _FAIXA.get()]
+        faixa.em_espera += 1
+        faixa.sem_espera.clear()
+        try:
+            if faixa.semaforo: await faixa.semaforo.acquire()
+            try:
+                if faixa.semaforo: await self._ceder_a_interativos(faixa)
+                conn = await self._pool.acquire()
+            except BaseException:
+                if faixa.semaforo: faixa.semaforo.release()
+                raise
+        finally:
+            faixa.em_espera -= 1
+            if not faixa.em_espera: faixa.sem_espera.set()
+
+        faixa.em_uso += 1
+        try:
+            yield conn
+        finally:
+            faixa.em_uso -= 1
+            try: await self._pool.release(conn)
+            finally:
+                if faixa.semaforo: faixa.semaforo.release()
 
-    async def execute_query(self, query, *params, fetch=None):
-        """Executa uma query de forma assíncrona."""
+    def espera_recente(self, meia_vida: float = 5.0) -> float:
+        """Espera média recente (s) por uma conexão; decai para 0 quando não há pedidos novos."""
+        return self._espera_media * 0.5 ** ((time.monotonic() - self._espera_momento) / meia_vida)
+
+    def _registar_espera(self, espera: float):
+        self._espera_media = self.espera_recente() * 0.8 + espera * 0.2
+        self._espera_momento = time.monotonic()
+
+    def _estatistica(self, query: str, etiqueta: str = None) -> EstatisticaQuery:
+        estatistica = self._por_query.get(query)
+        if estatistica is None:
+            impressao = impressao_query(query)
+            estatistica = self.estatisticas.get(impressao)
+            if estatistica is None:
+                estatistica = self.estatisticas[impressao] = EstatisticaQuery(impressao, etiqueta or etiqueta_query(query), _origem_chamada())
+            self._por_query[query] = estatistica
+        return estatistica
+
+    def repor_estatisticas(self):
+        self.estatisticas.clear()
+        self._por_query.clear()
+
+    @asynccontextmanager
+    async def transaction(self, isolamento: str = None):
+        """Abre uma transação numa conexão do pool: `async with db.transaction() as tx: await tx.executar(...)`.
+        `isolamento`: 'read_committed' (por omissão do Postgres), 'repeatable_read' ou 'serializable'.
+        Confirma à saída do bloco e desfaz tudo se o bloco levantar uma exceção. Não repete: ver em_transacao."""
+        if not self._pool:
+            raise Exception("O pool de conexões não foi inicializado.")
+        async with self._conexao() as conn:
+            async with conn.transaction(isolation=isolamento):
+                yield Transacao(self, conn, isolamento)
+
+    async def em_transacao(self, funcao, *args, isolamento: str = None, tentativas: int = 3):
+        """Corre `await funcao(*args, tx=tx)` numa transação e devolve o seu resultado.
+        Em falhas de serialização ou deadlocks a transação inteira é repetida (até `tentativas` vezes, com uma pausa
+        aleatória crescente), por isso `funcao` não deve ter efeitos fora da base de dados."""
+        for tentativa in range(1, tentativas + 1):
+            try:
+                async with self.transaction(isolamento) as tx:
+                    return await funcao(*args, tx=tx)
+            except (asyncpg.SerializationError, asyncpg.DeadlockDetectedError) as e:
+                if tentativa == tentativas: raise
+                motivo = 'deadlock' if isinstance(e, asyncpg.DeadlockDetectedError) else 'serializacao'
+                DB_TRANSACOES_REPETIDAS.inc(motivo)
+                log.info("[BD] Transação repetida (%s, tentativa %s de %s) em %s", motivo, tentativa + 1, tentativas, _origem_chamada())
+                await asyncio.sleep(random.uniform(0, 0.02 * 2 ** tentativa))
+
+    async def em_lotes(self, registos, funcao, tamanho: int = None, tx: Transacao = None) -> RelatorioLote:
+        """Escreve `registos` em lotes de `tamanho`: `await funcao(tx_do_lote, lote)` para cada lote.
+        Sem `tx`, cada lote corre na sua própria transação; um lote que falha é desfeito, fica no relatório e os outros
+        seguem. Com `tx`, os lotes são savepoints da transação do chamador e a primeira falha propaga-se (tudo ou nada)."""
+        tamanho = tamanho or self.LOTE
+        registos = list(registos)
+        relatorio = RelatorioLote()
+        inicio = time.perf_counter()
+        for i in range(0, len(registos), tamanho):
+            lote = registos[i:i + tamanho]
+            relatorio.lotes += 1
+            try:
+                async with (tx or self).transaction() as tx_lote:
+                    await funcao(tx_lote, lote)
+                relatorio.linhas += len(lote)
+            except Exception as e:
+                if tx: raise
+                relatorio.falhas.append((i, len(lote), e))
+                log.error("[BD] Lote %s-%s falhou em %s: %s", i, i + len(lote) - 1, _origem_chamada(), e)
+        relatorio.duracao = time.perf_counter() - inicio
+        return relatorio
+
+    async def copiar_registos(self, tabela: str, colunas: tuple, registos, tamanho: int = None, tx: Transacao = None) -> RelatorioLote:
+        """Insere muitas linhas com COPY (copy_records_to_table), em lotes (ver em_lotes)."""
+        return await self.em_lotes(registos, lambda t, lote: t.copiar(tabela, colunas, lote), tamanho, tx)
+
+    async def executar_em_lote(self, query: str, argumentos, tamanho: int = None, tx: Transacao = None) -> RelatorioLote:
+        """executemany de `query` (SQL ou nome de uma consulta de utils/consultas.py) em lotes (ver em_lotes).
+        Para linhas novas sem conflitos, copiar_registos é mais rápido; isto serve para upserts e updates."""
+        return await self.em_lotes(argumentos, lambda t, lote: t.executar_muitos(query, lote), tamanho, tx)
+
+    async def execute_query(self, query, *params, fetch=None, etiqueta: str = None):
+        """Executa uma query de forma assíncrona.
+        `etiqueta` nomeia a query nas métricas; por omissão é derivada do SQL (verbo:tabela)."""
+        return await self._executar(query, params, fetch, etiqueta)
+
+    async def executar(self, nome: str, *params, fetch=None):
+        """Executa a consulta com nome `nome` (utils/consultas.py), com `nome` como etiqueta nas métricas.
+        O statement é preparado no primeiro uso em cada conexão e reutilizado daí em diante (cache do asyncpg),
+        que também o prepara de novo se o esquema mudar entretanto."""
+        return await self._executar(CONSULTAS[nome], params, fetch, nome)
+
+    async def _executar(self, query, params, fetch, etiqueta: str = None, conexao=None, em_massa=None):
+        if not self._pool:
+            raise Exception("O pool de conexões não foi inicializado.")
+        estatistica = self._estatistica(query, etiqueta)
+        etiqueta = etiqueta or estatistica.etiqueta
+
+        inicio = time.perf_counter()
+        linhas, erro = 0, False
+        # Numa transação a conexão já está obtida (sem espera pelo pool)
+        async with (nullcontext(conexao) if conexao else self._conexao()) as conn:
+            adquirido = time.perf_counter()
+            if not conexao:
+                DB_POOL_ESPERA.observar(adquirido - inicio, _FAIXA.get())
+                self._registar_espera(adquirido - inicio)
+            try:
+                if em_massa:
+                    # COPY ou executemany: `params` são os registos
+                    await em_massa(conn)
+                    linhas = len(params)
+                    return None
+                if fetch == "one": resultado, estado = await conn.fetchrow(query, *params), None
+                elif fetch == "all": resultado, estado = await conn.fetch(query, *params), None
+                else: resultado, estado = None, await conn.execute(query, *params)
+                if fetch == "one":
+                    linhas = int(resultado is not None)
+                elif fetch == "all":
+                    linhas = len(resultado)
+                else:
+                    # Ex: 'UPDATE 3', 'INSERT 0 1'
+                    ultimo = estado.rsplit(" ", 1)[-1] if estado else ""
+                    linhas = int(ultimo) if ultimo.isdigit() else 0
+                return resultado
+            except Exception:
+                erro = True
+                raise
+            finally:
+                self._registar(estatistica, etiqueta, inicio, adquirido - inicio, time.perf_counter() - adquirido, linhas, erro)
+
+    async def percorrer(self, query, *params, lote: int = 1000, etiqueta: str = None):
+        """Lê o resultado de `query` aos poucos com um cursor do servidor: `async for linhas in db.percorrer(...)`.
+        Cada iteração traz até `lote` linhas, por isso a memória usada não depende do tamanho do resultado.
+        A leitura é um retrato consistente (transação só de leitura, REPEATABLE READ) e segura uma conexão da faixa
+        de fundo até ao fim; se o ciclo puder sair a meio, usar com contextlib.aclosing para a devolver logo.
+        Se o consumidor fizer I/O lento entre páginas (ex: uploads), sair do ciclo antes e reabrir a leitura a partir da
+        última chave lida (`id > $n`), para não segurar a conexão nem o retrato (que atrasa o vacuum) durante esse tempo."""
+        if not self._pool:
+            raise Exception("O pool de conexões não foi inicializado.")
+        estatistica = self._estatistica(query, etiqueta)
+        etiqueta = etiqueta or estatistica.etiqueta
+
+        inicio = time.perf_counter()
+        linhas, duracao, erro = 0, 0.0, False
+        async with self._conexao('fundo') as conn:
+            adquirido = time.perf_counter()
+            DB_POOL_ESPERA.observar(adquirido - inicio, 'fundo')
+            self._registar_espera(adquirido - inicio)
+            try:
+                async with conn.transaction(isolation='repeatable_read', readonly=True):
+                    cursor = await conn.cursor(query, *params)
+                    while True:
+                        # Só conta o tempo dos FETCH (não o de quem consome as linhas entre eles)
+                        pedido = time.perf_counter()
+                        pagina = await cursor.fetch(lote)
+                        duracao += time.perf_counter() - pedido
+                        if not pagina: break
+                        linhas += len(pagina)
+                        yield pagina
+            except Exception:
+                erro = True
+                raise
+            finally:
+                self._registar(estatistica, etiqueta, inicio, adquirido - inicio, duracao, linhas, erro)
+
+    def _registar(self, estatistica: EstatisticaQuery, etiqueta: str, inicio: float, espera: float, duracao: float, linhas: int, erro: bool):
+        """Métricas, estatísticas por query e aviso de query lenta de uma execução (tempos em segundos)."""
+        DB_QUERY_LATENCIA.observar(duracao, etiqueta)
+        registar_span('db', etiqueta, inicio, espera + duracao)
+        estatistica.chamadas += 1
+        estatistica.linhas += linhas
+        estatistica.tempo_total += duracao
+        estatistica.espera_total += espera
+        if duracao > estatistica.tempo_maximo: estatistica.tempo_maximo = duracao
+        if erro:
+            estatistica.erros += 1
+            DB_QUERY_ERROS.inc(etiqueta)
+        if duracao + espera >= self.limite_lenta:
+            log.warning("[BD] Query lenta (%.0fms + %.0fms de espera, %s linhas) em %s: %s", duracao * 1000, espera * 1000, linhas, _origem_chamada(), estatistica.impressao[:300])
+
+    @asynccontextmanager
+    async def advisory_lock(self, chave: str):
+        """Tenta obter um advisory lock de sessão do Postgres para `chave`.
+        Devolve True/False sem bloquear; o lock é libertado à saída do bloco."""
         if not self._pool:
             raise Exception("O pool de conexões não foi inicializado.")
-            
-        async with self._pool.acquire() as conn:
-            if fetch == "one":
-                return await conn.fetchrow(query, *params)
-            elif fetch == "all":
-                return await conn.fetch(query, *params)
-            else:
-                await conn.execute(query, *params)
-                return None
-
-    async def get_config_value(self, chave: str, default: str = None):
-        """Obtém um único valor de configuração da base de dados."""
-        resultado = await self.execute_query(
-            "SELECT valor FROM configuracoes WHERE chave = $1",
-            chave,
-            fetch="one"
-        )
-        return resultado['valor'] if resultado else default
-
-    async def get_all_configs(self, chaves: list):
-        """Busca múltiplos valores de configuração numa única query."""
+
+        async with self._conexao() as conn:
+            obtido = await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", chave)
+            try:
+                yield obtido
+            finally:
+                if obtido:
+                    await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", chave)
+
+    # --- Configurações por guilda (com cache em memória) ---
+    async def _get_configs_guilda(self, guild_id: int):
+        """Devolve todas as configurações de uma guilda, a partir da cache quando ainda válida."""
+        entrada = self._config_cache.get(guild_id)
+        agora = time.monotonic()
+        if entrada and agora - entrada[0] < self._config_ttl:
+            self.config_cache_hits += 1
+            return entrada[1]
+
+        self.config_cache_misses += 1
+        resultados = await self.executar(CONFIGS_GUILDA, guild_id, fetch="all")
+        configs = {rec['chave']: rec['valor'] for rec in resultados}
+        self._config_cache[guild_id] = (agora, configs)
+        return configs
+
+    def invalidar_cache_configs(self, guild_id: int = None):
+        """Descarta a cache de uma guilda (ou de todas)."""
+        if guild_id is None: self._config_cache.clear()
+        else: self._config_cache.pop(guild_id, None)
+
+    async def get_config_value(self, guild_id: int, chave: str, default: str = None):
+        """Obtém um único valor de configuração da guilda."""
+        configs = await self._get_configs_guilda(guild_id)
+        return configs.get(chave, default)
+
+    async def get_all_configs(self, guild_id: int, chaves: list):
+        """Busca múltiplos valores de configuração da guilda (uma única query em caso de cache miss)."""
         if not chaves:
             return {}
-            
-        query = "SELECT chave, valor FROM configuracoes WHERE chave = ANY($1::TEXT[])"
-        resultados = await self.execute_query(query, chaves, fetch="all")
-        return {rec['chave']: rec['valor'] for rec in resultados}
-
-    async def set_config_value(self, chave: str, valor: str):
-        """Define um único valor de configuração na base de dados."""
-        await self.execute_query(
-            "INSERT INTO configuracoes (chave, valor) VALUES ($1, $2) ON CONFLICT (chave) DO UPDATE SET valor = EXCLUDED.valor",
-            chave, valor
-        )
+
+        configs = await self._get_configs_guilda(guild_id)
+        return {chave: configs[chave] for chave in chaves if chave in configs}
+
+    async def set_config_value(self, guild_id: int, chave: str, valor: str):
+        """Define um único valor de configuração da guilda."""
+        await self.executar(DEFINIR_CONFIG, guild_id, chave, valor)
+        self.invalidar_cache_configs(guild_id)
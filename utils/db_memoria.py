@@ -0,0 +1,473 @@
+"""Backend em memória (SQLite) do DatabaseManager, para testes e micro-benchmarks sem servidor Postgres.
+
+Ativado com o DSN `memoria://`. Do asyncpg, o DatabaseManager só usa o pool (acquire/release/close/get_size/
+get_idle_size) e as conexões (fetch/fetchrow/fetchval/execute/executemany/copy_records_to_table/cursor/transaction):
+PoolMemoria implementa essa interface sobre uma base SQLite em memória e traduz o SQL de Postgres dos cogs. A tradução cobre:
+parâmetros $n, casts ::tipo, arrays (guardados como JSON), unnest/ANY/array_*, bit_count de um XOR, INTERVAL, FOR UPDATE e advisory locks.
+As CTEs que escrevem correm por ordem, cada RETURNING numa tabela temporária com o nome da CTE.
+As queries correm de forma síncrona no event loop, por isso cada uma é atómica em relação às outras tarefas;
+uma transação aberta (conn.transaction()) fica com a base só para si até ao fim, e as aninhadas são savepoints.
+Os cursores leem o resultado todo ao abrir, por isso as transações só de leitura não precisam de ficar com a base.
+Em produção o backend continua a ser o Postgres."""
+import asyncio
+import datetime as dt
+import json
+import re
+import sqlite3
+import zlib
+from contextlib import nullcontext
+
+def e_dsn_memoria(dsn: str) -> bool:
+    return bool(dsn) and dsn.startswith('memoria:')
+
+_AGORA = "(strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+
+def _adaptar(valor):
+    """Parâmetro Python -> valor SQLite (datas em texto UTC, listas em JSON)."""
+    if isinstance(valor, dt.datetime):
+        if valor.tzinfo: valor = valor.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        return valor.isoformat(sep=' ', timespec='microseconds')
+    if isinstance(valor, dt.date): return valor.isoformat()
+    if isinstance(valor, (list, tuple)): return json.dumps([_adaptar(v) for v in valor])
+    return valor
+
+def _tempo(valor):
+    if not isinstance(valor, str): return valor
+    if len(valor) == 10: return dt.date.fromisoformat(valor)
+    return dt.datetime.fromisoformat(valor).replace(tzinfo=dt.timezone.utc)
+
+def _lista(valor):
+    return json.loads(valor) if isinstance(valor, str) else valor
+
+class Registo:
+    """Linha de resultado com a interface do asyncpg.Record usada pelos cogs (r['col'], r[0], r.get, dict(r))."""
+    __slots__ = ('_indices', '_valores')
+
+    def __init__(self, indices: dict, valores: tuple):
+        self._indices, self._valores = indices, valores
+
+    def __getitem__(self, chave):
+        return self._valores[chave] if isinstance(chave, (int, slice)) else self._valores[self._indices[chave]]
+
+    def get(self, chave, default=None):
+        i = self._indices.get(chave)
+        return default if i is None else self._valores[i]
+
+    def keys(self): return iter(self._indices)
+    def values(self): return iter(self._valores)
+    def items(self): return zip(self._indices, self._valores)
+    def __iter__(self): return iter(self._valores)
+    def __len__(self): return len(self._valores)
+    def __repr__(self): return "<Registo " + " ".join(f"{k}={v!r}" for k, v in self.items()) + ">"
+
+# --- Tradução de SQL ---
+
+def _fecho(sql: str, abre: int) -> int:
+    """Índice do ')' que fecha o '(' em `abre` (ignora parênteses dentro de literais)."""
+    nivel, literal = 0, False
+    for i in range(abre, len(sql)):
+        c = sql[i]
+        if c == "'": literal = not literal
+        elif literal: continue
+        elif c == '(': nivel += 1
+        elif c == ')':
+            nivel -= 1
+            if nivel == 0: return i
+    raise ValueError(f"Parênteses desequilibrados: {sql[abre:abre + 80]}")
+
+def _achatar(sql: str) -> str:
+    """O SQL com o conteúdo dos parênteses e literais apagado (mesmas posições): procura ao nível de topo."""
+    saida, nivel, literal = [], 0, False
+    for c in sql:
+        if c == "'": literal = not literal; saida.append(' '); continue
+        if literal: saida.append(' '); continue
+        if c == ')': nivel -= 1
+        saida.append(c if nivel == 0 else ' ')
+        if c == '(': nivel += 1
+    return ''.join(saida)
+
+def _dividir(sql: str) -> list:
+    """Divide pelas vírgulas de nível de topo."""
+    plano, partes, inicio = _achatar(sql), [], 0
+    for i, c in enumerate(plano):
+        if c == ',': partes.append(sql[inicio:i].strip()); inicio = i + 1
+    partes.append(sql[inicio:].strip())
+    return partes
+
+def _ultimo(padrao: str, texto: str) -> int:
+    posicoes = [m.start() for m in re.finditer(padrao, texto, re.IGNORECASE)]
+    return posicoes[-1] if posicoes else -1
+
+def _traduzir_unnest(sql: str) -> str:
+    while m := re.search(r'\bunnest\(', sql, re.IGNORECASE):
+        abre = m.end() - 1
+        fecha = _fecho(sql, abre)
+        args = _dividir(sql[abre + 1:fecha])
+        antes, resto = sql[:m.start()], sql[fecha + 1:]
+        plano = _achatar(antes)
+        no_from = _ultimo(r'\bFROM\b', plano) > _ultimo(r'\bSELECT\b', plano)
+        alias = re.match(r'\s+AS\s+(\w+)(?:\s*\(([^)]*)\))?', resto, re.IGNORECASE)
+        if no_from and alias and not alias.group(2) and len(args) == 1:
+            # unnest(x) AS nome -> json_each(x) AS nome; as referências a `nome` passam a `nome.value`
+            nome = alias.group(1)
+            ref = re.compile(rf'(?<![\w.]){nome}\b(?!\s*\.)')
+            sql = ref.sub(f'{nome}.value', antes) + f"json_each({args[0]}) AS {nome}" + ref.sub(f'{nome}.value', resto[alias.end():])
+        elif no_from:
+            # unnest(a, b, ...) [AS t(x, y)] -> linhas com um valor de cada array, emparelhados pela posição
+            nomes = [c.strip() for c in alias.group(2).split(',')] if alias and alias.group(2) else [f"unnest{i or ''}" for i in range(len(args))]
+            colunas = ", ".join(f"j{i}.value AS {nome}" for i, nome in enumerate(nomes))
+            juncoes = " ".join(f"JOIN json_each({a}) AS j{i} ON j{i}.key = j0.key" for i, a in enumerate(args[1:], 1))
+            sufixo = f" AS {alias.group(1)}{resto[alias.end():]}" if alias else resto
+            sql = f"{antes}(SELECT {colunas} FROM json_each({args[0]}) AS j0 {juncoes}){sufixo}"
+        else:
+            # SELECT ..., unnest(x), ... (sem FROM): uma linha por elemento
+            conflito = re.search(r'\s+ON CONFLICT\b', resto, re.IGNORECASE)
+            corte = conflito.start() if conflito else len(resto)
+            sql = f"{antes}value{resto[:corte]} FROM json_each({args[0]}){resto[corte:]}"
+    return sql
+
+def _traduzir_any(sql: str) -> str:
+    while m := re.search(r'([\w.:]+)\s*=\s*ANY\(', sql, re.IGNORECASE):
+        abre = m.end() - 1
+        fecha = _fecho(sql, abre)
+        sql = f"{sql[:m.start()]}{m.group(1)} IN (SELECT value FROM json_each({sql[abre + 1:fecha]})){sql[fecha + 1:]}"
+    return sql
+
+def _upsert_com_where(sql: str) -> str:
+    """O SQLite exige um WHERE no INSERT ... SELECT ... ON CONFLICT (ambiguidade do parser)."""
+    plano = _achatar(sql)
+    conflito = re.search(r'\bON CONFLICT\b', plano, re.IGNORECASE)
+    select = re.search(r'\bSELECT\b', plano, re.IGNORECASE)
+    if not (conflito and select and plano.lstrip().upper().startswith('INSERT')): return sql
+    if re.search(r'\bWHERE\b', plano[select.end():conflito.start()], re.IGNORECASE): return sql
+    return f"{sql[:conflito.start()]} WHERE true {sql[conflito.start():]}"
+
+def _aliases_lista(sql: str) -> set:
+    """Aliases da lista do SELECT principal que contêm arrays (devolvidos como listas)."""
+    plano = _achatar(sql)
+    select = re.search(r'\bSELECT\b', plano, re.IGNORECASE)
+    if not select: return set()
+    fim = re.search(r'\bFROM\b', plano[select.end():], re.IGNORECASE)
+    lista = sql[select.end():select.end() + fim.start() if fim else len(sql)]
+    aliases = set()
+    for item in _dividir(lista):
+        alias = re.search(r'\bAS\s+(\w+)\s*$', item, re.IGNORECASE)
+        if alias and 'array_' in item.lower(): aliases.add(alias.group(1))
+    return aliases
+
+def _traduzir_expressoes(sql: str) -> str:
+    sql = re.sub(r'\$(\d+)', r':p\1', sql)
+    sql = re.sub(r"CURRENT_TIMESTAMP\s*([-+])\s*INTERVAL\s*'([^']+)'",
+                 lambda m: f"(strftime('%Y-%m-%d %H:%M:%f', 'now', '{m.group(1)}{m.group(2)}'))", sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bCURRENT_TIMESTAMP\b', _AGORA, sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\s+AT TIME ZONE\s+'UTC'", '', sql, flags=re.IGNORECASE)
+    sql = re.sub(r"'\{\}'", "'[]'", sql)
+    sql = re.sub(r'\s+FOR\s+(UPDATE|SHARE)\b', '', sql, flags=re.IGNORECASE) # A transação aberta já tem a base só para si
+    sql = re.sub(r'\bbit_count\(\((\w+) # (:p\d+)\)::bit\(64\)\)', r'distancia_bits(\1, \2)', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'::\w+(\[\])?', '', sql)
+    sql = re.sub(r'\binformation_schema\.columns WHERE table_name = (\S+) AND column_name =', r'pragma_table_info(\1) WHERE name =', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\barray_agg\(([^()]+?)\s+ORDER BY\s+\1\s*\)', r'array_agg_ordenado(\1)', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bcardinality\(', 'json_array_length(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\barray_append\(', 'array_acrescentar(', sql, flags=re.IGNORECASE)
+    sql = _traduzir_unnest(sql)
+    sql = _traduzir_any(sql)
+    return _upsert_com_where(sql)
+
+# Passos de execução: (tipo, sql, extra)
+_SQL, _TEMPORARIA, _COLUNA, _NADA = 'sql', 'temporaria', 'coluna', 'nada'
+
+class Traducao:
+    def __init__(self, passos: list, listas: set):
+        self.passos, self.listas = passos, listas
+        self.conversores = {} # {nomes das colunas: [(índice, função)]}
+
+def _traduzir_ddl(sql: str, tipos: dict):
+    for coluna in re.findall(r'(\w+)\s+(?:TIMESTAMPTZ|TIMESTAMP|DATE)\b', sql, re.IGNORECASE): tipos[coluna] = _tempo
+    for coluna in re.findall(r'(\w+)\s+\w+\[\]', sql): tipos[coluna] = _lista
+    sql = re.sub(r'\bSERIAL PRIMARY KEY\b', 'INTEGER PRIMARY KEY', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bSERIAL\b', 'INTEGER', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\b\w+\[\]', 'TEXT', sql)
+    sql = re.sub(r'\b(TIMESTAMPTZ|TIMESTAMP|DATE)\b', 'TEXT', sql, flags=re.IGNORECASE)
+    return _traduzir_expressoes(sql)
+
+def traduzir(query: str, tipos: dict) -> Traducao:
+    """Traduz uma query de Postgres para passos em SQLite. `tipos` acumula as colunas de data/array vistas no DDL."""
+    sql = query.strip().rstrip(';')
+    if m := re.match(r'ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+)', sql, re.IGNORECASE):
+        ddl = _traduzir_ddl(re.sub(r'\s+IF NOT EXISTS', '', sql, count=1, flags=re.IGNORECASE), tipos)
+        return Traducao([(_COLUNA, ddl, (m.group(1), m.group(2)))], set())
+    if re.match(r'ALTER TABLE \w+ (ALTER COLUMN|DROP CONSTRAINT|ADD PRIMARY KEY)', sql, re.IGNORECASE):
+        # O SQLite não altera restrições; numa base em memória o esquema é sempre criado já na versão final
+        return Traducao([(_NADA, None, None)], set())
+    if re.match(r'(CREATE|ALTER)\s+TABLE', sql, re.IGNORECASE):
+        return Traducao([(_SQL, _traduzir_ddl(sql, tipos), None)], set())
+    if not re.match(r'WITH\b', sql, re.IGNORECASE):
+        sql = _traduzir_expressoes(sql)
+        return Traducao([(_SQL, sql, None)], _aliases_lista(sql))
+
+    # CTEs que escrevem: cada uma corre por ordem e o seu RETURNING fica numa tabela temporária
+    passos, selects, pos = [], [], re.match(r'WITH\s+', sql, re.IGNORECASE).end()
+    while m := re.compile(r'(\w+)\s+AS\s+\(', re.IGNORECASE).match(sql, pos):
+        fecha = _fecho(sql, m.end() - 1)
+        nome, corpo = m.group(1), sql[m.end():fecha].strip()
+        if re.match(r'(INSERT|UPDATE|DELETE)\b', corpo, re.IGNORECASE):
+            prefixo = f"WITH {', '.join(selects)} " if selects else ""
+            passos.append((_TEMPORARIA, prefixo + _traduzir_expressoes(corpo), nome))
+        else:
+            selects.append(f"{nome} AS ({_traduzir_expressoes(corpo)})")
+        pos = re.compile(r'\s*,?\s*').match(sql, fecha + 1).end()
+    principal = _traduzir_expressoes(sql[pos:])
+    if selects: principal = f"WITH {', '.join(selects)} {principal}"
+    passos.append((_SQL, principal, None))
+    return Traducao(passos, _aliases_lista(principal))
+
+# --- Funções e agregados que o SQLite não tem ---
+
+def _array_remove(array, valor):
+    if array is None: return None
+    return json.dumps([v for v in json.loads(array) if v != valor])
+
+def _array_acrescentar(array, valor):
+    return json.dumps((json.loads(array) if array else []) + [valor])
+
+def _string_to_array(texto, separador):
+    return None if texto is None else json.dumps(texto.split(separador))
+
+def _distancia_bits(a, b):
+    return None if a is None or b is None else ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+def _hashtext(texto):
+    return zlib.crc32(texto.encode()) - 2**31
+
+class _ArrayAgg:
+    def __init__(self): self.valores = []
+    def step(self, valor): self.valores.append(valor)
+    def finalize(self): return json.dumps(self.valores) if self.valores else None
+
+class _ArrayAggOrdenado(_ArrayAgg):
+    def finalize(self):
+        # NULL no fim, como no Postgres
+        return json.dumps(sorted(self.valores, key=lambda v: (v is None, v if v is not None else 0))) if self.valores else None
+
+# --- Pool e conexões ---
+
+_RE_LOCK = re.compile(r"SELECT pg_(try_advisory_lock|advisory_unlock)\(hashtext\(\$1\)\)", re.IGNORECASE)
+_RE_VERBO = re.compile(r'\s*(?:WITH\b.*?\)\s*)?(INSERT|UPDATE|DELETE|SELECT|CREATE|ALTER|DROP)\b', re.IGNORECASE | re.DOTALL)
+
+class PoolMemoria:
+    """Substituto do asyncpg.Pool sobre uma única base SQLite em memória."""
+    def __init__(self, max_size: int = 10):
+        self._bd = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+        self._bd.create_function('array_remove', 2, _array_remove, deterministic=True)
+        self._bd.create_function('array_acrescentar', 2, _array_acrescentar, deterministic=True)
+        self._bd.create_function('string_to_array', 2, _string_to_array, deterministic=True)
+        self._bd.create_function('distancia_bits', 2, _distancia_bits, deterministic=True)
+        self._bd.create_function('hashtext', 1, _hashtext, deterministic=True)
+        self._bd.create_aggregate('array_agg', 1, _ArrayAgg)
+        self._bd.create_aggregate('array_agg_ordenado', 1, _ArrayAggOrdenado)
+        self._max_size = max_size
+        self._livres = asyncio.Semaphore(max_size)
+        self._em_uso = 0
+        self._traducoes = {} # {query: Traducao}
+        self._tipos = {} # {coluna: conversor}, a partir do DDL
+        self._locks = {} # {chave: conexão} dos advisory locks
+        # Só há uma base: enquanto uma transação está aberta, as queries das outras tarefas esperam que termine
+        self._exclusivo = asyncio.Lock()
+        self._dono = None # Tarefa com a transação aberta
+
+    async def acquire(self):
+        await self._livres.acquire()
+        self._em_uso += 1
+        return ConexaoMemoria(self)
+
+    async def release(self, conn):
+        self._em_uso -= 1
+        self._livres.release()
+
+    async def close(self):
+        self._bd.close()
+
+    def get_size(self): return self._max_size
+    def get_idle_size(self): return self._max_size - self._em_uso
+
+    def _traducao(self, query: str) -> Traducao:
+        traducao = self._traducoes.get(query)
+        if traducao is None:
+            traducao = self._traducoes[query] = traduzir(query, self._tipos)
+        return traducao
+
+    def _converter(self, traducao: Traducao, nomes: tuple, linhas: list) -> list:
+        conversores = traducao.conversores.get(nomes)
+        if conversores is None:
+            conversores = traducao.conversores[nomes] = [
+                (i, _lista if nome in traducao.listas else self._tipos[nome])
+                for i, nome in enumerate(nomes) if nome in traducao.listas or nome in self._tipos]
+        indices = {nome: i for i, nome in enumerate(nomes)}
+        if not conversores: return [Registo(indices, linha) for linha in linhas]
+        convertidas = []
+        for linha in linhas:
+            valores = list(linha)
+            for i, conversor in conversores: valores[i] = conversor(valores[i])
+            convertidas.append(Registo(indices, tuple(valores)))
+        return convertidas
+
+    def _correr(self, sql: str, parametros: dict):
+        cursor = self._bd.execute(sql, parametros)
+        linhas = cursor.fetchall()
+        nomes = tuple(d[0] for d in cursor.description) if cursor.description else ()
+        return nomes, linhas, cursor.rowcount
+
+    def executar(self, query: str, params: tuple):
+        """Executa `query` e devolve (registos, estado no formato do asyncpg, ex: 'UPDATE 3')."""
+        traducao = self._traducao(query)
+        parametros = {f'p{i}': _adaptar(v) for i, v in enumerate(params, 1)}
+        varios = len(traducao.passos) > 1
+        temporarias = []
+        # Savepoint e não BEGIN: os passos podem correr dentro de uma transação já aberta
+        if varios: self._bd.execute("SAVEPOINT passos")
+        try:
+            nomes, linhas, alteradas = (), [], 0
+            for tipo, sql, extra in traducao.passos:
+                if tipo == _NADA: continue
+                if tipo == _COLUNA:
+                    tabela, coluna = extra
+                    if not any(c[1] == coluna for c in self._bd.execute(f"PRAGMA table_info({tabela})")):
+                        self._adicionar_coluna(sql, tabela, coluna)
+                    continue
+                nomes, linhas, alteradas = self._correr(sql, parametros)
+                if tipo == _TEMPORARIA:
+                    self._bd.execute(f"CREATE TEMP TABLE {extra} ({', '.join(nomes) or '_'})")
+                    temporarias.append(extra)
+                    if linhas: self._bd.executemany(f"INSERT INTO temp.{extra} VALUES ({', '.join('?' * len(nomes))})", linhas)
+            if varios: self._bd.execute("RELEASE passos")
+        except BaseException:
+            if varios: self._bd.execute("ROLLBACK TO passos"); self._bd.execute("RELEASE passos")
+            raise
+        finally:
+            for nome in temporarias: self._bd.execute(f"DROP TABLE IF EXISTS temp.{nome}")
+
+        verbo = _RE_VERBO.match(traducao.passos[-1][1] or 'SELECT')
+        verbo = verbo.group(1).upper() if verbo else 'SELECT'
+        contagem = len(linhas) if verbo == 'SELECT' or alteradas < 0 else alteradas
+        estado = f"INSERT 0 {contagem}" if verbo == 'INSERT' else f"{verbo} {contagem}"
+        return self._converter(traducao, nomes, linhas), estado
+
+    def _adicionar_coluna(self, sql: str, tabela: str, coluna: str):
+        # O SQLite não aceita um DEFAULT não constante em ADD COLUMN: o valor por omissão passa a um trigger
+        padrao = re.search(r"\s+DEFAULT\s+(\(strftime\(.*\)\))", sql)
+        if not padrao:
+            self._bd.execute(sql)
+            return
+        self._bd.execute(sql[:padrao.start()] + sql[padrao.end():])
+        self._bd.execute(f"""CREATE TRIGGER {tabela}_{coluna}_padrao AFTER INSERT ON {tabela} WHEN NEW.{coluna} IS NULL
+                             BEGIN UPDATE {tabela} SET {coluna} = {padrao.group(1)} WHERE rowid = NEW.rowid; END""")
+
+class _CursorMemoria:
+    """Substituto do asyncpg Cursor: as linhas já estão todas lidas, `fetch(n)` vai-as devolvendo."""
+    def __init__(self, linhas: list):
+        self._linhas = linhas
+        self._posicao = 0
+
+    async def fetch(self, n, *, timeout=None):
+        pagina = self._linhas[self._posicao:self._posicao + n]
+        self._posicao += len(pagina)
+        return pagina
+
+class _TransacaoMemoria:
+    """Substituto do asyncpg Transaction. A de fora abre a transação e fica com a base até ao fim;
+    as de dentro, na mesma conexão, são savepoints. O isolamento é sempre total (uma transação de cada vez)."""
+    def __init__(self, conn: 'ConexaoMemoria'):
+        self._conn = conn
+        self._savepoint = None
+
+    async def __aenter__(self):
+        conn, pool = self._conn, self._conn._pool
+        if conn._transacoes:
+            self._savepoint = f"sp{conn._transacoes}"
+            pool._bd.execute(f"SAVEPOINT {self._savepoint}")
+        else:
+            await pool._exclusivo.acquire()
+            pool._dono = asyncio.current_task()
+            pool._bd.execute("BEGIN")
+        conn._transacoes += 1
+        return self
+
+    async def __aexit__(self, tipo, valor, tb):
+        conn, pool = self._conn, self._conn._pool
+        conn._transacoes -= 1
+        if self._savepoint:
+            if tipo: pool._bd.execute(f"ROLLBACK TO {self._savepoint}")
+            pool._bd.execute(f"RELEASE {self._savepoint}")
+            return
+        try: pool._bd.execute("ROLLBACK" if tipo else "COMMIT")
+        finally:
+            pool._dono = None
+            pool._exclusivo.release()
+
+class ConexaoMemoria:
+    """Substituto do asyncpg.Connection (só os métodos que o DatabaseManager usa)."""
+    def __init__(self, pool: PoolMemoria):
+        self._pool = pool
+        self._transacoes = 0 # Profundidade das transações abertas nesta conexão
+
+    def transaction(self, isolation=None, readonly=False):
+        return nullcontext() if readonly else _TransacaoMemoria(self)
+
+    async def _esperar_vez(self):
+        # Uma transação aberta por outra tarefa tem a base só para si
+        while self._pool._dono not in (None, asyncio.current_task()):
+            async with self._pool._exclusivo: pass
+
+    def _executar(self, query: str, params: tuple):
+        if m := _RE_LOCK.match(query):
+            return [Registo({f'pg_{m.group(1)}': 0}, (self._lock(m.group(1), params[0]),))], "SELECT 1"
+        return self._pool.executar(query, params)
+
+    def _lock(self, operacao: str, chave: str) -> bool:
+        locks = self._pool._locks
+        if operacao == 'try_advisory_lock':
+            if locks.get(chave, self) is not self: return False
+            locks[chave] = self
+            return True
+        if locks.get(chave) is not self: return False
+        del locks[chave]
+        return True
+
+    async def fetch(self, query, *params, timeout=None):
+        await self._esperar_vez()
+        return self._executar(query, params)[0]
+
+    async def fetchrow(self, query, *params, timeout=None):
+        linhas = await self.fetch(query, *params)
+        return linhas[0] if linhas else None
+
+    async def fetchval(self, query, *params, column=0, timeout=None):
+        linhas = await self.fetch(query, *params)
+        return linhas[0][column] if linhas else None
+
+    async def execute(self, query, *params, timeout=None):
+        await self._esperar_vez()
+        return self._executar(query, params)[1]
+
+    async def cursor(self, query, *params, prefetch=None, timeout=None):
+        return _CursorMemoria(await self.fetch(query, *params))
+
+    async def executemany(self, query, args, timeout=None):
+        # Atómico, como no asyncpg
+        await self._esperar_vez()
+        bd = self._pool._bd
+        bd.execute("SAVEPOINT executemany")
+        try:
+            for params in args: self._executar(query, params)
+        except BaseException:
+            bd.execute("ROLLBACK TO executemany"); bd.execute("RELEASE executemany")
+            raise
+        bd.execute("RELEASE executemany")
+
+    async def copy_records_to_table(self, table_name, *, records, columns=None, timeout=None):
+        await self._esperar_vez()
+        registos = [tuple(_adaptar(v) for v in registo) for registo in records]
+        if not registos: return "COPY 0"
+        colunas = f" ({', '.join(columns)})" if columns else ""
+        self._pool._bd.executemany(f"INSERT INTO {table_name}{colunas} VALUES ({', '.join('?' * len(registos[0]))})", registos)
+        return f"COPY {len(registos)}"
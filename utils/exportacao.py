@@ -0,0 +1,65 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+FORMATOS = ('csv', 'jsonl')
+
+class ExportacaoGzip:
+    """Escreve linhas (tuplos pela ordem de `colunas`) em CSV ou JSONL comprimido com gzip, em partes de no máx. `limite`
+    bytes, cada uma um .gz válido por si (em CSV o cabeçalho repete-se em cada parte).
+    Só existe a parte atual, num ficheiro temporário em disco: a memória usada não depende do número de linhas.
+
+        exportacao = ExportacaoGzip('csv', ('id', 'valor'), limite)
+        for lote in lotes:
+            if parte := exportacao.escrever(lote): await enviar(parte)
+        if parte := exportacao.fechar(): await enviar(parte)
+    """
+    MARGEM = 1024 * 1024 # O compressor guarda algum texto antes de o escrever no ficheiro
+
+    def __init__(self, formato: str, colunas: tuple, limite: int):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconhecido: {formato} (use {' ou '.join(FORMATOS)}).")
+        self.formato = formato
+        self.colunas = tuple(colunas)
+        self.limite = max(limite - self.MARGEM, self.MARGEM)
+        self.linhas = 0
+        self.partes = 0 # Partes abertas até agora (a atual incluída)
+        self._ficheiro = self._gzip = None
+
+    @property
+    def extensao(self) -> str:
+        return f"{self.formato}.gz"
+
+    def _abrir(self):
+        self._ficheiro = tempfile.TemporaryFile()
+        self._gzip = gzip.GzipFile(fileobj=self._ficheiro, mode='wb')
+        self.partes += 1
+        if self.formato == 'csv': self._gzip.write(self._csv([self.colunas]).encode())
+
+    @staticmethod
+    def _csv(linhas) -> str:
+        saida = io.StringIO()
+        csv.writer(saida).writerows(linhas)
+        return saida.getvalue()
+
+    def _jsonl(self, linhas) -> str:
+        return "".join(json.dumps(dict(zip(self.colunas, linha)), ensure_ascii=False, default=str) + "\n" for linha in linhas)
+
+    def escrever(self, linhas: list):
+        """Acrescenta `linhas` à parte atual. Se ela passar do limite, fecha-a e devolve-a (ver fechar); senão, None."""
+        if self._gzip is None: self._abrir()
+        self._gzip.write((self._csv(linhas) if self.formato == 'csv' else self._jsonl(linhas)).encode())
+        self.linhas += len(linhas)
+        if self._ficheiro.tell() >= self.limite: return self.fechar()
+        return None
+
+    def fechar(self):
+        """Fecha a parte atual e devolve o ficheiro temporário, posicionado no início (apagado quando for fechado).
+        Devolve None se não houver parte aberta."""
+        if self._gzip is None: return None
+        self._gzip.close()
+        ficheiro, self._ficheiro, self._gzip = self._ficheiro, None, None
+        ficheiro.seek(0)
+        return ficheiro
@@ -0,0 +1,63 @@
+import logging
+import asyncio
+import asyncpg
+from utils.db_memoria import e_dsn_memoria
+
+log = logging.getLogger(__name__)
+
+# Chave do advisory lock partilhada por todas as instâncias do bot
+CHAVE_LIDER = 'arauto-bank:lider'
+
+class EleicaoLider:
+    """Eleição de líder entre processos do bot através de um advisory lock de sessão do Postgres.
+    O lock vive numa conexão dedicada (fora do pool): se o líder morrer, o Postgres liberta-o
+    e uma instância em standby assume na tentativa seguinte (a cada `intervalo` segundos)."""
+    def __init__(self, bot, dsn: str, intervalo: float = 5.0):
+        self.bot = bot
+        self._dsn = dsn
+        self._intervalo = intervalo
+        self._conn = None
+        self._tarefa = None
+        self.e_lider = False
+
+    async def iniciar(self):
+        # Primeira tentativa síncrona: uma instância isolada já arranca como líder
+        await self._tentar()
+        self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self):
+        if self._tarefa: self._tarefa.cancel()
+        self._definir_lider(False)
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close() # Fechar a sessão liberta o lock
+
+    def _definir_lider(self, e_lider: bool):
+        if e_lider == self.e_lider: return
+        self.e_lider = e_lider
+        if e_lider:
+            log.info("[Liderança] Este processo é agora o LÍDER. Tarefas em segundo plano ativas.")
+            self.bot.dispatch('lideranca_obtida')
+        else:
+            log.warning("[Liderança] Liderança perdida. Este processo está em STANDBY.")
+
+    async def _tentar(self):
+        if e_dsn_memoria(self._dsn): return self._definir_lider(True) # Base em memória: só existe este processo
+        try:
+            if self._conn is None or self._conn.is_closed():
+                self._definir_lider(False)
+                self._conn = await asyncpg.connect(dsn=self._dsn, server_settings={'application_name': 'arauto-bank-lider'})
+            if self.e_lider:
+                await self._conn.fetchval("SELECT 1", timeout=self._intervalo) # Heartbeat da sessão que segura o lock
+            else:
+                self._definir_lider(await self._conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", CHAVE_LIDER, timeout=self._intervalo))
+        except Exception as e:
+            log.error("[Liderança] Falha na conexão de eleição: %s", e)
+            self._definir_lider(False)
+            if self._conn:
+                self._conn.terminate()
+                self._conn = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self._intervalo)
+            await self._tentar()
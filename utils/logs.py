@@ -0,0 +1,108 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+
+# Contexto da invocação atual (guilda, utilizador, comando), acrescentado a todos os registos feitos nela
+_CONTEXTO = contextvars.ContextVar('contexto_log', default=None)
+_CAMPOS = ('guild', 'user', 'command', 'duracao')
+
+def definir_contexto(guild: int = None, user: int = None, command: str = None):
+    _CONTEXTO.set({'guild': guild, 'user': user, 'command': command})
+
+class FiltroContexto(logging.Filter):
+    """Copia o contexto da tarefa atual para o registo. Corre no loop (antes da fila),
+    porque as contextvars não são visíveis na thread que escreve os registos."""
+    def filter(self, record):
+        contexto = _CONTEXTO.get()
+        if contexto:
+            for campo, valor in contexto.items():
+                if getattr(record, campo, None) is None: setattr(record, campo, valor)
+        return True
+
+class FiltroDuplicados(logging.Filter):
+    """Deixa passar no máximo `maximo` registos iguais (mesmo logger, nível e mensagem-modelo) por `janela`
+    segundos. O primeiro registo da janela seguinte indica quantos foram suprimidos.
+    Só se aplica a partir de `nivel_minimo`: as rajadas são de erros (ex: um erro por membro em voz),
+    e os registos informativos (ex: fim de cada comando) não devem perder-se."""
+    def __init__(self, janela: float = 60.0, maximo: int = 5, nivel_minimo: int = logging.WARNING):
+        super().__init__()
+        self.janela = janela
+        self.maximo = maximo
+        self.nivel_minimo = nivel_minimo
+        self._contagens = {} # {(logger, nivel, msg): [inicio_janela, emitidos, suprimidos]}
+
+    def filter(self, record):
+        if record.levelno < self.nivel_minimo: return True
+        chave = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else str(record.msg))
+        agora = time.monotonic()
+        entrada = self._contagens.get(chave)
+        if entrada is None or agora - entrada[0] >= self.janela:
+            if entrada is not None and entrada[2]: record.suprimidas = entrada[2]
+            if len(self._contagens) > 10000: self._contagens.clear() # Limite de memória
+            self._contagens[chave] = [agora, 1, 0]
+            return True
+        if entrada[1] < self.maximo:
+            entrada[1] += 1
+            return True
+        entrada[2] += 1
+        return False
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha: momento, nível, logger, mensagem, campos de contexto e exceção."""
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for campo in _CAMPOS + ('suprimidas',):
+            valor = getattr(record, campo, None)
+            if valor is not None: dados[campo] = round(valor, 4) if isinstance(valor, float) else valor
+        if record.exc_info: dados['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text: dados['exc'] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # No loop só se resolve a mensagem (msg % args) e o traceback, que não podem atravessar a fila
+        # como objetos vivos; a formatação JSON e a escrita ficam para a thread do listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _FORMATADOR_EXCECOES.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_FORMATADOR_EXCECOES = logging.Formatter()
+
+_listener = None
+
+def configurar_logs(nivel: str = None):
+    """Encaminha todos os registos (incluindo os do discord.py) por uma fila em memória;
+    uma thread dedicada formata-os em JSON e escreve-os no stdout, fora do event loop."""
+    global _listener
+    if _listener: return
+    fila = queue.SimpleQueue()
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatadorJSON())
+
+    handler = _QueueHandler(fila)
+    handler.addFilter(FiltroContexto())
+    handler.addFilter(FiltroDuplicados())
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [handler]
+    raiz.setLevel(nivel or os.getenv('LOG_LEVEL', 'INFO'))
+
+    _listener = logging.handlers.QueueListener(fila, saida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,211 @@
+import logging
+import time
+import bisect
+from datetime import datetime, timezone
+from collections import deque
+from contextlib import contextmanager
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+# Limites (em segundos) dos histogramas de latência
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatar_etiquetas(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra: pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+class Contador:
+    """Contador monotónico, opcionalmente com etiquetas."""
+    tipo = "counter"
+    def __init__(self, nome: str, ajuda: str, etiquetas: tuple = ()):
+        self.nome, self.ajuda, self.etiquetas = nome, ajuda, etiquetas
+        self.valores = {}
+
+    def inc(self, *valores_etiquetas, valor: float = 1):
+        self.valores[valores_etiquetas] = self.valores.get(valores_etiquetas, 0) + valor
+
+    def exportar(self):
+        for chave, valor in self.valores.items():
+            yield f"{self.nome}{_formatar_etiquetas(self.etiquetas, chave)} {valor}"
+
+class Histograma:
+    """Histograma cumulativo no formato Prometheus (buckets, _sum e _count)."""
+    tipo = "histogram"
+    def __init__(self, nome: str, ajuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_PADRAO):
+        self.nome, self.ajuda, self.etiquetas, self.buckets = nome, ajuda, etiquetas, tuple(buckets)
+        self.series = {} # {valores_etiquetas: [contagens_por_bucket, soma, total]}
+
+    def observar(self, valor: float, *valores_etiquetas):
+        serie = self.series.get(valores_etiquetas)
+        if serie is None:
+            serie = self.series[valores_etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.buckets): serie[0][indice] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def quantil(self, q: float) -> float:
+        """Estimativa de um quantil (todas as séries somadas), por interpolação linear dentro do bucket."""
+        contagens = [sum(serie[0][i] for serie in self.series.values()) for i in range(len(self.buckets))]
+        total = sum(serie[2] for serie in self.series.values())
+        if not total: return None
+        alvo, acumulado, anterior = q * total, 0, 0.0
+        for limite, contagem in zip(self.buckets, contagens):
+            if contagem and acumulado + contagem >= alvo:
+                return anterior + (limite - anterior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+            anterior = limite
+        return self.buckets[-1] # Acima do último bucket
+
+    @contextmanager
+    def medir(self, *valores_etiquetas):
+        inicio = time.perf_counter()
+        try: yield
+        finally: self.observar(time.perf_counter() - inicio, *valores_etiquetas)
+
+    def exportar(self):
+        for chave, (contagens, soma, total) in self.series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                etiquetas = _formatar_etiquetas(self.etiquetas, chave, 'le="%s"' % limite)
+                yield f"{self.nome}_bucket{etiquetas} {acumulado}"
+            etiquetas = _formatar_etiquetas(self.etiquetas, chave, 'le="+Inf"')
+            yield f"{self.nome}_bucket{etiquetas} {total}"
+            yield f"{self.nome}_sum{_formatar_etiquetas(self.etiquetas, chave)} {soma}"
+            yield f"{self.nome}_count{_formatar_etiquetas(self.etiquetas, chave)} {total}"
+
+class Gauge:
+    """Valor instantâneo calculado no momento da recolha (scrape).
+    A função devolve um número, ou um dict {valores_etiquetas: número}."""
+    tipo = "gauge"
+    def __init__(self, nome: str, ajuda: str, funcao, etiquetas: tuple = ()):
+        self.nome, self.ajuda, self.funcao, self.etiquetas = nome, ajuda, funcao, etiquetas
+
+    def exportar(self):
+        try: resultado = self.funcao()
+        except Exception: return
+        if resultado is None: return
+        if not isinstance(resultado, dict): resultado = {(): resultado}
+        for chave, valor in resultado.items():
+            yield f"{self.nome}{_formatar_etiquetas(self.etiquetas, chave)} {valor}"
+
+class JanelaDeslizante:
+    """Conta eventos nos últimos `segundos` (ex: pagamentos por minuto)."""
+    def __init__(self, segundos: float = 60.0):
+        self.segundos = segundos
+        self._eventos = deque()
+
+    def registar(self, quantidade: int = 1):
+        self._eventos.append((time.monotonic(), quantidade))
+
+    def total(self) -> int:
+        limite = time.monotonic() - self.segundos
+        while self._eventos and self._eventos[0][0] < limite:
+            self._eventos.popleft()
+        return sum(q for _, q in self._eventos)
+
+class Metricas:
+    """Registo de métricas em memória. Cada atualização é uma operação O(1) sem I/O;
+    o texto no formato Prometheus só é gerado quando alguém lê /metrics."""
+    def __init__(self):
+        self._metricas = {}
+
+    def _registar(self, metrica):
+        return self._metricas.setdefault(metrica.nome, metrica)
+
+    def contador(self, nome: str, ajuda: str, etiquetas: tuple = ()) -> Contador:
+        return self._registar(Contador(nome, ajuda, etiquetas))
+
+    def histograma(self, nome: str, ajuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_PADRAO) -> Histograma:
+        return self._registar(Histograma(nome, ajuda, etiquetas, buckets))
+
+    def gauge(self, nome: str, ajuda: str, funcao, etiquetas: tuple = ()) -> Gauge:
+        # Substitui um gauge anterior com o mesmo nome (ex: cog recarregado)
+        self._metricas[nome] = Gauge(nome, ajuda, funcao, etiquetas)
+        return self._metricas[nome]
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas.values():
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+# Registo global do processo (partilhado por main, cogs e utils)
+METRICAS = Metricas()
+
+COMANDOS_TOTAL = METRICAS.contador('arauto_comandos_total', 'Comandos invocados, por nome e resultado.', ('comando', 'resultado'))
+COMANDOS_LATENCIA = METRICAS.histograma('arauto_comando_latencia_segundos', 'Latência dos comandos (invocação completa), por nome.', ('comando',))
+DB_QUERY_LATENCIA = METRICAS.histograma('arauto_db_query_latencia_segundos', 'Latência das queries, por etiqueta (verbo:tabela).', ('query',))
+DB_QUERY_ERROS = METRICAS.contador('arauto_db_query_erros_total', 'Queries que falharam, por etiqueta.', ('query',))
+DB_TRANSACOES_REPETIDAS = METRICAS.contador('arauto_db_transacoes_repetidas_total', 'Transações repetidas por falha de serialização ou deadlock, por motivo.', ('motivo',))
+DB_POOL_ESPERA = METRICAS.histograma('arauto_db_pool_espera_segundos', 'Tempo de espera para obter uma conexão do pool, por faixa.', ('faixa',))
+TAREFAS_DURACAO = METRICAS.histograma('arauto_tarefa_duracao_segundos', 'Duração das tarefas em segundo plano, por tarefa.', ('tarefa',),
+                                      buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0))
+RENDA_PASSIVA_PAGAMENTOS = METRICAS.contador('arauto_renda_passiva_pagamentos_total', 'Pagamentos de renda passiva, por tipo.', ('tipo',))
+RENDA_PASSIVA_MOEDAS = METRICAS.contador('arauto_renda_passiva_moedas_total', 'Moedas pagas em renda passiva, por tipo.', ('tipo',))
+RENDA_PASSIVA_MINUTO = JanelaDeslizante(60.0)
+METRICAS.gauge('arauto_renda_passiva_pagamentos_ultimo_minuto', 'Pagamentos de renda passiva no último minuto.', RENDA_PASSIVA_MINUTO.total)
+
+# Última execução de cada tarefa em segundo plano: {nome: (momento, duracao)}
+ULTIMAS_TAREFAS = {}
+
+def registar_tarefa(nome: str, duracao: float):
+    TAREFAS_DURACAO.observar(duracao, nome)
+    ULTIMAS_TAREFAS[nome] = (datetime.now(timezone.utc), duracao)
+
+@contextmanager
+def medir_tarefa(nome: str):
+    """Mede a duração de uma execução de tarefa em segundo plano: `with medir_tarefa('nome'): ...`"""
+    inicio = time.perf_counter()
+    try: yield
+    finally: registar_tarefa(nome, time.perf_counter() - inicio)
+
+def memoria_rss() -> int:
+    """Memória residente do processo em bytes (lida de /proc; pico do processo noutros sistemas)."""
+    try:
+        with open('/proc/self/status') as status:
+            for linha in status:
+                if linha.startswith('VmRSS:'): return int(linha.split()[1]) * 1024
+    except OSError: pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+METRICAS.gauge('arauto_processo_rss_bytes', 'Memória residente do processo.', memoria_rss)
+
+def registar_renda_passiva(tipo: str, valor: int, quantidade: int = 1):
+    RENDA_PASSIVA_PAGAMENTOS.inc(tipo, valor=quantidade)
+    RENDA_PASSIVA_MOEDAS.inc(tipo, valor=valor * quantidade)
+    RENDA_PASSIVA_MINUTO.registar(quantidade)
+
+class ServidorMetricas:
+    """Servidor HTTP local (aiohttp) que expõe GET /metrics no formato de texto do Prometheus."""
+    def __init__(self, metricas: Metricas, host: str = '127.0.0.1', porta: int = 9108):
+        self.metricas = metricas
+        self.host = host
+        self.porta = porta
+        self._runner = None
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.metricas.exportar(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def iniciar(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.porta).start()
+        log.info("Métricas disponíveis em http://%s:%s/metrics", self.host, self.porta)
+
+    async def parar(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
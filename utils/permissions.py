@@ -11,16 +11,22 @@ def check_permission_level(level: int):
             user = ctx_or_interaction.user
             bot = ctx_or_interaction.client
 
+        # Fora de um servidor (DM) não há cargos nem configurações a verificar
+        if not isinstance(user, discord.Member):
+            return False
+
         if user.guild_permissions.administrator:
             return True
         
         author_roles_ids = {str(role.id) for role in user.roles}
         db_manager = bot.db_manager
 
+        # Busca todos os níveis necessários numa única query (configurações da guilda do autor)
+        perm_configs = await db_manager.get_all_configs(user.guild.id, [f'perm_nivel_{i}' for i in range(level, 5)])
         for i in range(level, 5):
             perm_key = f'perm_nivel_{i}'
             # Agora buscamos uma lista de IDs, separada por vírgulas
-            role_ids_str = await db_manager.get_config_value(perm_key, '')
+            role_ids_str = perm_configs.get(perm_key, '')
             if role_ids_str:
                 allowed_role_ids = set(role_ids_str.split(','))
                 # Se qualquer um dos cargos do autor estiver na lista de permissões, retorna True
@@ -43,15 +49,20 @@ def app_check_permission_level(level: int):
         user = interaction.user
         bot = interaction.client
 
+        if not isinstance(user, discord.Member):
+            await interaction.response.send_message("Este comando só pode ser usado num servidor.", ephemeral=True)
+            return False
+
         if user.guild_permissions.administrator:
             return True
         
         author_roles_ids = {str(role.id) for role in user.roles}
         db_manager = bot.db_manager
 
+        perm_configs = await db_manager.get_all_configs(user.guild.id, [f'perm_nivel_{i}' for i in range(level, 5)])
         for i in range(level, 5):
             perm_key = f'perm_nivel_{i}'
-            role_ids_str = await db_manager.get_config_value(perm_key, '')
+            role_ids_str = perm_configs.get(perm_key, '')
             if role_ids_str:
                 allowed_role_ids = set(role_ids_str.split(','))
                 if not author_roles_ids.isdisjoint(allowed_role_ids):
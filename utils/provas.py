@@ -0,0 +1,83 @@
+import logging
+import asyncio
+import hashlib
+import io
+import discord
+from PIL import Image
+from utils.rastreio import span
+from utils import consultas
+
+log = logging.getLogger(__name__)
+
+# Distância de Hamming máxima (em bits) para considerar dois prints "quase iguais".
+# O dHash de 64 bits é guardado em 4 blocos de 16 bits indexados: com distância <= 3,
+# pelo menos um bloco é idêntico (princípio da casa dos pombos), por isso a busca
+# por blocos nunca perde um candidato e continua indexada com dezenas de milhares de prints.
+DISTANCIA_MAXIMA = 3
+NUM_BLOCOS = 4
+
+def _dhash(dados: bytes) -> int:
+    """Hash perceptual (diferença horizontal 9x8) de 64 bits."""
+    with Image.open(io.BytesIO(dados)) as imagem:
+        pixels = list(imagem.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    valor = 0
+    for linha in range(8):
+        for coluna in range(8):
+            esquerda, direita = pixels[linha * 9 + coluna], pixels[linha * 9 + coluna + 1]
+            valor = (valor << 1) | (esquerda > direita)
+    return valor
+
+def _calcular(dados: bytes):
+    sha256 = hashlib.sha256(dados).hexdigest()
+    try: phash = _dhash(dados)
+    except Exception as e:
+        log.warning("Aviso: não foi possível calcular o hash perceptual da prova: %s", e)
+        phash = None
+    return sha256, phash
+
+def _para_bigint(valor: int) -> int:
+    """Converte os 64 bits sem sinal para o intervalo do BIGINT do Postgres."""
+    return valor - (1 << 64) if valor >= (1 << 63) else valor
+
+def _blocos(phash: int) -> list:
+    return [(phash >> (16 * i)) & 0xFFFF for i in range(NUM_BLOCOS)]
+
+def distancia_hamming(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+async def calcular_hashes(anexo: discord.Attachment):
+    """Descarrega a prova uma única vez e devolve (sha256, dhash). A descodificação corre fora do loop."""
+    dados = await anexo.read()
+    with span('cpu', 'hashes da imagem'):
+        return await asyncio.to_thread(_calcular, dados)
+
+async def procurar_duplicados(db_manager, guild_id: int, sha256: str, phash, limite: int = 5):
+    """Procura provas iguais (sha256) ou quase iguais (dhash) já submetidas na mesma guilda."""
+    blocos = _blocos(phash) if phash is not None else [None] * NUM_BLOCOS
+    candidatos = await db_manager.executar(consultas.PROVAS_CANDIDATAS, sha256, *blocos, guild_id,
+                                           _para_bigint(phash) if phash is not None else None, DISTANCIA_MAXIMA, fetch="all")
+    duplicados = []
+    for c in candidatos or []:
+        if c['sha256'] == sha256:
+            duplicados.append((0, c))
+        elif phash is not None and c['phash'] is not None and (d := distancia_hamming(phash, c['phash'])) <= DISTANCIA_MAXIMA:
+            duplicados.append((d, c))
+    duplicados.sort(key=lambda item: (item[0], -item[1]['data'].timestamp()))
+    return duplicados[:limite]
+
+async def registar_prova(db_manager, origem: str, mensagem: discord.Message, user_id: int, anexo_url: str, sha256: str, phash):
+    blocos = _blocos(phash) if phash is not None else [None] * NUM_BLOCOS
+    await db_manager.executar(
+        consultas.PROVAS_REGISTAR, origem, mensagem.guild.id if mensagem.guild else None, mensagem.channel.id, mensagem.id, user_id, anexo_url,
+        sha256, _para_bigint(phash) if phash is not None else None, *blocos
+    )
+
+def adicionar_alerta_duplicados(embed: discord.Embed, duplicados: list):
+    """Acrescenta ao embed de aprovação um aviso com as submissões anteriores parecidas."""
+    if not duplicados: return
+    linhas = []
+    for distancia, c in duplicados:
+        tipo = "idêntico" if distancia == 0 else f"quase idêntico ({distancia} bits)"
+        link = f"https://discord.com/channels/{c['guild_id']}/{c['canal_id']}/{c['message_id']}" if c['guild_id'] else f"ID `{c['message_id']}`"
+        linhas.append(f"• {tipo} — {c['origem']} de <@{c['user_id']}> em <t:{int(c['data'].timestamp())}:d> ([ver]({link}))")
+    embed.add_field(name="⚠️ Possível print reutilizado", value="\n".join(linhas)[:1024], inline=False)
@@ -0,0 +1,96 @@
+import re
+import time
+import random
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import aiohttp
+
+# Rastreio ativo na tarefa atual (cada mensagem é processada numa tarefa própria)
+_ATUAL = contextvars.ContextVar('rastreio_atual', default=None)
+_RE_IDS = re.compile(r"/\d{15,21}")
+
+class Rastreio:
+    """Uma invocação de comando amostrada, com os seus spans (BD, REST do Discord, ...)."""
+    def __init__(self, comando: str, guild_id: int, autor_id: int):
+        self.comando = comando
+        self.guild_id = guild_id
+        self.autor_id = autor_id
+        self.momento = datetime.now(timezone.utc)
+        self.inicio = time.perf_counter()
+        self.total = None
+        self.erro = False
+        self.spans = [] # [(tipo, nome, inicio_relativo, duracao)]
+
+    def registar(self, tipo: str, nome: str, inicio: float, duracao: float):
+        self.spans.append((tipo, nome, inicio - self.inicio, duracao))
+
+    def resumo(self) -> list:
+        """Agrega os spans por (tipo, nome): [(tipo, nome, chamadas, duracao_total)], do mais lento para o mais rápido."""
+        agregado = {}
+        for tipo, nome, _, duracao in self.spans:
+            chamadas, soma = agregado.get((tipo, nome), (0, 0.0))
+            agregado[(tipo, nome)] = (chamadas + 1, soma + duracao)
+        return sorted(((t, n, c, s) for (t, n), (c, s) in agregado.items()), key=lambda x: x[3], reverse=True)
+
+class Rastreador:
+    """Amostra uma fração das invocações de comandos para um buffer circular em memória."""
+    def __init__(self, taxa_amostragem: float = 0.1, capacidade: int = 200):
+        self.taxa_amostragem = taxa_amostragem
+        self.rastreios = deque(maxlen=capacidade)
+
+    def iniciar(self, ctx) -> Rastreio:
+        if self.taxa_amostragem <= 0 or random.random() >= self.taxa_amostragem:
+            return None
+        rastreio = Rastreio(ctx.command.qualified_name, ctx.guild.id if ctx.guild else None, ctx.author.id)
+        _ATUAL.set(rastreio)
+        return rastreio
+
+    def terminar(self, ctx):
+        """Fecha o rastreio da invocação atual (idempotente)."""
+        rastreio = _ATUAL.get()
+        if rastreio is None: return
+        _ATUAL.set(None)
+        rastreio.total = time.perf_counter() - rastreio.inicio
+        rastreio.erro = bool(ctx.command_failed)
+        self.rastreios.append(rastreio)
+
+    def mais_lentos(self, quantidade: int = 5, comando: str = None) -> list:
+        candidatos = [r for r in self.rastreios if comando is None or r.comando == comando]
+        return sorted(candidatos, key=lambda r: r.total, reverse=True)[:quantidade]
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Spans para os pedidos REST do discord.py (passado ao cliente via `http_trace`)."""
+        async def inicio_pedido(session, contexto, params):
+            contexto.inicio = time.perf_counter()
+
+        async def fim_pedido(session, contexto, params):
+            rastreio = _ATUAL.get()
+            if rastreio is None or not hasattr(contexto, 'inicio'): return
+            # Os IDs (snowflakes) são substituídos para que a mesma rota seja agregada num só span
+            rota = _RE_IDS.sub("/{id}", params.url.path.removeprefix('/api/v10'))
+            rastreio.registar('rest', f"{params.method} {rota}", contexto.inicio, time.perf_counter() - contexto.inicio)
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(inicio_pedido)
+        config.on_request_end.append(fim_pedido)
+        config.on_request_exception.append(fim_pedido)
+        return config
+
+def registar_span(tipo: str, nome: str, inicio: float, duracao: float):
+    """Regista um span no rastreio ativo, se a invocação atual estiver a ser amostrada."""
+    rastreio = _ATUAL.get()
+    if rastreio is not None:
+        rastreio.registar(tipo, nome, inicio, duracao)
+
+@contextmanager
+def span(tipo: str, nome: str):
+    """Mede um bloco de código como span: `with span('discord', 'editar cargos'): ...`"""
+    rastreio = _ATUAL.get()
+    if rastreio is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try: yield
+    finally: rastreio.registar(tipo, nome, inicio, time.perf_counter() - inicio)
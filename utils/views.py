@@ -1,13 +1,20 @@
+import logging
 import discord
 from discord.ext import commands
 from utils.permissions import check_permission_level
 from datetime import datetime, timezone
+from utils import consultas
+
+log = logging.getLogger(__name__)
 
 class OrbeAprovacaoView(discord.ui.View):
     def __init__(self, bot: commands.Bot):
         super().__init__(timeout=None)
         self.bot = bot
 
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return self.bot.e_lider # Só o processo líder trata aprovações
+
     async def handle_interaction(self, interaction: discord.Interaction, novo_status: str):
         # A verificação de permissão é a primeira coisa a fazer
         if not await check_permission_level(2).predicate(interaction):
@@ -17,13 +24,20 @@ class OrbeAprovacaoView(discord.ui.View):
         await interaction.response.defer()
         
         db_manager = self.bot.db_manager
-        
+        economia_cog = self.bot.get_cog('Economia')
+
+        async def decidir(tx):
+            # Reclama a submissão (só um clique consegue mudar o status 'pendente') e paga o grupo na mesma transação:
+            # se o pagamento falhar, a submissão continua pendente para poder ser aprovada mais tarde
+            submissao = await tx.executar(consultas.ORBE_RECLAMAR, novo_status, interaction.message.id, interaction.guild.id, fetch="one")
+            if submissao and novo_status == "aprovado":
+                membros_ids = submissao['membros'] or [submissao['autor_id']]
+                await economia_cog.transferir_do_tesouro_em_lote(interaction.guild.id, membros_ids, submissao['valor_total'] // len(membros_ids),
+                                                                 f"Recompensa de Orbe aprovada por {interaction.user.name}", tx=tx)
+            return submissao
+
         try:
-            submissao = await db_manager.execute_query(
-                "SELECT autor_id, membros, valor_total FROM submissoes_orbe WHERE message_id = $1 AND status = 'pendente'",
-                interaction.message.id,
-                fetch="one"
-            )
+            submissao = await db_manager.em_transacao(decidir)
             if not submissao:
                 # Se não encontrar, é porque já foi tratada. Apenas edita a mensagem.
                 embed = interaction.message.embeds[0]
@@ -32,20 +46,9 @@ class OrbeAprovacaoView(discord.ui.View):
                 await interaction.message.edit(embed=embed, view=self)
                 return
 
-            autor_id, membros_str, valor_total = submissao['autor_id'], submissao['membros'], submissao['valor_total']
-            membros_ids = [int(id_str) for id_str in membros_str.split(',')]
+            autor_id, membros_ids, valor_total = submissao['autor_id'], submissao['membros'] or [submissao['autor_id']], submissao['valor_total']
             
-            recompensa_individual = 0 # Inicializa a variável
-            if novo_status == "aprovado":
-                recompensa_individual = valor_total // len(membros_ids)
-                economia_cog = self.bot.get_cog('Economia')
-                for user_id in membros_ids:
-                    await economia_cog.transferir_do_tesouro(user_id, recompensa_individual, f"Recompensa de Orbe aprovada por {interaction.user.name}")
-            
-            await db_manager.execute_query(
-                "UPDATE submissoes_orbe SET status = $1 WHERE message_id = $2",
-                novo_status, interaction.message.id
-            )
+            recompensa_individual = valor_total // len(membros_ids) if novo_status == "aprovado" else 0
 
             embed = interaction.message.embeds[0]
             if novo_status == "aprovado":
@@ -71,10 +74,12 @@ class OrbeAprovacaoView(discord.ui.View):
                     else: # Recusado
                         await autor_da_submissao.send(f"😕 A sua submissão de orbe foi **RECUSADA** por um staff. Se achar que foi um erro, fale com a liderança.")
                 except discord.Forbidden:
-                    print(f"Não foi possível enviar DM para o utilizador {autor_id}. Provavelmente tem as DMs desativadas.")
+                    log.warning("Não foi possível enviar DM para o utilizador %s. Provavelmente tem as DMs desativadas.", autor_id)
 
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e} A submissão continua pendente.", ephemeral=True)
         except Exception as e:
-            print(f"Erro ao processar aprovação de orbe: {e}")
+            log.error("Erro ao processar aprovação de orbe: %s", e)
             await interaction.followup.send("Ocorreu um erro ao processar a sua ação.", ephemeral=True)
 
     @discord.ui.button(label="Aprovar", style=discord.ButtonStyle.success, custom_id="aprovar_orbe")
@@ -91,17 +96,17 @@ class TaxaPrataView(discord.ui.View):
         super().__init__(timeout=None)
         self.bot = bot
 
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return self.bot.e_lider # Só o processo líder trata aprovações
+
     async def handle_interaction(self, interaction: discord.Interaction, novo_status: str):
         if not await check_permission_level(2).predicate(interaction): return
         await interaction.response.defer()
         db_manager = self.bot.db_manager
 
         try:
-            # Busca a submissão PENDENTE pelo message_id
-            submissao = await db_manager.execute_query(
-                "SELECT id, user_id FROM submissoes_taxa WHERE message_id = $1 AND status = 'pendente'",
-                interaction.message.id, fetch="one"
-            )
+            # Reclama a submissão PENDENTE e aplica a decisão numa única instrução (uma ida à BD)
+            submissao = await db_manager.executar(consultas.TAXA_RECLAMAR_PRATA, novo_status, interaction.message.id, interaction.guild.id, fetch="one")
             if not submissao:
                 # Já tratada, edita a mensagem e sai
                 embed = interaction.message.embeds[0]
@@ -110,27 +115,14 @@ class TaxaPrataView(discord.ui.View):
                 await interaction.edit_original_response(embed=embed, view=self)
                 return
 
-            submissao_id = submissao['id']
             user_id = submissao['user_id']
             membro = interaction.guild.get_member(user_id)
 
-            # Marca a submissão como processada PRIMEIRO para evitar dupla execução
-            await db_manager.execute_query(
-                "UPDATE submissoes_taxa SET status = $1 WHERE id = $2",
-                novo_status, submissao_id
-            )
-
             if novo_status == "aprovado" and membro:
+                # Restaura os cargos em segundo plano (fila do cog de Taxas)
                 taxas_cog = self.bot.get_cog('Taxas')
-                configs = await db_manager.get_all_configs(['cargo_membro', 'cargo_inadimplente'])
-                # Atualiza status na tabela principal de taxas
-                await db_manager.execute_query(
-                    "INSERT INTO taxas (user_id, status_ciclo) VALUES ($1, 'PAGO_ATRASADO') ON CONFLICT (user_id) DO UPDATE SET status_ciclo = 'PAGO_ATRASADO'",
-                    user_id
-                )
-                # Restaura os cargos
                 if taxas_cog:
-                    await taxas_cog.regularizar_membro(membro, configs)
+                    taxas_cog.agendar_regularizacao(membro)
 
             # Edita o embed de aprovação
             embed = interaction.message.embeds[0]
@@ -141,7 +133,7 @@ class TaxaPrataView(discord.ui.View):
             await interaction.edit_original_response(embed=embed, view=self)
 
             # --- ENVIA FEEDBACK NO CANAL DE PAGAMENTO ---
-            canal_pagamento_id = int(await db_manager.get_config_value('canal_pagamento_taxas', '0') or 0)
+            canal_pagamento_id = int(await db_manager.get_config_value(interaction.guild.id, 'canal_pagamento_taxas', '0') or 0)
             if canal_pagamento_id and membro:
                 canal_pagamento = self.bot.get_channel(canal_pagamento_id)
                 if canal_pagamento:
@@ -149,17 +141,17 @@ class TaxaPrataView(discord.ui.View):
                         feedback_msg = f"✅ Pagamento em prata de {membro.mention} foi **APROVADO** por {interaction.user.mention}." if novo_status == "aprovado" else f"❌ Pagamento em prata de {membro.mention} foi **RECUSADO** por {interaction.user.mention}."
                         await canal_pagamento.send(feedback_msg, delete_after=60)
                     except Exception as feedback_e:
-                        print(f"Erro ao enviar feedback no canal de pagamento: {feedback_e}")
+                        log.error("Erro ao enviar feedback no canal de pagamento: %s", feedback_e)
 
             # Envia DM
             if membro:
                 try:
                     msg = f"🎉 Seu comprovativo (prata) foi **APROVADO**! Acesso restaurado." if novo_status == "aprovado" else f"😕 Seu comprovativo (prata) foi **RECUSADO** por {interaction.user.mention}. Contacte a staff."
                     await membro.send(msg)
-                except Exception as e: print(f"Falha DM {user_id}: {e}")
+                except Exception as e: log.error("Falha DM %s: %s", user_id, e)
 
         except Exception as e:
-            print(f"Erro handle_interaction TaxaPrataView: {e}")
+            log.error("Erro handle_interaction TaxaPrataView: %s", e)
             await interaction.followup.send("❌ Erro ao processar.", ephemeral=True)
 
     @discord.ui.button(label="Aprovar", style=discord.ButtonStyle.success, custom_id="aprovar_taxa_prata")
@@ -0,0 +1,100 @@
+import logging
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from utils.metricas import METRICAS
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG = METRICAS.histograma('arauto_loop_lag_segundos', 'Atraso do event loop medido pelo vigia.',
+                               buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+_DIR_ASYNCIO = os.path.dirname(asyncio.__file__)
+
+LOOP_BLOQUEIOS = METRICAS.contador('arauto_loop_bloqueios_total', 'Bloqueios do event loop acima do limite.')
+
+class Bloqueio:
+    """Um episódio em que o loop ficou bloqueado, com a stack apanhada durante o bloqueio."""
+    def __init__(self, stack: list):
+        self.momento = datetime.now(timezone.utc)
+        self.stack = stack
+        self.duracao = None # Preenchida quando o loop volta a correr
+
+class VigiaLoop:
+    """Mede continuamente o atraso (lag) do event loop.
+
+    Uma tarefa no loop regista uma "batida" a cada `intervalo`; a diferença entre o momento previsto
+    e o real é o lag. Uma thread auxiliar verifica as batidas: se o loop não bate há mais de `limite`,
+    está bloqueado em código síncrono, e a thread apanha a stack da thread do loop nesse instante."""
+    def __init__(self, intervalo: float = 0.1, limite: float = None, amostras: int = 3000, bloqueios: int = 20):
+        self.intervalo = intervalo
+        self.limite = limite if limite is not None else float(os.getenv('LOOP_LAG_LIMITE_MS', '250')) / 1000
+        self.amostras = deque(maxlen=amostras) # Últimos ~5 min com o intervalo por omissão
+        self.bloqueios = deque(maxlen=bloqueios)
+        self._batida = time.monotonic()
+        self._bloqueio_atual = None
+        self._thread_loop = None
+        self._tarefa = None
+        self._parar = threading.Event()
+        METRICAS.gauge('arauto_loop_lag_quantil_segundos', 'Percentis do lag do event loop (janela recente).',
+                       lambda: {(str(q),): v for q, v in self.percentis().items()}, ('quantil',))
+
+    def iniciar(self):
+        if self._tarefa and not self._tarefa.done(): return
+        self._thread_loop = threading.get_ident()
+        self._batida = time.monotonic()
+        self._parar.clear()
+        self._tarefa = asyncio.create_task(self._bater())
+        threading.Thread(target=self._vigiar, name='vigia-loop', daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+        if self._tarefa: self._tarefa.cancel()
+
+    def percentis(self, quantis=(0.5, 0.95, 0.99)) -> dict:
+        if not self.amostras: return {}
+        ordenadas = sorted(self.amostras)
+        resultado = {q: ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] for q in quantis}
+        resultado[1.0] = ordenadas[-1]
+        return resultado
+
+    def lag_recente(self, janela: int = 10) -> float:
+        """Lag médio das últimas `janela` batidas (incluindo um bloqueio ainda em curso)."""
+        em_curso = max(0.0, time.monotonic() - self._batida - self.intervalo)
+        recentes = list(self.amostras)[-janela:]
+        media = sum(recentes) / len(recentes) if recentes else 0.0
+        return max(media, em_curso)
+
+    async def _bater(self):
+        while True:
+            previsto = time.monotonic() + self.intervalo
+            await asyncio.sleep(self.intervalo)
+            agora = time.monotonic()
+            lag = max(0.0, agora - previsto)
+            self._batida = agora
+            self.amostras.append(lag)
+            LOOP_LAG.observar(lag)
+            bloqueio = self._bloqueio_atual
+            if bloqueio is not None:
+                self._bloqueio_atual = None
+                bloqueio.duracao = lag + self.intervalo
+                log.warning("[Vigia] Event loop bloqueado durante %.0fms. Stack apanhada durante o bloqueio:\n%s",
+                            bloqueio.duracao * 1000, "".join(bloqueio.stack[-8:]).rstrip())
+
+    def _vigiar(self):
+        # Corre numa thread própria: continua a correr quando o loop está bloqueado
+        while not self._parar.wait(self.intervalo):
+            if self._bloqueio_atual is not None: continue # Já apanhado; espera que o loop volte
+            if time.monotonic() - self._batida < self.limite + self.intervalo: continue
+            frame = sys._current_frames().get(self._thread_loop)
+            if frame is None: continue
+            # As frames internas do asyncio (run_forever, _run_once, ...) não dizem nada sobre o bloqueio
+            stack = [linha for linha in traceback.format_stack(frame) if _DIR_ASYNCIO not in linha]
+            bloqueio = Bloqueio(stack)
+            self.bloqueios.append(bloqueio)
+            LOOP_BLOQUEIOS.inc()
+            self._bloqueio_atual = bloqueio